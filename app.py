@@ -325,6 +325,15 @@ elif page == "📦 Agent 管理":
                     except Exception as e:
                         st.error(f"加载 graph.json 失败: {e}")
 
+                # Recent runs (streamed from .trace/*.jsonl)
+                from src.utils.trace_store import list_runs
+                runs = list_runs(agent, limit=5)
+                if runs:
+                    st.markdown("**最近运行:**")
+                    for run in runs:
+                        flow = " → ".join(n for n in run["nodes"] if n) or "-"
+                        st.caption(f"{'✅' if run['complete'] else '⏳'} `{run['run_id']}` {flow}")
+
             with col2:
                 if st.button("🔄 测试", key=f"test_{agent.name}", use_container_width=True):
                     st.session_state.selected_agent = agent.name
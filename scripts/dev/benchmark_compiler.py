@@ -0,0 +1,161 @@
+"""Compile-latency benchmark for the Jinja code generator.
+
+Measures Compiler.compile for representative graph sizes:
+
+- cold:  first compile in a fresh process-level cache (template parse + black)
+- full:  compile into an empty directory with warm template caches; the
+         formatted-code cache is cleared first, so black runs as it would
+         for a new agent
+- noop:  recompile with unchanged inputs (incremental manifest hit)
+
+Usage:
+    python scripts/dev/benchmark_compiler.py
+    python scripts/dev/benchmark_compiler.py --sizes 3 10 50 --repeat 5 --json bench.json
+    python scripts/dev/benchmark_compiler.py --max-full-ms 2000   # exit 1 on regression
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.core import compiler as compiler_module
+from src.core.compiler import Compiler
+from src.schemas import (
+    ConditionalEdgeDef,
+    EdgeDef,
+    GraphStructure,
+    NodeDef,
+    PatternConfig,
+    PatternType,
+    ProjectMeta,
+    RAGConfig,
+    StateField,
+    StateFieldType,
+    StateSchema,
+    TaskType,
+    ToolsConfig,
+)
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "src" / "templates"
+
+
+def make_inputs(num_nodes: int, with_rag: bool = True):
+    """Build a linear LLM/tool chain with a router loop back to the entry node."""
+    nodes = []
+    for i in range(num_nodes):
+        node_type = "tool" if i % 3 == 2 else ("rag" if with_rag and i == 0 else "llm")
+        config = {"tool_name": "calculator"} if node_type == "tool" else None
+        nodes.append(NodeDef(id=f"node_{i}", type=node_type, role_description=f"Step {i}", config=config))
+
+    edges = [EdgeDef(source=f"node_{i}", target=f"node_{i + 1}") for i in range(num_nodes - 2)]
+    conditional_edges = [
+        ConditionalEdgeDef(
+            source=f"node_{num_nodes - 2}",
+            condition="should_continue",
+            condition_logic="",
+            branches={"continue": f"node_{num_nodes - 1}", "retry": "node_0", "end": "END"},
+        )
+    ] if num_nodes >= 2 else []
+
+    graph = GraphStructure(
+        pattern=PatternConfig(pattern_type=PatternType.SEQUENTIAL),
+        state_schema=StateSchema(
+            fields=[StateField(name="messages", type=StateFieldType.LIST_MESSAGE, reducer="add_messages")]
+        ),
+        nodes=nodes,
+        edges=edges,
+        conditional_edges=conditional_edges,
+        entry_point="node_0",
+    )
+    meta = ProjectMeta(
+        agent_name=f"bench_{num_nodes}",
+        description="Benchmark agent",
+        has_rag=with_rag,
+        task_type=TaskType.RAG if with_rag else TaskType.CHAT,
+        user_intent_summary="Benchmark",
+        file_paths=["docs/manual.md"] if with_rag else [],
+    )
+    rag_config = RAGConfig() if with_rag else None
+    return meta, graph, rag_config, ToolsConfig(enabled_tools=["calculator"])
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    if not result.success:
+        raise RuntimeError(result.error_message)
+    return elapsed
+
+
+def run(sizes, repeat: int, format_code: bool):
+    rows = []
+    workdir = Path(tempfile.mkdtemp(prefix="compiler_bench_"))
+    try:
+        for size in sizes:
+            inputs = make_inputs(size)
+
+            # Cold: no process-level environment, no bytecode or format cache
+            compiler_module._ENVIRONMENTS.clear()
+            compiler_module._TEMPLATE_INPUTS.clear()
+            compiler_module._FORMAT_CACHE.clear()
+            cache_dir = workdir / f"cache_{size}"
+            compiler = Compiler(TEMPLATE_DIR, format_code=format_code, cache_dir=cache_dir)
+            cold = timed(partial(compiler.compile, *inputs, workdir / f"cold_{size}"))
+
+            full, noop = [], []
+            for i in range(repeat):
+                out_dir = workdir / f"full_{size}_{i}"
+                compiler_module._FORMAT_CACHE.clear()
+                shutil.rmtree(cache_dir / "format", ignore_errors=True)
+                compiler = Compiler(TEMPLATE_DIR, format_code=format_code, cache_dir=cache_dir)
+                full.append(timed(partial(compiler.compile, *inputs, out_dir)))
+                noop.append(timed(partial(compiler.compile, *inputs, out_dir)))
+
+            rows.append({
+                "nodes": size,
+                "cold_ms": round(cold, 1),
+                "full_ms": round(statistics.median(full), 1),
+                "noop_ms": round(statistics.median(noop), 1),
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compiler latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 10, 30], help="Graph sizes (nodes)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per size (median reported)")
+    parser.add_argument("--no-format", action="store_true", help="Disable black formatting")
+    parser.add_argument("--json", type=Path, help="Write results as JSON")
+    parser.add_argument("--max-full-ms", type=float, help="Fail if any warm full compile exceeds this")
+    args = parser.parse_args(argv)
+
+    rows = run(args.sizes, args.repeat, format_code=not args.no_format)
+
+    print(f"\n{'nodes':>6} {'cold (ms)':>10} {'full (ms)':>10} {'noop (ms)':>10}")
+    for row in rows:
+        print(f"{row['nodes']:>6} {row['cold_ms']:>10} {row['full_ms']:>10} {row['noop_ms']:>10}")
+
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+    if args.max_full_ms is not None:
+        slow = [r for r in rows if r["full_ms"] > args.max_full_ms]
+        if slow:
+            print(f"\n❌ Full compile over {args.max_full_ms}ms: {[r['nodes'] for r in slow]}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
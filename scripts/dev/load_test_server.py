@@ -0,0 +1,224 @@
+"""Local load test for the generated HTTP server (server.py).
+
+Compiles a small chat agent with ``emit_server=True``, starts a stub
+OpenAI-compatible LLM endpoint and the generated server, then fires
+concurrent requests and reports throughput, latency percentiles and
+rejected (503) requests. Finally sends SIGTERM and checks that the server
+drains and exits cleanly.
+
+Usage:
+    python scripts/dev/load_test_server.py
+    python scripts/dev/load_test_server.py --requests 500 --concurrency 64 --llm-latency-ms 200
+    python scripts/dev/load_test_server.py --stream --max-in-flight 16 --max-queue 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.core.compiler import Compiler
+from src.schemas import (
+    EdgeDef,
+    GraphStructure,
+    NodeDef,
+    PatternConfig,
+    PatternType,
+    ProjectMeta,
+    StateField,
+    StateFieldType,
+    StateSchema,
+    TaskType,
+    ToolsConfig,
+)
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "src" / "templates"
+STUB_REPLY = "stub reply from the load-test LLM"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def stub_llm_app(latency_s: float) -> web.Application:
+    """OpenAI-compatible /v1/chat/completions that answers after a fixed delay."""
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        await asyncio.sleep(latency_s)
+        base = {"id": "chatcmpl-stub", "created": int(time.time()), "model": body.get("model", "stub")}
+        if not body.get("stream"):
+            return web.json_response({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": STUB_REPLY}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 8, "total_tokens": 18},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        words = STUB_REPLY.split(" ")
+        for i, word in enumerate(words):
+            delta = {"role": "assistant", "content": word if i == 0 else " " + word}
+            chunk = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        end = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        await response.write(f"data: {json.dumps(end)}\n\ndata: [DONE]\n\n".encode())
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    return app
+
+
+def compile_agent(out_dir: Path) -> None:
+    meta = ProjectMeta(
+        agent_name="load_test_bot",
+        description="Load test agent",
+        has_rag=False,
+        task_type=TaskType.CHAT,
+        user_intent_summary="Load test",
+    )
+    graph = GraphStructure(
+        pattern=PatternConfig(pattern_type=PatternType.SEQUENTIAL),
+        state_schema=StateSchema(
+            fields=[StateField(name="messages", type=StateFieldType.LIST_MESSAGE, reducer="add_messages")]
+        ),
+        nodes=[NodeDef(id="answer", type="llm", role_description="Answer briefly")],
+        edges=[EdgeDef(source="answer", target="END")],
+        entry_point="answer",
+    )
+    compiler = Compiler(TEMPLATE_DIR, format_code=False, cache_dir="", emit_server=True)
+    result = compiler.compile(meta, graph, None, ToolsConfig(enabled_tools=[]), out_dir)
+    if not result.success:
+        raise RuntimeError(result.error_message)
+    (out_dir / ".env").unlink(missing_ok=True)  # configuration comes from the environment below
+
+
+async def wait_healthy(session: ClientSession, url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/health") as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("server did not become healthy")
+
+
+async def fire(session: ClientSession, url: str, args) -> dict:
+    endpoint = "/stream" if args.stream else "/invoke"
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, statuses = [], []
+
+    async def one(i: int) -> None:
+        payload = {"input": f"question {i}"}
+        if args.sessions:
+            payload["thread_id"] = f"session-{i % args.sessions}"
+        async with semaphore:
+            start = time.perf_counter()
+            async with session.post(f"{url}{endpoint}", json=payload) as resp:
+                body = await resp.text()
+                statuses.append(resp.status)
+                if resp.status == 200:
+                    assert STUB_REPLY.split(" ")[0] in body, body[:200]
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    wall = time.perf_counter() - start
+
+    ok = len(latencies)
+    latencies.sort()
+    return {
+        "requests": args.requests,
+        "ok": ok,
+        "rejected_503": statuses.count(503),
+        "errors": sum(1 for s in statuses if s not in (200, 503)),
+        "throughput_rps": round(ok / wall, 1) if wall else 0.0,
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else None,
+        "p95_ms": round(latencies[int(0.95 * (ok - 1))], 1) if latencies else None,
+        "wall_s": round(wall, 2),
+    }
+
+
+async def main_async(args) -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="server_load_"))
+    agent_dir = workdir / "agent"
+    compile_agent(agent_dir)
+
+    stub_runner = web.AppRunner(stub_llm_app(args.llm_latency_ms / 1000))
+    await stub_runner.setup()
+    stub_port, server_port = free_port(), free_port()
+    await web.TCPSite(stub_runner, "127.0.0.1", stub_port).start()
+
+    env = {
+        **os.environ,
+        "RUNTIME_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "RUNTIME_API_KEY": "stub",
+        "RUNTIME_MODEL": "stub-model",
+        "SERVER_MAX_IN_FLIGHT": str(args.max_in_flight),
+        "SERVER_MAX_QUEUE": str(args.max_queue),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "server.py", "--port", str(server_port)],
+        cwd=agent_dir,
+        env=env,
+        stdout=subprocess.DEVNULL if not args.verbose else None,
+        stderr=subprocess.STDOUT if not args.verbose else None,
+    )
+    url = f"http://127.0.0.1:{server_port}"
+    try:
+        async with ClientSession() as session:
+            await wait_healthy(session, url)
+            report = await fire(session, url, args)
+
+        # Graceful shutdown: SIGTERM must drain and exit 0
+        server.send_signal(signal.SIGTERM)
+        report["clean_shutdown"] = server.wait(timeout=60) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+        await stub_runner.cleanup()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0 if report["errors"] == 0 and report["clean_shutdown"] else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test for generated server.py")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--sessions", type=int, default=0, help="Spread requests over N thread_ids (0: ephemeral)")
+    parser.add_argument("--stream", action="store_true", help="Use the SSE endpoint")
+    parser.add_argument("--llm-latency-ms", type=float, default=100, help="Stub LLM response delay")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="SERVER_MAX_IN_FLIGHT")
+    parser.add_argument("--max-queue", type=int, default=64, help="SERVER_MAX_QUEUE")
+    parser.add_argument("--json", type=Path, help="Write the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show server output")
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
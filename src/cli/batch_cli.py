@@ -0,0 +1,47 @@
+"""
+Batch CLI - 无人值守批量构建 Agent
+
+用法:
+    python -m src.cli.batch_cli specs.jsonl --workers 4 --summary batch_summary.jsonl
+
+规格文件 (JSONL 或 YAML) 每项包含 description / file_paths / output_dir。
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from ..core.batch_factory import BatchFactory, load_batch_spec
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Agent Zero 批量构建")
+    parser.add_argument("spec", type=Path, help="规格文件 (.jsonl / .yaml)")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="同时进行的构建数 (默认 2)")
+    parser.add_argument("--env-workers", type=int, default=2, help="依赖安装进程池大小 (默认 2)")
+    parser.add_argument("--install", action="store_true", help="安装依赖并运行生成的测试")
+    parser.add_argument("--summary", type=Path, default=Path("batch_summary.jsonl"), help="JSONL 进度/结果输出文件")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    entries = load_batch_spec(args.spec)
+    print(f"🏭 批量构建: {len(entries)} 个 Agent, 并行度 {args.workers}")
+    print(f"📄 进度输出: {args.summary}")
+
+    factory = BatchFactory(workers=args.workers, env_workers=args.env_workers, install=args.install)
+    with open(args.summary, "a", encoding="utf-8") as summary:
+        results = asyncio.run(factory.run(entries, summary=summary))
+
+    succeeded = sum(1 for r in results if r["success"])
+    for r in results:
+        status = "✅" if r["success"] else "❌"
+        print(f"{status} [{r['index']}] {r.get('agent_name') or '-'} {r.get('agent_dir') or r.get('error', '')}")
+    print(f"\n完成: {succeeded}/{len(results)} 成功")
+    return 0 if succeeded == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
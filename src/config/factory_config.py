@@ -30,6 +30,10 @@ class AgentFactoryConfig(BaseModel):
     include_deepeval: bool = Field(default=True)
     use_mirror_source: bool = Field(default=True)
     
+    # 断点续建
+    enable_checkpoints: bool = Field(default=True, description="是否按阶段保存构建检查点，重跑时跳过已完成阶段")
+    checkpoint_dir: Path = Field(default=Path("./.cache/builds"))
+    
     @classmethod
     def from_env(cls) -> "AgentFactoryConfig":
         """从环境变量加载"""
@@ -38,5 +42,7 @@ class AgentFactoryConfig(BaseModel):
             builder_model=os.getenv("BUILDER_MODEL", "gpt-4o"),
             builder_api_key=os.getenv("BUILDER_API_KEY", ""),
             builder_base_url=os.getenv("BUILDER_BASE_URL"),
+            enable_checkpoints=os.getenv("BUILD_CHECKPOINTS", "true").lower() in ("1", "true", "yes"),
+            checkpoint_dir=Path(os.getenv("BUILD_CHECKPOINT_DIR", "./.cache/builds")),
             # 其他配置保持默认或可以从 ENV 加载
         )
@@ -12,6 +12,8 @@ from .test_generator import TestGenerator, DeepEvalTestConfig
 from .runner import Runner, DeepEvalTestResult
 from .judge import Judge, JudgeResult, ErrorType, FixTarget
 from .interface_guard import InterfaceGuard
+from .step_executor import StepExecutor
+from .batch_factory import BatchFactory, BatchEntry, load_batch_spec
 
 __all__ = [
     "Compiler",
@@ -31,4 +33,8 @@ __all__ = [
     "ErrorType",
     "FixTarget",
     "InterfaceGuard",
+    "StepExecutor",
+    "BatchFactory",
+    "BatchEntry",
+    "load_batch_spec",
 ]
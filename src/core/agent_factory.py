@@ -1,7 +1,8 @@
 import asyncio
 import time
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from concurrent.futures import Executor
+from typing import Optional, List, Dict, Any, Awaitable, Callable
 from datetime import datetime
 
 from ..llm.builder_client import BuilderClient
@@ -11,6 +12,7 @@ from ..schemas.graph_structure import GraphStructure
 from ..schemas.rag_config import RAGConfig
 from ..schemas.tools_config import ToolsConfig
 from ..schemas.agent_result import AgentResult
+from ..schemas.simulation import SimulationResult
 from ..schemas.execution_result import ExecutionResult, ExecutionStatus
 from ..schemas.judge_result import FixTarget, JudgeResult
 from ..schemas.test_report import IterationReport, TestCaseReport
@@ -27,6 +29,8 @@ from .rag_builder import RAGBuilder
 from .tool_selector import ToolSelector
 from .report_manager import ReportManager
 from .report_manager import ReportManager
+from .step_executor import StepExecutor
+from .build_checkpoint import BuildCheckpoint
 from ..utils.git_utils import GitUtils
 from ..tools.definitions import CURATED_TOOLS
 
@@ -37,10 +41,19 @@ class AgentFactory:
         self,
         config: Optional[AgentFactoryConfig] = None,
         callback: Optional[ProgressCallback] = None,
-        log_callback: Optional[callable] = None
+        log_callback: Optional[callable] = None,
+        env_executor: Optional[Executor] = None,
+        claim_agent_dir: Optional[Callable[[Path], Path]] = None,
+        checkpoint_scope: Optional[str] = None
     ):
         self.config = config or AgentFactoryConfig.from_env()
         self.callback = callback
+        # 依赖安装在此执行器中运行 (默认线程池)，批量构建时可传入共享进程池
+        self.env_executor = env_executor
+        # 未指定 output_dir 时用于占用输出目录 (批量构建中同名 Agent 会得到带后缀的目录)
+        self.claim_agent_dir = claim_agent_dir
+        # 区分相同输入的并发构建 (批量构建时为条目序号), 避免共用检查点目录
+        self.checkpoint_scope = checkpoint_scope
         self.log_callback = log_callback  # 🆕 Phase 5: UI 日志回调
         
         # 🆕 v8.0: Load Curated Tools into Registry
@@ -86,13 +99,29 @@ class AgentFactory:
         self,
         user_input: str,
         file_paths: Optional[List[str]] = None,
-        output_dir: Optional[Path] = None
+        output_dir: Optional[Path] = None,
+        redo_from: Optional[str] = None
     ) -> AgentResult:
         """
         全流程构建 Agent
+        
+        启用检查点时，相同输入 (需求文本 + 文件内容) 的重跑会跳过已完成阶段。
+        
+        Args:
+            redo_from: 从指定阶段重新构建 (pm / rag / tools / graph / simulation)，
+                该阶段及之后的检查点会被丢弃，例如 "graph" 只重做蓝图设计
         """
         start_time = time.time()
         
+        checkpoint = None
+        if self.config.enable_checkpoints:
+            checkpoint = BuildCheckpoint(
+                self.config.checkpoint_dir,
+                BuildCheckpoint.make_build_id(user_input, file_paths, scope=self.checkpoint_scope),
+            )
+            if redo_from:
+                checkpoint.invalidate(redo_from)
+        
         # Initialize Result (Temporary)
         meta = ProjectMeta(
             agent_name="unknown",
@@ -105,20 +134,50 @@ class AgentFactory:
         graph = None
         
         try:
-            # Step 1: PM Analysis
-            meta = await self._step_pm_analysis(user_input, file_paths)
+            # Step 1 & 2: PM Analysis + RAG & Tools
+            # 文件画像不依赖 PM 结果，与 PM 分析同时进行；
+            # 资源准备只等待 PM，需要画像时再等待画像完成
+            resources_done = checkpoint is not None and checkpoint.has("rag", "tools")
+            pipeline = StepExecutor()
+            pipeline.add_step(
+                "profile",
+                lambda _: self._step_profile(None if resources_done else file_paths),
+            )
+            pipeline.add_step(
+                "pm",
+                lambda _: self._checkpointed(
+                    checkpoint, "pm", ProjectMeta, "PM Agent",
+                    lambda: self._step_pm_analysis(user_input, file_paths),
+                ),
+            )
+            pipeline.add_step(
+                "resources",
+                lambda r: self._checkpointed_resources(
+                    checkpoint, r["pm"], profile=pipeline.wait_for("profile")
+                ),
+                depends_on=["pm"],
+            )
+            results = await pipeline.run()
+            meta = results["pm"]
+            rag_config, tools_config = results["resources"]
             
             # Update agent_dir based on agent_name
             agent_dir = output_dir or (self.config.output_base_dir / meta.agent_name)
+            if output_dir is None and self.claim_agent_dir:
+                agent_dir = self.claim_agent_dir(agent_dir)
             
-            # Step 2: RAG & Tools
-            rag_config, tools_config = await self._step_resources(meta)
-            
-            # Design & Review Loop
+            # Design & Review Loop (评审通过的蓝图与仿真结果作为一个检查点阶段)
             sim_result = None
             feedback = None
+            design_restored = False
+            if checkpoint and checkpoint.has("graph", "simulation"):
+                _, graph = checkpoint.load("graph", GraphStructure)
+                _, sim_result = checkpoint.load("simulation", SimulationResult)
+                design_restored = graph is not None and sim_result is not None
+                if design_restored and self.callback:
+                    self.callback.on_log("♻️ 从检查点恢复: Design & Simulation (已评审蓝图)")
             
-            for review_round in range(5): # Limit review rounds
+            for review_round in range(0 if design_restored else 5): # Limit review rounds
                 if review_round == 0:
                     # Initial Design Loop
                     graph, sim_result = await self._design_loop(meta, rag_config, tools_config)
@@ -155,6 +214,10 @@ class AgentFactory:
                 else:
                     # No interactivity, assume approved
                     break
+            
+            if checkpoint and not design_restored:
+                checkpoint.save("graph", graph)
+                checkpoint.save("simulation", sim_result)
 
             # Step 5: Build & Evolve
             final_result = await self._build_and_evolve_loop(
@@ -224,8 +287,14 @@ class AgentFactory:
             
             # Let's iterate using a simple blocking input for now, printing via callback.
             answers = {}
-            print("\n(请输入回答，按回车确认):")
+            if not self.config.interactive:
+                # Headless (batch) builds never block on stdin
+                answers = {q: "No specific preference" for q in meta.clarification_questions}
+            else:
+                print("\n(请输入回答，按回车确认):")
             for q in meta.clarification_questions:
+                if q in answers:
+                    continue
                 try:
                     ans = input(f"Q: {q}\nA: ")
                 except EOFError:
@@ -233,11 +302,12 @@ class AgentFactory:
                     ans = "No specific preference"
                 answers[q] = ans
             
-            # Refine
-            meta = await self.pm.refine_with_clarification(meta, answers)
-            
-            # Re-estimate complexity and plan after refinement
-            complexity = await self.pm.estimate_complexity(user_input, bool(paths))
+            # Refine; complexity only depends on the original input, so
+            # estimate it concurrently with the refinement call
+            meta, complexity = await asyncio.gather(
+                self.pm.refine_with_clarification(meta, answers),
+                self.pm.estimate_complexity(user_input, bool(paths)),
+            )
             meta.complexity_score = complexity
             if complexity >= 4:
                 execution_plan = await self.pm.create_execution_plan(meta)
@@ -250,38 +320,109 @@ class AgentFactory:
             
         return meta
 
-    async def _step_resources(self, meta: ProjectMeta) -> tuple[Optional[RAGConfig], Optional[ToolsConfig]]:
-        """Step 2: 资源准备 (RAG & Tools)"""
+    async def _checkpointed(
+        self,
+        checkpoint: Optional[BuildCheckpoint],
+        stage: str,
+        model: type,
+        label: str,
+        produce: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """运行一个阶段，或从构建检查点恢复其输出"""
+        if checkpoint:
+            found, value = checkpoint.load(stage, model)
+            if found:
+                if self.callback:
+                    self.callback.on_log(f"♻️ 从检查点恢复: {label}")
+                return value
+        
+        value = await produce()
+        if checkpoint:
+            checkpoint.save(stage, value)
+        return value
+
+    async def _checkpointed_resources(
+        self,
+        checkpoint: Optional[BuildCheckpoint],
+        meta: ProjectMeta,
+        profile: Optional[Any] = None,
+    ) -> tuple[Optional[RAGConfig], Optional[ToolsConfig]]:
+        """Step 2 (可恢复): RAG 与工具配置一起恢复或一起重新生成"""
+        if checkpoint and checkpoint.has("rag", "tools"):
+            found_rag, rag_config = checkpoint.load("rag", RAGConfig)
+            found_tools, tools_config = checkpoint.load("tools", ToolsConfig)
+            if found_rag and found_tools:
+                if self.callback:
+                    self.callback.on_log("♻️ 从检查点恢复: Resource Config")
+                return rag_config, tools_config
+        
+        rag_config, tools_config = await self._step_resources(meta, profile=profile)
+        if checkpoint:
+            checkpoint.save("rag", rag_config)
+            checkpoint.save("tools", tools_config)
+        return rag_config, tools_config
+
+    async def _step_profile(self, file_paths: Optional[List[str]]) -> Any:
+        """文件画像 (CPU/IO 密集)，在线程池中运行，不阻塞事件循环
+
+        Returns:
+            DataProfile；无文件时为 None；画像失败时返回异常对象，
+            仅在确实需要 RAG 时由 _step_resources 抛出
+        """
+        if not file_paths:
+            return None
+        
+        from .profiler import Profiler
+        paths = [Path(p) for p in file_paths]
+        try:
+            return await asyncio.to_thread(Profiler().analyze, paths)
+        except Exception as e:
+            return e
+
+    async def _step_resources(
+        self,
+        meta: ProjectMeta,
+        profile: Optional[Any] = None,
+    ) -> tuple[Optional[RAGConfig], Optional[ToolsConfig]]:
+        """Step 2: 资源准备 (RAG & Tools)
+        
+        Args:
+            meta: PM 分析结果
+            profile: 预先启动的文件画像任务 (awaitable)；为 None 时按需现场画像
+        """
         if self.callback:
             self.callback.on_step_start("Resource Config", 2, 5)
-            
-        rag_config = None
-        tools_config = None
         
-        # Parallel execution if possible, for now sequential
-        if meta.has_rag:
+        async def design_rag(_):
+            if not meta.has_rag or not meta.file_paths:
+                return None
             if self.callback:
                 self.callback.on_log("配置 RAG 系统...")
             
-            # Create a DataProfile on the fly or just rely on file paths
-            # RAGBuilder normally needs DataProfile, but specific method signature might vary.
-            # RAGBuilder.design_rag_strategy takes DataProfile.
-            # We need to profile first if we want to use design_rag_strategy.
-            # Or use RAGBuilder.build_config if it existed (my skeleton had it, but file didn't).
-            # The file has design_rag_strategy(profile).
-            # So we need to profile data first.
-            from .profiler import Profiler
-            profiler = Profiler()
-            if meta.file_paths:
-                from pathlib import Path
-                paths = [Path(p) for p in meta.file_paths]
-                profile = profiler.analyze(paths)
-                rag_config = await self.rag_builder.design_rag_strategy(profile)
-        
-        # Tools
-        if self.callback:
-            self.callback.on_log("选择工具...")
-        tools_config = await self.tool_selector.select_tools(meta)
+            # RAGBuilder.design_rag_strategy 需要 DataProfile
+            data_profile = await profile if profile is not None else None
+            if data_profile is None:
+                data_profile = await self._step_profile(meta.file_paths)
+            if isinstance(data_profile, Exception):
+                raise data_profile
+            if data_profile is None:
+                return None
+            return await self.rag_builder.design_rag_strategy(data_profile)
+        
+        async def select_tools(_):
+            if self.callback:
+                self.callback.on_log("选择工具...")
+            return await self.tool_selector.select_tools(meta)
+        
+        # RAG 设计与工具选择互不依赖，并行执行
+        results = await (
+            StepExecutor()
+            .add_step("rag", design_rag)
+            .add_step("tools", select_tools)
+            .run()
+        )
+        rag_config = results["rag"]
+        tools_config = results["tools"]
         
         if self.callback:
             self.callback.on_step_complete("Resource Config", {"rag": bool(rag_config), "tools": len(tools_config.enabled_tools) if tools_config else 0})
@@ -427,7 +568,12 @@ class AgentFactory:
             if self.callback:
                 if self.callback.on_install_request():
                     self.callback.on_log("正在安装依赖 (请耐心等待)...")
-                    if runner.setup_environment():
+                    # 安装脚本是阻塞的子进程调用，放到执行器中以免阻塞其他并行构建
+                    from .runner import setup_agent_environment
+                    installed = await asyncio.get_running_loop().run_in_executor(
+                        self.env_executor, setup_agent_environment, str(agent_dir)
+                    )
+                    if installed:
                         self.callback.on_log("依赖安装完成。")
                         
                         # 🔄 重新加载 Runner 模块并重新创建实例
@@ -450,7 +596,7 @@ class AgentFactory:
                 if self.callback:
                     self.callback.on_log("执行测试...")
                 # Ensure DeepEval is installed/ready is handled by Runner internally or Compiler pre-install
-                test_results = runner.run_deepeval_tests()
+                test_results = await asyncio.to_thread(runner.run_deepeval_tests)
                 final_result.test_results = test_results
                 
                 # 🆕 Debug: Log test results
@@ -624,7 +770,7 @@ class AgentFactory:
                                 
                                 rag_config = new_rag_config
                                 # 重新编译
-                                self.compiler.compile(meta, graph, rag_config, tools_config, agent_dir)
+                                self._recompile(meta, graph, rag_config, tools_config, agent_dir)
                             
                             elif fix_step.target == "tool_selector" and tools_config:
                                 # Tools 优化
@@ -644,7 +790,7 @@ class AgentFactory:
                                 
                                 tools_config = new_tools_config
                                 # 重新编译
-                                self.compiler.compile(meta, graph, rag_config, tools_config, agent_dir)
+                                self._recompile(meta, graph, rag_config, tools_config, agent_dir)
                             
                             elif fix_step.target == "graph_designer":
                                 # Graph 优化 + 重新仿真
@@ -663,7 +809,7 @@ class AgentFactory:
                                 
                                 graph = new_graph
                                 # 重新编译
-                                self.compiler.compile(meta, graph, rag_config, tools_config, agent_dir)
+                                self._recompile(meta, graph, rag_config, tools_config, agent_dir)
                             
                             elif fix_step.target == "compiler":
                                 # Compiler 依赖优化
@@ -716,7 +862,7 @@ class AgentFactory:
                 # This is expensive, requires re-design
                 graph = await self.designer.fix_logic(graph, feedback=judge_result.feedback)
                 # Re-compile
-                self.compiler.compile(meta, graph, rag_config, tools_config, agent_dir)
+                self._recompile(meta, graph, rag_config, tools_config, agent_dir)
         
         # 🆕 Phase 6: Generate final evolution summary
         if self.callback:
@@ -728,6 +874,28 @@ class AgentFactory:
             
         return final_result
 
+    def _recompile(
+        self,
+        meta: ProjectMeta,
+        graph: GraphStructure,
+        rag_config: Optional[RAGConfig],
+        tools_config: Optional[ToolsConfig],
+        agent_dir: Path,
+    ):
+        """修复后增量重新编译，只重写输入发生变化的文件"""
+        result = self.compiler.compile(meta, graph, rag_config, tools_config, agent_dir)
+        if self.callback:
+            if not result.success:
+                self.callback.on_log(f"    ⚠️ 重新编译失败: {result.error_message}")
+            elif result.changed_files or result.removed_files:
+                self.callback.on_log(
+                    f"    ♻️ 重新编译: 更新了 {', '.join(result.changed_files) or '-'}"
+                    + (f"; 删除了 {', '.join(result.removed_files)}" if result.removed_files else "")
+                )
+            else:
+                self.callback.on_log("    ♻️ 重新编译: 无文件变化")
+        return result
+
     async def _apply_compiler_fix(self, file_path: Path, feedback: str):
         """Apply a fix to a source file using LLM."""
         if not file_path.exists():
@@ -0,0 +1,256 @@
+"""Batch Factory - headless parallel agent builds from a spec file.
+
+A spec is a JSONL or YAML list of ``{description, file_paths, output_dir}``
+entries. Builds run concurrently within a worker budget; every AgentFactory
+talks to the Builder API through the same per-endpoint RequestScheduler, so
+the configured concurrency / tokens-per-minute limits hold for the whole
+batch. Dependency installation runs in a shared process pool, and progress
+plus one result record per entry stream to a JSONL summary file.
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO, Union
+
+import yaml
+from pydantic import BaseModel, Field
+
+from ..config.factory_config import AgentFactoryConfig
+from ..schemas.graph_structure import GraphStructure
+from ..schemas.simulation import SimulationResult
+from ..schemas.test_report import IterationReport
+
+
+class BatchEntry(BaseModel):
+    """One agent to build."""
+
+    description: str = Field(..., min_length=1, description="Requirement text passed to create_agent")
+    file_paths: List[str] = Field(default_factory=list, description="Reference documents")
+    output_dir: Optional[Path] = Field(default=None, description="Target directory (default: agents/<agent_name>)")
+
+
+def load_batch_spec(path: Union[str, Path]) -> List[BatchEntry]:
+    """Load batch entries from a JSONL or YAML file.
+
+    JSONL: one entry per line (blank lines and ``#`` comments are skipped).
+    YAML: a list of entries, or a mapping with an ``agents`` list.
+
+    Args:
+        path: Spec file path
+
+    Returns:
+        Parsed entries
+
+    Raises:
+        ValueError: If the file format or an entry is invalid, or two
+            entries share an ``output_dir``
+    """
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+
+    if path.suffix.lower() in (".yaml", ".yml"):
+        data = yaml.safe_load(text) or []
+        if isinstance(data, dict):
+            data = data.get("agents", [])
+        if not isinstance(data, list):
+            raise ValueError(f"{path}: expected a list of entries")
+        raw_entries = data
+    else:
+        raw_entries = []
+        for line_no, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                raw_entries.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({e})") from e
+
+    entries = [BatchEntry.model_validate(entry) for entry in raw_entries]
+    seen: Dict[Path, int] = {}
+    for number, entry in enumerate(entries, 1):
+        if entry.output_dir is None:
+            continue
+        key = entry.output_dir.resolve()
+        if key in seen:
+            raise ValueError(f"{path}: entries {seen[key]} and {number} share output_dir {entry.output_dir}")
+        seen[key] = number
+    return entries
+
+
+class SummaryWriter:
+    """Appends JSON records to the batch summary, one flushed line per record."""
+
+    def __init__(self, stream: Optional[TextIO]):
+        self.stream = stream
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self.stream is None:
+            return
+        record = {"time": datetime.now().isoformat(timespec="seconds"), **record}
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+
+class AutoApproveCallback:
+    """Non-interactive ProgressCallback for headless builds.
+
+    Approves blueprints, never prompts for API keys and reports progress
+    to the batch summary instead of stdout.
+    """
+
+    def __init__(self, index: int, writer: SummaryWriter, install: bool = False):
+        """Initialize callback.
+
+        Args:
+            index: Entry index in the spec
+            writer: Summary writer
+            install: Whether to install dependencies and run tests
+        """
+        self.index = index
+        self.writer = writer
+        self.install = install
+
+    def _event(self, event: str, **fields: Any) -> None:
+        self.writer.write({"index": self.index, "event": event, **fields})
+
+    def on_step_start(self, step_name: str, step_num: int, total_steps: int):
+        self._event("step_start", step=step_name, step_num=step_num, total_steps=total_steps)
+
+    def on_step_complete(self, step_name: str, result: Any):
+        self._event("step_complete", step=step_name)
+
+    def on_step_error(self, step_name: str, error: Exception):
+        self._event("step_error", step=step_name, error=str(error))
+
+    def on_clarification_needed(self, questions: List[str]):
+        self._event("clarification_skipped", questions=questions)
+
+    def on_blueprint_review(self, graph: GraphStructure, simulation_result: SimulationResult) -> tuple[bool, str]:
+        self._event("blueprint_approved", nodes=len(graph.nodes), issues=len(simulation_result.issues))
+        return True, ""
+
+    def on_install_request(self) -> bool:
+        return self.install
+
+    def on_iteration_complete(
+        self,
+        iteration_report: IterationReport,
+        analysis: Optional[Dict[str, Any]] = None
+    ) -> tuple[bool, Optional[str]]:
+        self._event("iteration", iteration=iteration_report.iteration_id, pass_rate=iteration_report.pass_rate)
+        return True, None
+
+    def on_log(self, message: str):
+        pass
+
+    def on_api_key_missing(self, tool_name: str, env_var: str, help_text: str = "") -> str:
+        self._event("api_key_missing", tool=tool_name, env_var=env_var)
+        return ""
+
+
+class BatchFactory:
+    """Builds many agents concurrently from a list of BatchEntry."""
+
+    def __init__(
+        self,
+        config: Optional[AgentFactoryConfig] = None,
+        workers: int = 2,
+        env_workers: int = 2,
+        install: bool = False,
+    ):
+        """Initialize batch factory.
+
+        Args:
+            config: Base factory config (interactive review is always disabled)
+            workers: Maximum builds in flight
+            env_workers: Process pool size for dependency installation
+            install: Whether to install dependencies and run generated tests
+        """
+        self.config = (config or AgentFactoryConfig.from_env()).model_copy(update={"interactive": False})
+        self.workers = max(1, workers)
+        self.env_workers = max(1, env_workers)
+        self.install = install
+
+    async def run(
+        self,
+        entries: List[BatchEntry],
+        summary: Optional[TextIO] = None,
+    ) -> List[Dict[str, Any]]:
+        """Build all entries.
+
+        A failing entry never aborts the batch; it is reported in its result
+        record instead. Entries without an ``output_dir`` whose agent names
+        collide with another entry or with an existing directory are built
+        into suffixed directories (``name_2``, ``name_3``...), and every entry
+        gets its own build checkpoint, so concurrent builds never share a
+        directory.
+
+        Args:
+            entries: Agents to build
+            summary: Text stream receiving JSONL progress and result records
+
+        Returns:
+            One result record per entry, in spec order
+        """
+        from .agent_factory import AgentFactory
+
+        writer = SummaryWriter(summary)
+        semaphore = asyncio.Semaphore(self.workers)
+        writer.write({"event": "batch_start", "entries": len(entries), "workers": self.workers})
+        start = time.time()
+        claimed = {entry.output_dir.resolve() for entry in entries if entry.output_dir is not None}
+
+        def claim_agent_dir(agent_dir: Path) -> Path:
+            candidate, suffix = agent_dir, 1
+            while candidate.resolve() in claimed or candidate.exists():
+                suffix += 1
+                candidate = agent_dir.with_name(f"{agent_dir.name}_{suffix}")
+            claimed.add(candidate.resolve())
+            return candidate
+
+        with ProcessPoolExecutor(max_workers=self.env_workers) as env_pool:
+
+            async def build(index: int, entry: BatchEntry) -> Dict[str, Any]:
+                async with semaphore:
+                    writer.write({"index": index, "event": "start", "description": entry.description[:80]})
+                    factory = AgentFactory(
+                        config=self.config,
+                        callback=AutoApproveCallback(index, writer, install=self.install),
+                        env_executor=env_pool,
+                        claim_agent_dir=claim_agent_dir,
+                        checkpoint_scope=f"batch-entry-{index}",
+                    )
+                    record: Dict[str, Any] = {"index": index, "event": "result"}
+                    try:
+                        result = await factory.create_agent(
+                            user_input=entry.description,
+                            file_paths=entry.file_paths or None,
+                            output_dir=entry.output_dir,
+                        )
+                        record.update(
+                            success=result.success,
+                            agent_name=result.agent_name,
+                            agent_dir=str(result.agent_dir),
+                            iterations=result.iteration_count,
+                            total_time=round(result.total_time, 1),
+                            error=result.judge_feedback.feedback[:500] if result.judge_feedback and not result.success else None,
+                        )
+                    except Exception as e:
+                        record.update(success=False, error=str(e))
+                    writer.write(record)
+                    return record
+
+            results = await asyncio.gather(*(build(i, entry) for i, entry in enumerate(entries)))
+
+        writer.write({
+            "event": "batch_complete",
+            "succeeded": sum(1 for r in results if r["success"]),
+            "failed": sum(1 for r in results if not r["success"]),
+            "total_time": round(time.time() - start, 1),
+        })
+        return list(results)
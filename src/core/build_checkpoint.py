@@ -0,0 +1,137 @@
+"""Build Checkpoint - stage-level persistence for resumable agent builds.
+
+Each AgentFactory stage output (ProjectMeta, RAGConfig, ToolsConfig,
+GraphStructure, SimulationResult) is saved under a build ID derived from the
+user input and the content of the reference files. Rerunning the same build
+loads completed stages instead of paying for their LLM calls again.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+from ..utils.config_utils import atomic_write_json, load_json_safe
+
+M = TypeVar("M", bound=BaseModel)
+
+# Stage order: invalidating a stage also invalidates everything after it
+STAGES = ("pm", "rag", "tools", "graph", "simulation")
+
+
+def _file_digest(path: Path) -> str:
+    """SHA-256 of a file's content, read in chunks ("missing" if absent)."""
+    if not path.is_file():
+        return "missing"
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class BuildCheckpoint:
+    """Stage checkpoints of one build, stored as JSON files in one directory."""
+
+    def __init__(self, root_dir: Union[str, Path], build_id: str):
+        """Initialize checkpoint store.
+
+        Args:
+            root_dir: Directory holding all build checkpoints
+            build_id: Build ID (see make_build_id)
+        """
+        self.build_id = build_id
+        self.build_dir = Path(root_dir) / build_id
+
+    @staticmethod
+    def make_build_id(
+        user_input: str, file_paths: Optional[List[str]] = None, scope: Optional[str] = None
+    ) -> str:
+        """Derive a stable build ID from the request and its input files.
+
+        File names and contents are hashed, so editing a reference document
+        yields a new build, while the order of paths does not matter.
+
+        Args:
+            user_input: User requirement text
+            file_paths: Reference file paths
+            scope: Extra key separating otherwise identical builds (e.g. the
+                entry index in a batch, so concurrent builds never share a
+                checkpoint directory)
+
+        Returns:
+            16-character hex build ID
+        """
+        files = sorted(
+            (Path(p).name, _file_digest(Path(p))) for p in (file_paths or [])
+        )
+        data = {"input": user_input.strip(), "files": files}
+        if scope is not None:
+            data["scope"] = scope
+        payload = json.dumps(data, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, stage: str) -> Path:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown build stage: {stage}")
+        return self.build_dir / f"{stage}.json"
+
+    def has(self, *stages: str) -> bool:
+        """Check whether all given stages are completed."""
+        return all(self._path(stage).exists() for stage in stages)
+
+    def save(self, stage: str, value: Optional[BaseModel]) -> None:
+        """Save a stage output (None records a completed stage without output).
+
+        Args:
+            stage: Stage name from STAGES
+            value: Pydantic model to persist
+        """
+        atomic_write_json(
+            self._path(stage),
+            {
+                "stage": stage,
+                "saved_at": datetime.now().isoformat(),
+                "data": value.model_dump(mode="json") if value is not None else None,
+            },
+        )
+
+    def load(self, stage: str, model: Type[M]) -> Tuple[bool, Optional[M]]:
+        """Load a stage output.
+
+        Unreadable or outdated checkpoints (e.g. after a schema change) are
+        treated as missing, so the stage simply runs again.
+
+        Args:
+            stage: Stage name from STAGES
+            model: Pydantic model class of the output
+
+        Returns:
+            (found, value) - value may be None for stages without output
+        """
+        record = load_json_safe(self._path(stage))
+        if not isinstance(record, dict) or "data" not in record:
+            return False, None
+        if record["data"] is None:
+            return True, None
+        try:
+            return True, model.model_validate(record["data"])
+        except Exception:
+            return False, None
+
+    def invalidate(self, stage: str) -> None:
+        """Drop a stage and every later stage, e.g. "graph" to redo the design only.
+
+        Args:
+            stage: First stage to rebuild
+        """
+        self._path(stage)
+        for later in STAGES[STAGES.index(stage):]:
+            self._path(later).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Drop all checkpoints of this build."""
+        self.invalidate(STAGES[0])
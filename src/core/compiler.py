@@ -1,17 +1,109 @@
 """Compiler module for generating agent code from JSON configurations."""
 
+import hashlib
 import json
+import os
+import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, meta
 from pydantic import BaseModel, Field
 
 from ..schemas import GraphStructure, RAGConfig, ToolsConfig, ProjectMeta
 from ..tools.definitions import CURATED_TOOLS
-from ..utils.config_utils import atomic_write_json
+from ..utils.config_utils import atomic_write_json, load_json_safe
 
 
+# Manifest of input fingerprints per generated file (incremental compilation)
+MANIFEST_FILE = ".compile_manifest.json"
+
+# RAG fields baked into generated code. All other RAGConfig fields are read
+# from rag_config.json at runtime (ConfigLoader), so changing only those
+# rewrites rag_config.json and leaves agent.py untouched.
+CODEGEN_RAG_FIELDS = (
+    "splitter",
+    "vector_store",
+    "persist_directory",
+    "collection_name",
+    "embedding_provider",
+    "embedding_model_name",
+    "embedding_dimension",
+    "retriever_type",
+)
+
+# Checkpointer backends the generated agent can default to (checkpointer.py.j2)
+CHECKPOINTER_BACKENDS = ("memory", "sqlite")
+
+# Stand-in for the timestamp while rendering, so formatted code can be cached
+_TIMESTAMP_PLACEHOLDER = "__AGENT_ZERO_GENERATED_AT__"
+
+_ENVIRONMENTS: Dict[Tuple[str, str], Environment] = {}
+_TEMPLATE_INPUTS: Dict[Tuple[int, str], Tuple[list, set, list]] = {}
+_FORMAT_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_FORMAT_CACHE_SIZE = 32
+_cache_lock = threading.Lock()
+
+
+def sanitize_collection_name(name: str) -> str:
+    """Replace non-ASCII and special characters with underscores"""
+    # 1. Replace invalid chars with underscores
+    clean = re.sub(r'[^a-zA-Z0-9._-]', '_', name)
+    
+    # 2. Ensure start/end with alphanumeric
+    if not clean or not clean[0].isalnum():
+        clean = "agent" + clean
+    if not clean[-1].isalnum():
+        clean = clean + "docs"
+        
+    # 3. Ensure length (3-63) - Chroma allows 512 but safe limit is better
+    if len(clean) < 3:
+        clean = clean + "_data"
+    
+    # 4. Collapse multiple underscores
+    clean = re.sub(r'_{2,}', '_', clean)
+    
+    return clean
+
+
+def get_template_environment(template_dir: Path, cache_dir: Optional[Path] = None) -> Environment:
+    """Return the process-wide Jinja environment for a template directory.
+
+    Parsed templates stay in the environment's in-memory cache across
+    Compiler instances; with ``cache_dir``, compiled template bytecode is
+    also persisted so new processes skip parsing. Templates edited on disk
+    are still picked up (Jinja checks their mtime).
+
+    Args:
+        template_dir: Directory containing Jinja2 templates
+        cache_dir: Compiler cache directory (bytecode goes to ``jinja/``)
+
+    Returns:
+        Shared Environment
+    """
+    key = (str(Path(template_dir).resolve()), str(cache_dir or ""))
+    with _cache_lock:
+        env = _ENVIRONMENTS.get(key)
+        if env is None:
+            bytecode_cache = None
+            if cache_dir:
+                bytecode_dir = Path(cache_dir) / "jinja"
+                bytecode_dir.mkdir(parents=True, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(str(bytecode_dir))
+            env = Environment(
+                loader=FileSystemLoader(template_dir),
+                trim_blocks=True,
+                lstrip_blocks=True,
+                bytecode_cache=bytecode_cache,
+                cache_size=-1,
+            )
+            # 🆕 Add custom filter for sanitizing collection names
+            env.filters['sanitize_collection_name'] = sanitize_collection_name
+            _ENVIRONMENTS[key] = env
+        return env
+
 
 class CompileResult(BaseModel):
     """Result of compilation process."""
@@ -21,6 +113,12 @@ class CompileResult(BaseModel):
     generated_files: list[str] = Field(
         default_factory=list, description="List of generated files"
     )
+    changed_files: list[str] = Field(
+        default_factory=list, description="Generated files whose content changed in this run"
+    )
+    removed_files: list[str] = Field(
+        default_factory=list, description="Stale outputs of an earlier compile deleted in this run"
+    )
     error_message: Optional[str] = Field(
         default=None, description="Error message if compilation failed"
     )
@@ -33,42 +131,52 @@ class Compiler:
     using Jinja2 templates.
     """
 
-    def __init__(self, template_dir: Path):
+    def __init__(
+        self,
+        template_dir: Path,
+        format_code: Optional[bool] = None,
+        cache_dir: Optional[Path] = None,
+        emit_server: Optional[bool] = None,
+        llm_cache: Optional[bool] = None,
+        checkpointer: Optional[str] = None,
+    ):
         """Initialize compiler with template directory.
         
         Args:
             template_dir: Path to directory containing Jinja2 templates
+            format_code: Run black on agent.py (default: COMPILER_FORMAT_CODE, on)
+            cache_dir: Directory for template bytecode and formatted-code caches
+                (default: COMPILER_CACHE_DIR, ".cache/compiler"; "" disables)
+            emit_server: Also generate server.py, an aiohttp HTTP/SSE server
+                (default: COMPILER_EMIT_SERVER, off)
+            llm_cache: Enable the SQLite LLM response cache in the generated
+                agent by default (default: COMPILER_LLM_CACHE, off; the agent's
+                LLM_CACHE_ENABLED overrides it at runtime)
+            checkpointer: Default checkpointer backend of the generated agent,
+                "memory" (bounded, per-thread LRU) or "sqlite" (persistent,
+                compacted, TTL) (default: COMPILER_CHECKPOINTER, "memory";
+                the agent's CHECKPOINTER_BACKEND overrides it at runtime)
         """
         self.template_dir = template_dir
-        self.env = Environment(
-            loader=FileSystemLoader(template_dir),
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
-        
-        # 🆕 Add custom filter for sanitizing collection names
-        def sanitize_collection_name(name: str) -> str:
-            """Replace non-ASCII and special characters with underscores"""
-            import re
-            # 1. Replace invalid chars with underscores
-            clean = re.sub(r'[^a-zA-Z0-9._-]', '_', name)
-            
-            # 2. Ensure start/end with alphanumeric
-            if not clean or not clean[0].isalnum():
-                clean = "agent" + clean
-            if not clean[-1].isalnum():
-                clean = clean + "docs"
-                
-            # 3. Ensure length (3-63) - Chroma allows 512 but safe limit is better
-            if len(clean) < 3:
-                clean = clean + "_data"
-            
-            # 4. Collapse multiple underscores
-            clean = re.sub(r'_{2,}', '_', clean)
-            
-            return clean
-        
-        self.env.filters['sanitize_collection_name'] = sanitize_collection_name
+        if format_code is None:
+            format_code = os.getenv("COMPILER_FORMAT_CODE", "true").lower() in ("1", "true", "yes")
+        self.format_code = format_code
+        if cache_dir is None:
+            cache_dir = os.getenv("COMPILER_CACHE_DIR", ".cache/compiler")
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if emit_server is None:
+            emit_server = os.getenv("COMPILER_EMIT_SERVER", "false").lower() in ("1", "true", "yes")
+        self.emit_server = emit_server
+        if llm_cache is None:
+            llm_cache = os.getenv("COMPILER_LLM_CACHE", "false").lower() in ("1", "true", "yes")
+        self.llm_cache = llm_cache
+        if checkpointer is None:
+            checkpointer = os.getenv("COMPILER_CHECKPOINTER", "memory")
+        checkpointer = checkpointer.lower()
+        if checkpointer not in CHECKPOINTER_BACKENDS:
+            raise ValueError(f"Unsupported checkpointer: {checkpointer} (choose from {', '.join(CHECKPOINTER_BACKENDS)})")
+        self.checkpointer = checkpointer
+        self.env = get_template_environment(template_dir, self.cache_dir)
 
     def _prepare_tool_context(
         self, 
@@ -151,6 +259,40 @@ class Compiler:
             "tool_inits": tool_inits
         }
 
+    @staticmethod
+    def _node_tool_map(graph: GraphStructure, enabled_tools: List[str]) -> Dict[str, List[str]]:
+        """Map each LLM node to the tools it can route to.
+
+        A node can reach a tool when one of its edges or conditional-edge
+        branches targets a ``tool`` node. The generated agent binds only
+        those tools to the node's LLM.
+
+        Args:
+            graph: Graph structure
+            enabled_tools: Enabled tool IDs (defines the order)
+
+        Returns:
+            ``{node_id: [tool_id, ...]}`` for every non-router LLM node
+        """
+        tool_of = {
+            node.id: (node.config or {}).get("tool_name") or node.id
+            for node in graph.nodes
+            if node.type == "tool"
+        }
+        order = {tool_id: i for i, tool_id in enumerate(enabled_tools)}
+
+        node_tools = {}
+        for node in graph.nodes:
+            if node.type != "llm" or (node.config and node.config.get("is_router")):
+                continue
+            targets = [edge.target for edge in graph.edges if edge.source == node.id]
+            for cond_edge in graph.conditional_edges:
+                if cond_edge.source == node.id:
+                    targets.extend(cond_edge.branches.values())
+            reachable = {tool_of[t] for t in targets if t in tool_of}
+            node_tools[node.id] = sorted(reachable, key=lambda t: (order.get(t, len(order)), t))
+        return node_tools
+
     def compile(
         self,
         project_meta: ProjectMeta,
@@ -199,11 +341,20 @@ class Compiler:
                 "language": project_meta.language,
                 "custom_instructions": project_meta.description,
                 "file_paths": project_meta.file_paths or [],
+                "llm_cache": self.llm_cache,
+                "checkpointer": self.checkpointer,
             }
 
-            # Add RAG config if present
+            # Add RAG config if present. Runtime fields are read from
+            # rag_config.json, so only the code-level fields are baked into
+            # the ConfigLoader defaults (runtime ones use the schema defaults).
+            context["rag_defaults"] = {}
             if rag_config:
                 context["rag_config"] = rag_config
+                context["rag_defaults"] = {
+                    **RAGConfig().model_dump(),
+                    **{field: getattr(rag_config, field) for field in CODEGEN_RAG_FIELDS},
+                }
 
             # 🆕 方案 A+: 预处理工具上下文
             if len(tools_config.enabled_tools) > 0:
@@ -213,92 +364,151 @@ class Compiler:
             else:
                 context["tool_imports"] = []
                 context["tool_inits"] = []
+            context["node_tools"] = self._node_tool_map(graph, tools_config.enabled_tools)
+
+            manifest = self._load_manifest(output_dir)
+            new_manifest: dict = {}
+            changed_files: list[str] = []
+
+            def emit(name: str, fingerprint: str, render, write=None) -> None:
+                """Write one output unless its inputs and its file on disk are both unchanged.
+
+                The manifest records the input fingerprint and a digest of the
+                emitted file, so a file edited after the compile (e.g. by a
+                compiler-fix pass) is re-rendered instead of silently kept.
+                """
+                path = output_dir / name
+                generated_files.append(name)
+                previous = manifest.get(name)
+                if (
+                    isinstance(previous, dict)
+                    and previous.get("input") == fingerprint
+                    and path.exists()
+                    and self._file_digest(path) == previous.get("output")
+                ):
+                    new_manifest[name] = previous
+                    return
+                content = render()
+                if write is not None:
+                    if write(path, content):
+                        changed_files.append(name)
+                elif not path.exists() or path.read_text(encoding="utf-8") != content:
+                    path.write_text(content, encoding="utf-8")
+                    changed_files.append(name)
+                new_manifest[name] = {"input": fingerprint, "output": self._file_digest(path)}
+
+            # Template outputs: fingerprint = template sources + the context
+            # slice they use. The timestamp is excluded, and so are RAG fields
+            # that the generated code reads from rag_config.json at runtime.
+            code_slice = {k: v for k, v in context.items() if k not in ("timestamp", "rag_config")}
+            if rag_config:
+                code_slice["rag_config"] = {
+                    field: getattr(rag_config, field) for field in CODEGEN_RAG_FIELDS
+                }
 
             # Generate agent.py
-            agent_template = self.env.get_template("agent_template.py.j2")
-            agent_code = agent_template.render(**context)
-            
-            # Format code with black (if available)
-            try:
-                import black
-                agent_code = black.format_str(agent_code, mode=black.Mode())
-            except ImportError:
-                pass  # Black not available, skip formatting
+            emit(
+                "agent.py",
+                self._template_fingerprint(
+                    "agent_template.py.j2", code_slice, self._black_version() if self.format_code else ""
+                ),
+                lambda: self._render_agent(context),
+            )
+
+            # Generate server.py (optional serving mode)
+            if self.emit_server:
+                emit(
+                    "server.py",
+                    self._template_fingerprint("server_template.py.j2", code_slice),
+                    lambda: self.env.get_template("server_template.py.j2").render(**context),
+                )
 
-            agent_file = output_dir / "agent.py"
-            agent_file.write_text(agent_code, encoding="utf-8")
-            generated_files.append("agent.py")
+            # Generate rag_loader.py (process-pool document parsing for RAG indexing)
+            if project_meta.has_rag and rag_config:
+                emit(
+                    "rag_loader.py",
+                    self._template_fingerprint("rag_loader_template.py.j2", code_slice),
+                    lambda: self.env.get_template("rag_loader_template.py.j2").render(**context),
+                )
 
             # Generate prompts.yaml
-            prompts_template = self.env.get_template("prompts_template.yaml.j2")
-            prompts_content = prompts_template.render(**context)
-            prompts_file = output_dir / "prompts.yaml"
-            prompts_file.write_text(prompts_content, encoding="utf-8")
-            generated_files.append("prompts.yaml")
+            emit(
+                "prompts.yaml",
+                self._template_fingerprint("prompts_template.yaml.j2", code_slice),
+                lambda: self.env.get_template("prompts_template.yaml.j2").render(**context),
+            )
+
+            # Plain outputs are cheap to generate: fingerprint their content
+            def emit_text(name: str, content: str) -> None:
+                emit(name, self._fingerprint(content), lambda: content)
 
             # Generate requirements.txt
-            requirements = self._generate_requirements(
+            emit_text("requirements.txt", self._generate_requirements(
                 has_rag=project_meta.has_rag,
                 has_tools=len(tools_config.enabled_tools) > 0,
                 rag_config=rag_config,
                 file_paths=project_meta.file_paths,
-            )
-            requirements_file = output_dir / "requirements.txt"
-            requirements_file.write_text(requirements, encoding="utf-8")
-            generated_files.append("requirements.txt")
+                include_server=self.emit_server,
+            ))
 
             # Generate .env.template
-            env_template = self._generate_env_template()
-            env_file = output_dir / ".env.template"
-            env_file.write_text(env_template, encoding="utf-8")
-            generated_files.append(".env.template")
+            emit_text(".env.template", self._generate_env_template())
 
             # 🆕 Generate real .env with current config (Auto-configuration)
-            env_content = self._generate_env_file_content()
-            real_env_file = output_dir / ".env"
-            real_env_file.write_text(env_content, encoding="utf-8")
-            generated_files.append(".env")
+            # (fingerprinted without its timestamp header)
+            emit(
+                ".env",
+                self._fingerprint(self._generate_env_file_content(generated_at="")),
+                self._generate_env_file_content,
+            )
             
             # 🆕 Phase 4: 生成 pip.conf (优化 2 - 预安装)
-            pip_config = self._generate_pip_config()
-            pip_config_file = output_dir / "pip.conf"
-            pip_config_file.write_text(pip_config, encoding="utf-8")
-            generated_files.append("pip.conf")
+            emit_text("pip.conf", self._generate_pip_config())
             
             # 🆕 Phase 4: 生成安装脚本
-            install_sh = self._generate_install_script_sh()
-            install_sh_file = output_dir / "install.sh"
-            install_sh_file.write_text(install_sh, encoding="utf-8")
-            # 设置可执行权限 (Unix/Linux/Mac)
-            try:
-                import os
-                os.chmod(install_sh_file, 0o755)
-            except Exception:
-                pass  # Windows 不需要
-            generated_files.append("install.sh")
+            emit_text("install.sh", self._generate_install_script_sh())
+            if "install.sh" in changed_files:
+                # 设置可执行权限 (Unix/Linux/Mac)
+                try:
+                    os.chmod(output_dir / "install.sh", 0o755)
+                except Exception:
+                    pass  # Windows 不需要
             
-            install_bat = self._generate_install_script_bat()
-            install_bat_file = output_dir / "install.bat"
-            install_bat_file.write_text(install_bat, encoding="utf-8")
-            generated_files.append("install.bat")
+            emit_text("install.bat", self._generate_install_script_bat())
 
             # Save graph.json for UI visualization
-            graph_file = output_dir / "graph.json"
-            graph_file.write_text(graph.model_dump_json(indent=2), encoding="utf-8")
-            generated_files.append("graph.json")
+            emit_text("graph.json", graph.model_dump_json(indent=2))
             
+            def write_json(path: Path, data: dict) -> bool:
+                if path.exists() and load_json_safe(path) == data:
+                    return False
+                atomic_write_json(path, data)
+                return True
+
             # 🆕 Save rag_config.json if RAG is enabled
             if rag_config:
-                atomic_write_json(output_dir / "rag_config.json", rag_config.model_dump())
-                generated_files.append("rag_config.json")
+                data = json.loads(rag_config.model_dump_json())
+                emit("rag_config.json", self._fingerprint(data), lambda: data, write=write_json)
             
             # 🆕 Save tools_config.json if tools are enabled
             if tools_config and len(tools_config.enabled_tools) > 0:
-                atomic_write_json(output_dir / "tools_config.json", tools_config.model_dump())
-                generated_files.append("tools_config.json")
+                data = json.loads(tools_config.model_dump_json())
+                emit("tools_config.json", self._fingerprint(data), lambda: data, write=write_json)
+
+            # Outputs emitted by an earlier compile but not by this one
+            # (e.g. server.py after emit_server is turned off) are removed.
+            removed_files = sorted(set(manifest) - set(new_manifest))
+            for name in removed_files:
+                (output_dir / name).unlink(missing_ok=True)
+
+            atomic_write_json(output_dir / MANIFEST_FILE, {"version": 2, "files": new_manifest})
 
             return CompileResult(
-                success=True, output_dir=output_dir, generated_files=generated_files
+                success=True,
+                output_dir=output_dir,
+                generated_files=generated_files,
+                changed_files=changed_files,
+                removed_files=removed_files,
             )
 
         except Exception as e:
@@ -308,6 +518,110 @@ class Compiler:
                 error_message=f"Compilation failed: {str(e)}",
             )
 
+    def _render_agent(self, context: dict) -> str:
+        """Render agent.py and format it (see _format_code)."""
+        agent_template = self.env.get_template("agent_template.py.j2")
+        agent_code = agent_template.render(**{**context, "timestamp": _TIMESTAMP_PLACEHOLDER})
+        agent_code = self._format_code(agent_code)
+        return agent_code.replace(_TIMESTAMP_PLACEHOLDER, context["timestamp"])
+
+    def _format_code(self, code: str) -> str:
+        """Format code with black (if enabled and available), memoized by content.
+
+        Results are kept in a small in-process LRU and, with a cache
+        directory, on disk, so identical renders are formatted only once.
+        """
+        version = self._black_version()
+        if not self.format_code or not version:
+            return code
+
+        key = hashlib.sha256(f"{version}\0{code}".encode("utf-8")).hexdigest()
+        with _cache_lock:
+            if key in _FORMAT_CACHE:
+                _FORMAT_CACHE.move_to_end(key)
+                return _FORMAT_CACHE[key]
+
+        cache_file = self.cache_dir / "format" / f"{key}.py" if self.cache_dir else None
+        if cache_file and cache_file.exists():
+            formatted = cache_file.read_text(encoding="utf-8")
+        else:
+            import black
+            formatted = black.format_str(code, mode=black.Mode())
+            if cache_file:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(formatted, encoding="utf-8")
+
+        with _cache_lock:
+            _FORMAT_CACHE[key] = formatted
+            while len(_FORMAT_CACHE) > _FORMAT_CACHE_SIZE:
+                _FORMAT_CACHE.popitem(last=False)
+        return formatted
+
+    @staticmethod
+    def _black_version() -> str:
+        try:
+            import black
+            return black.__version__
+        except ImportError:
+            return ""
+
+    def _template_fingerprint(self, name: str, context: dict, *extra) -> str:
+        """Fingerprint a template output from its sources and the variables it uses.
+
+        Includes are followed recursively, and only the context variables
+        referenced by the templates take part, so e.g. prompts.yaml does not
+        change when only the graph nodes do.
+        """
+        sources, variables = self._template_inputs(name)
+        used = {k: v for k, v in context.items() if k in variables}
+        return self._fingerprint(sources, used, *extra)
+
+    def _template_inputs(self, name: str) -> Tuple[list, set]:
+        """Template sources (incl. includes) and referenced variables, cached until edited."""
+        key = (id(self.env), name)
+        with _cache_lock:
+            cached = _TEMPLATE_INPUTS.get(key)
+        if cached and all(uptodate() for uptodate in cached[2]):
+            return cached[0], cached[1]
+
+        sources, variables, checks = [], set(), []
+        pending, seen = [name], set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            source, _, uptodate = self.env.loader.get_source(self.env, current)
+            ast = self.env.parse(source)
+            sources.append(source)
+            checks.append(uptodate)
+            variables |= meta.find_undeclared_variables(ast)
+            pending.extend(t for t in meta.find_referenced_templates(ast) if t)
+
+        with _cache_lock:
+            _TEMPLATE_INPUTS[key] = (sources, variables, checks)
+        return sources, variables
+
+    @staticmethod
+    def _fingerprint(*parts) -> str:
+        """Stable SHA-256 over JSON-serializable (or pydantic) inputs."""
+        def default(obj):
+            if isinstance(obj, BaseModel):
+                return obj.model_dump(mode="json")
+            return str(obj)
+
+        payload = json.dumps(parts, sort_keys=True, default=default, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _file_digest(path: Path) -> str:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    @staticmethod
+    def _load_manifest(output_dir: Path) -> dict:
+        data = load_json_safe(output_dir / MANIFEST_FILE, default={})
+        return data.get("files", {}) if isinstance(data, dict) else {}
+
     def _generate_requirements(
         self, 
         has_rag: bool, 
@@ -315,6 +629,7 @@ class Compiler:
         rag_config: Optional[RAGConfig] = None,
         file_paths: Optional[list] = None,
         include_testing: bool = True,  # 🆕 Phase 4: 添加测试依赖开关
+        include_server: bool = False,
     ) -> str:
         """Generate requirements.txt content based on features.
         
@@ -324,6 +639,7 @@ class Compiler:
             rag_config: RAG configuration (optional)
             file_paths: List of file paths for document loading
             include_testing: Whether to include DeepEval testing dependencies
+            include_server: Whether server.py is generated
             
         Returns:
             Requirements.txt content as string
@@ -335,6 +651,7 @@ class Compiler:
             "langchain-openai>=0.1.0",
             "python-dotenv>=1.0.0",
             "pyyaml>=6.0.1",
+            "tiktoken>=0.5.0",  # Context window token counting
         ]
 
         if has_rag and rag_config:
@@ -343,7 +660,7 @@ class Compiler:
                     "",
                     "# RAG dependencies",
                     "langchain-community>=0.2.0",
-                    "tiktoken>=0.5.0",  # Token counting
+                    "numpy>=1.24.0",  # Semantic query cache, BM25 index
                 ]
             )
             
@@ -373,6 +690,7 @@ class Compiler:
                 
                 if has_pdf:
                     requirements.append("pypdf>=3.17.0")
+                    requirements.append("pymupdf>=1.23.0")  # Page-streaming PDF parsing (rag_loader.py)
                 if has_docx:
                     requirements.append("python-docx>=1.1.0")
                 if has_md:
@@ -382,6 +700,7 @@ class Compiler:
                 # Add all loaders if no file paths specified
                 requirements.extend([
                     "pypdf>=3.17.0",
+                    "pymupdf>=1.23.0",
                     "python-docx>=1.1.0",
                     "markdown>=3.5.0",  # Required by unstructured for markdown
                 ])
@@ -411,6 +730,15 @@ class Compiler:
                 ]
             )
         
+        if include_server:
+            requirements.extend(
+                [
+                    "",
+                    "# Server dependencies (server.py)",
+                    "aiohttp>=3.9.0",
+                ]
+            )
+
         # 🆕 Phase 4: DeepEval 测试依赖 (优化 2 - 预安装)
         if include_testing:
             requirements.extend(
@@ -442,12 +770,68 @@ RUNTIME_API_KEY=your_api_key_here
 RUNTIME_BASE_URL=https://api.deepseek.com
 RUNTIME_TIMEOUT=30
 RUNTIME_TEMPERATURE=0.7
+# 单个工具调用超时 (秒)，同一轮的多个工具调用并发执行
+TOOL_TIMEOUT=30
+
+# 上下文窗口：LLM 节点只发送预算内的最近若干轮 (工具调用与结果成对保留)，更早的对话折叠为缓存的滚动摘要
+CONTEXT_MAX_TOKENS=6000
+CONTEXT_KEEP_TURNS=6
+CONTEXT_SUMMARY_ENABLED=true
+CONTEXT_SUMMARY_MAX_TOKENS=500
+
+# 会话检查点: memory (进程内，线程数 LRU 上限 + 每线程检查点上限) / sqlite (持久化，定期压缩 + 过期线程清理)
+# CHECKPOINTER_BACKEND=sqlite
+CHECKPOINT_MAX_THREADS=1000
+CHECKPOINT_MAX_PER_THREAD=10
+CHECKPOINT_TTL_SECONDS=604800
+CHECKPOINT_COMPACT_EVERY=100
+
+# LLM 响应缓存 (SQLite 精确匹配，键含模型/temperature/消息/工具)：过期时间 (秒)、最大条目数 (LRU 淘汰)
+# 适合反复运行的测试与 temperature=0 的确定性任务；命中/未命中计入 trace 的 run_end 记录
+# LLM_CACHE_ENABLED=true
+LLM_CACHE_TTL_SECONDS=604800
+LLM_CACHE_MAX_ENTRIES=10000
+
+# 执行轨迹 (.trace/): 单文件轮转大小、总大小上限、保留天数、写入队列长度
+TRACE_MAX_FILE_MB=10
+TRACE_MAX_TOTAL_MB=200
+TRACE_MAX_AGE_DAYS=14
+TRACE_QUEUE_SIZE=10000
+
+# HTTP 服务 (server.py, 如已生成)
+SERVER_HOST=127.0.0.1
+SERVER_PORT=8000
+SERVER_MAX_IN_FLIGHT=8
+SERVER_MAX_QUEUE=64
+SERVER_SHUTDOWN_TIMEOUT=30
 
 # Embedding Configuration (用于 RAG 向量化)
 EMBEDDING_PROVIDER=ollama
 EMBEDDING_MODEL_NAME=nomic-embed-text
 EMBEDDING_BASE_URL=http://localhost:11434
 # EMBEDDING_API_KEY 不需要（Ollama 本地运行）
+# rag_config.json 热更新检查间隔 (秒)，0 表示关闭；检索参数 (k/混合检索/重排序) 修改后无需重启
+RAG_CONFIG_POLL_SECONDS=2
+# RAG 语义缓存：相似问题 (余弦相似度 >= 阈值) 直接返回缓存的回答与来源；向量库/模型/提示词变化后自动失效
+# SEMANTIC_CACHE_ENABLED=true
+SEMANTIC_CACHE_THRESHOLD=0.95
+SEMANTIC_CACHE_MAX_ENTRIES=1000
+SEMANTIC_CACHE_TTL_SECONDS=86400
+# 混合检索的 BM25 索引持久化在向量库目录 (bm25/) 下，段数超过 BM25_MAX_SEGMENTS 时合并最小的 BM25_MERGE_FACTOR 个段
+BM25_MAX_SEGMENTS=8
+BM25_MERGE_FACTOR=4
+# 嵌入缓存：按 (模型, 维度, 文本 sha256) 缓存向量 (float32 内存映射文件 + SQLite 索引)，重建索引时相同文本不再重新嵌入
+EMBEDDING_CACHE_ENABLED=true
+# EMBEDDING_CACHE_DIR=./.embedding_cache
+# 索引嵌入管道：每批 chunk 数、并发请求数、每批失败重试次数与退避基数 (秒)；按嵌入接口的速率限制调整
+EMBED_BATCH_SIZE=64
+EMBED_CONCURRENCY=4
+EMBED_MAX_RETRIES=5
+EMBED_RETRY_BACKOFF_SECONDS=1.0
+# 文档解析 (rag_loader.py)：进程数 (0 = CPU 核数, 最多 4; 仅在有文件需要解析时创建)、最多在途的解析任务数 (0 = 进程数 x 2)、PDF 每个任务的页数
+LOADER_WORKERS=0
+LOADER_MAX_PENDING=0
+LOADER_PDF_PAGES_PER_TASK=16
 
 # Judge API Configuration (用于 DeepEval 测试评估)
 # 如果未配置,DeepEval 将使用 Runtime API
@@ -459,9 +843,12 @@ JUDGE_TIMEOUT=60
 JUDGE_TEMPERATURE=0.0
 """
 
-    def _generate_env_file_content(self) -> str:
+    def _generate_env_file_content(self, generated_at: Optional[str] = None) -> str:
         """Generate .env content populated with current system configuration.
         
+        Args:
+            generated_at: Timestamp for the header (default: now)
+            
         Returns:
             Populated .env content as string
         """
@@ -473,7 +860,7 @@ JUDGE_TEMPERATURE=0.0
             return os.getenv(key, default)
 
         return f"""# Agent Zero - Auto-generated Configuration
-# Generated from system configuration on {datetime.now().isoformat()}
+# Generated from system configuration on {datetime.now().isoformat() if generated_at is None else generated_at}
 # This file is auto-populated with your current environment settings.
 
 # Runtime API Configuration
@@ -483,6 +870,7 @@ RUNTIME_API_KEY={get_val("RUNTIME_API_KEY", "")}
 RUNTIME_BASE_URL={get_val("RUNTIME_BASE_URL", "https://api.deepseek.com")}
 RUNTIME_TIMEOUT={get_val("RUNTIME_TIMEOUT", "30")}
 RUNTIME_TEMPERATURE={get_val("RUNTIME_TEMPERATURE", "0.7")}
+TOOL_TIMEOUT={get_val("TOOL_TIMEOUT", "30")}
 
 # Embedding Configuration
 EMBEDDING_PROVIDER={get_val("EMBEDDING_PROVIDER", "ollama")}
@@ -26,7 +26,7 @@ from ..schemas import (
     SimulationResult,
     SimulationIssue,
 )
-from ..llm import BuilderClient
+from ..llm import BuilderClient, Priority
 
 
 class GraphDesigner:
@@ -887,7 +887,9 @@ Return the full updated GraphStructure JSON.
 """
         
         # 调用 LLM 修复
-        response = await self.builder.call(prompt, schema=GraphStructure)
+        response = await self.builder.call(
+            prompt, schema=GraphStructure, priority=Priority.INTERACTIVE
+        )
         
         # 🔧 后处理: 统一特殊节点为 "END"
         if isinstance(response, dict):
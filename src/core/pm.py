@@ -10,7 +10,7 @@ from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
 from ..schemas import ProjectMeta, TaskType, ExecutionStep
-from ..llm import BuilderClient
+from ..llm import BuilderClient, Priority
 
 
 class PM:
@@ -60,7 +60,8 @@ class PM:
         try:
             response = await self.builder.call(
                 prompt=prompt,
-                schema=ProjectMeta
+                schema=ProjectMeta,
+                priority=Priority.INTERACTIVE
             )
             
             # Parse response as ProjectMeta
@@ -104,7 +105,7 @@ class PM:
         prompt = self._build_clarification_prompt(project_meta)
         
         try:
-            response = await self.builder.call(prompt=prompt)
+            response = await self.builder.call(prompt=prompt, priority=Priority.INTERACTIVE)
             
             # Parse questions from response
             questions = self._parse_questions(response)
@@ -134,7 +135,8 @@ class PM:
         try:
             response = await self.builder.call(
                 prompt=prompt,
-                schema=ProjectMeta
+                schema=ProjectMeta,
+                priority=Priority.INTERACTIVE
             )
             
             if isinstance(response, str):
@@ -372,7 +374,7 @@ IMPORTANT:
         prompt = f"{clarifier_prompt_template}\n\n## Current Task\n\nUser Query: {user_query}{history_text}\n\nAnalyze the completeness and output JSON with: {{\"is_ready\": bool, \"completeness_score\": int, \"clarification_questions\": [...]}}"  
         
         try:
-            response = await self.builder.call(prompt=prompt)
+            response = await self.builder.call(prompt=prompt, priority=Priority.INTERACTIVE)
             
             # Parse JSON response
             result = self._extract_json(response)
@@ -411,7 +413,7 @@ IMPORTANT:
         prompt = f"{planner_prompt_template}\n\n## Task to Plan\n\nAgent Name: {project_meta.agent_name}\nDescription: {project_meta.description}\nTask Type: {project_meta.task_type}\nHas RAG: {project_meta.has_rag}\nUser Intent: {project_meta.user_intent_summary}\n\nGenerate execution plan as JSON: {{\"complexity_score\": int, \"execution_plan\": [...]}}"  
         
         try:
-            response = await self.builder.call(prompt=prompt)
+            response = await self.builder.call(prompt=prompt, priority=Priority.INTERACTIVE)
             
             # Parse JSON response
             result = self._extract_json(response)
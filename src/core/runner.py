@@ -71,44 +71,31 @@ class Runner:
     # 🆕 Helper to print trace
     def _print_trace(self, agent_dir: Path):
         try:
-            # 尝试加载最新的 trace
-            trace_dir = agent_dir / ".trace"
-            if trace_dir.exists():
-                trace_files = sorted(trace_dir.glob("*.json"), key=os.path.getmtime, reverse=True)
-                if trace_files:
-                    latest_trace = trace_files[0]
-                    from src.utils.trace_visualizer import print_trace_summary
-                    
-                    # Load json
-                    with open(latest_trace, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    # Mock SimulationResult object for compatibility if needed, 
-                    # or just pass dict if supported.
-                    # Assuming print_trace_summary takes a dict or we need to construct object.
-                    # For simplicity, let's implement a simple printer here or use the util if adapted.
-                    print("\n" + "="*50)
-                    print("📊 Agent Execution Trace Summary")
-                    print("="*50)
-                    
-                    steps = data.get("steps", [])
-                    print(f"Total Steps: {len(steps)}")
-                    print(f"Status: {'✅ Success' if data.get('success') else '❌ Failed'}")
-                    
-                    print("\nExecution Flow:")
-                    for step in steps:
-                        icon = "✅" if step.get('step_type') == 'success' else "❌" if step.get('step_type') == 'failed' else "➡️"
-                        print(f"  {icon} [{step.get('node_id')}] {step.get('description')}")
-                        if step.get('tool_calls'):
-                             for tc in step['tool_calls']:
-                                 print(f"     🔨 Tool: {tc.get('tool_name')}")
-                    
-                    if data.get("issues"):
-                        print("\n⚠️  Issues Detected:")
-                        for issue in data['issues']:
-                            print(f"  - [{issue.get('severity')}] {issue.get('description')}")
-                    print("="*50 + "\n")
-                    
+            from src.utils.trace_store import list_runs, read_run
+
+            runs = list_runs(agent_dir, limit=1)
+            if not runs:
+                return
+            run = runs[0]
+            entries = read_run(agent_dir, run["run_id"])
+
+            print("\n" + "="*50)
+            print("📊 Agent Execution Trace Summary")
+            print("="*50)
+            print(f"Run: {run['run_id']}")
+            print(f"Total Steps: {len(entries)}")
+            print(f"Status: {'✅ Complete' if run['complete'] else '⏳ Incomplete'}")
+
+            print("\nExecution Flow:")
+            for entry in entries:
+                print(f"  ➡️ [{entry.get('node_id')}] {entry.get('action', entry.get('node_type', ''))}")
+                if entry.get("action") == "tool_call":
+                    for tc in entry.get("tool_calls") or [{"name": entry.get("tool_name"), "status": "ok"}]:
+                        print(f"     🔨 Tool: {tc.get('name')} ({tc.get('status')})")
+                elif entry.get("action") == "rag_retrieval":
+                    print(f"     📚 Docs: {entry.get('num_docs', 0)}")
+            print("="*50 + "\n")
+
         except Exception as e:
             print(f"⚠️ Failed to print trace summary: {e}")
     
@@ -190,6 +177,17 @@ class Runner:
         
         if not script_path.exists():
             return False
+        
+        # 依赖未变化 (requirements + 安装脚本) 且 venv 仍在时跳过重装
+        stamp_file = self.agent_dir / ".install_stamp"
+        fingerprint = self._install_fingerprint(script_path)
+        if (
+            (self.agent_dir / "venv").exists()
+            and stamp_file.exists()
+            and stamp_file.read_text(encoding="utf-8") == fingerprint
+        ):
+            print("✓ 依赖未变化，跳过安装")
+            return True
             
         try:
             cmd = str(script_path.absolute()) if subprocess.os.name == "nt" else str(script_path.absolute())
@@ -202,10 +200,20 @@ class Runner:
                 check=True, 
                 shell=(subprocess.os.name == "nt")
             )
+            stamp_file.write_text(fingerprint, encoding="utf-8")
             return True
         except Exception as e:
             print(f"Installation failed: {e}")
             return False
+
+    def _install_fingerprint(self, script_path: Path) -> str:
+        """依赖指纹: requirements.txt 与安装脚本内容的哈希"""
+        import hashlib
+        sha = hashlib.sha256()
+        for path in (self.agent_dir / "requirements.txt", script_path):
+            if path.exists():
+                sha.update(path.read_bytes())
+        return sha.hexdigest()
     
     def run_deepeval_tests(
         self,
@@ -495,3 +503,15 @@ class Runner:
             test_results=[],  # 简化版
             stderr=stderr if stderr else None
         )
+
+
+def setup_agent_environment(agent_dir: str) -> bool:
+    """安装 Agent 依赖 (模块级函数，可提交到进程池执行)
+
+    Args:
+        agent_dir: Agent 项目目录
+
+    Returns:
+        是否安装成功
+    """
+    return Runner(Path(agent_dir)).setup_environment()
@@ -0,0 +1,122 @@
+"""Step Executor - dependency-aware concurrent pipeline stages.
+
+AgentFactory stages declare which earlier stages they depend on; every stage
+starts as soon as its dependencies finish, so independent branches (PM
+analysis vs. file profiling, RAG design vs. tool selection) overlap and the
+wall-clock time approaches the slowest branch instead of the sum.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+StepFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class StepExecutor:
+    """Runs async pipeline steps concurrently, respecting declared dependencies.
+
+    Example:
+        executor = StepExecutor()
+        executor.add_step("pm", lambda r: pm.analyze(...))
+        executor.add_step("profile", lambda r: asyncio.to_thread(profiler.analyze, paths))
+        executor.add_step("rag", lambda r: rag_builder.design(r["profile"]), depends_on=["pm", "profile"])
+        executor.add_step("tools", lambda r: tool_selector.select(r["pm"]), depends_on=["pm"])
+        results = await executor.run()
+    """
+
+    def __init__(self):
+        """Initialize an empty pipeline."""
+        self._steps: Dict[str, StepFunc] = {}
+        self._deps: Dict[str, List[str]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add_step(
+        self,
+        name: str,
+        func: StepFunc,
+        depends_on: Optional[List[str]] = None,
+    ) -> "StepExecutor":
+        """Register a step.
+
+        Args:
+            name: Unique step name (key in the results dict)
+            func: Coroutine function receiving the results of its dependencies
+            depends_on: Names of steps that must finish first
+
+        Returns:
+            self, for chaining
+        """
+        if name in self._steps:
+            raise ValueError(f"Duplicate step: {name}")
+        self._steps[name] = func
+        self._deps[name] = list(depends_on or [])
+        return self
+
+    def wait_for(self, name: str) -> "asyncio.Task":
+        """Return the running task of a step, for optional late awaiting.
+
+        Unlike ``depends_on``, this lets a step start right away and only
+        wait for another step's result on the code path that needs it.
+        Must be called while ``run()`` is in progress.
+
+        Args:
+            name: Step name
+
+        Returns:
+            Awaitable task yielding the step's result
+        """
+        return self._tasks[name]
+
+    def _check_graph(self) -> None:
+        """Reject unknown dependencies and cycles before anything starts."""
+        for name, deps in self._deps.items():
+            for dep in deps:
+                if dep not in self._steps:
+                    raise ValueError(f"Step '{name}' depends on unknown step '{dep}'")
+
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected at step '{name}'")
+            visiting.add(name)
+            for dep in self._deps[name]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self._steps:
+            visit(name)
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all steps and return their results.
+
+        If any step fails, the remaining steps are cancelled and the first
+        error is re-raised.
+
+        Returns:
+            Dict mapping step name to result
+        """
+        self._check_graph()
+        tasks = self._tasks = {}
+
+        async def run_step(name: str) -> Any:
+            dep_results = {}
+            for dep in self._deps[name]:
+                dep_results[dep] = await tasks[dep]
+            return await self._steps[name](dep_results)
+
+        for name in self._steps:
+            tasks[name] = asyncio.create_task(run_step(name), name=f"step:{name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
@@ -10,6 +10,7 @@ from typing import Dict, Any, List, Optional
 from pathlib import Path
 
 from ..llm.builder_client import BuilderClient
+from ..llm.request_scheduler import Priority
 from ..schemas.test_report import IterationReport, TestCaseReport
 from ..schemas.analysis_result import AnalysisResult, FixStep
 
@@ -58,7 +59,7 @@ class TestAnalyzer:
         
         # 3. 调用 LLM
         try:
-            response = await self.llm.call(prompt)
+            response = await self.llm.call(prompt, priority=Priority.BACKGROUND)
             
             # 4. 解析结果
             return self._parse_analysis_response(response)
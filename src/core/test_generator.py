@@ -13,6 +13,7 @@ from pathlib import Path
 import json
 
 from src.llm.builder_client import BuilderClient
+from src.llm.request_scheduler import Priority
 from src.schemas.project_meta import ProjectMeta, TaskType
 from src.schemas.rag_config import RAGConfig
 
@@ -93,6 +94,9 @@ class TestGenerator:
         )
         sections.append(logic_tests)
         
+        # 5. 性能基准 (图复用开销, 不调用 LLM)
+        sections.append(self._generate_graph_reuse_benchmark())
+        
         return "\n\n".join(sections)
     
     def _generate_imports(self, config: DeepEvalTestConfig) -> str:
@@ -235,11 +239,8 @@ def test_rag_fact_{i}():
     rag_steps = [s for s in trace if s.get("action") == "rag_retrieval"]
     retrieved_docs = []
     if rag_steps:
-        # 加载完整文档内容 (从外部文件)
-        docs_file = rag_steps[0].get("docs_file")
-        if docs_file:
-            with open(docs_file, 'r', encoding='utf-8') as f:
-                retrieved_docs = json.load(f)
+        # 加载完整文档内容 (从 .trace/docs 按哈希读取)
+        retrieved_docs = agent._trace_manager.load_docs(rag_steps[0].get("doc_hashes", []))
     
     # 构造测试用例
     test_case = LLMTestCase(
@@ -310,7 +311,26 @@ def test_rag_fact_{i}():
             
             # 4. 调用 LLM
             print(f"🤖 [调试] 步骤 4/5: 调用 LLM 生成问答对...")
-            response = await self.llm.call(prompt)  # 使用 call() 而非 generate()
+            # 流式接收: 每个问答对完整到达时即打印进度，开头废话过长时提前中止重试
+            # (格式有误的完整响应仍交给下面的 _parse_json_response 修复)
+            streamed_pairs = []
+
+            def _on_qa_pair(item):
+                streamed_pairs.append(item)
+                if isinstance(item, dict):
+                    print(f"   📨 [调试] 收到问答对 {len(streamed_pairs)}: {str(item.get('question', ''))[:40]}")
+
+            def _on_retry():
+                streamed_pairs.clear()
+                print(f"   🔁 [调试] 响应已中止, 重新生成问答对")
+
+            response = await self.llm.stream_json(
+                prompt,
+                on_item=_on_qa_pair,
+                expect="array",
+                priority=Priority.BACKGROUND,
+                on_retry=_on_retry,
+            )
             print(f"✅ [调试] LLM 响应成功, 长度: {len(response)} 字符")
             print(f"📋 [调试] LLM 响应预览 (前 200 字符):\n{response[:200]}...")
             
@@ -563,7 +583,7 @@ def test_tool_usage_correctness():
         async def _arun(self, query: str) -> str:
             return self._run(query)
     
-    with patch('agent.tools') as mock_tools:
+    with patch('agent.tools') as mock_tools, patch.dict(getattr(agent, "NODE_LLMS", {{}})):
         # 使用真实的 BaseTool 子类
         mock_tool = MockTavilyTool()
         
@@ -571,6 +591,9 @@ def test_tool_usage_correctness():
         mock_tools.__iter__.return_value = [mock_tool]
         mock_tools.__len__.return_value = 1
         
+        # 预绑定的节点 LLM 改为绑定 Mock 工具 (退出 with 时恢复)
+        if hasattr(agent, "bind_node_tools"):
+            agent.bind_node_tools()
         
         # 运行 Agent
         output, trace = run_agent(query, return_trace=True)
@@ -655,6 +678,34 @@ def test_basic_response():
 '''
         return test_func
 
+    def _generate_graph_reuse_benchmark(self) -> str:
+        """生成图复用微基准测试 (对比每次构建与进程级缓存的单次开销)"""
+        return '''
+# ==================== 性能 - 图复用微基准 ====================
+# 对比每次运行都重新构建/编译图 (旧行为) 与复用进程级已编译图的开销
+
+def test_graph_reuse_overhead():
+    """基准: 每次调用的图构建开销 (之前 vs 之后)"""
+    import time
+
+    iterations = 20
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        agent.create_graph()
+    rebuild_ms = (time.perf_counter() - start) * 1000 / iterations
+
+    agent.get_graph()  # 预热
+    start = time.perf_counter()
+    for _ in range(iterations):
+        agent.get_graph()
+    cached_ms = (time.perf_counter() - start) * 1000 / iterations
+
+    print(f"⏱️ 每次调用图开销: 重新构建 {rebuild_ms:.3f} ms -> 复用 {cached_ms:.3f} ms")
+    assert agent.get_graph() is agent.get_graph(), "get_graph() 应返回同一个已编译图"
+    assert cached_ms < rebuild_ms, "复用已编译图应快于每次重新构建"
+'''
+
 
 # ==================== 辅助函数 ====================
 
@@ -2,6 +2,10 @@
 
 from .builder_client import BuilderClient, BuilderAPIConfig
 from .runtime_client import RuntimeClient, RuntimeAPIConfig
+from .response_cache import ResponseCache, CacheMissError
+from .capability_registry import CapabilityRegistry
+from .request_scheduler import RequestScheduler, Priority, get_scheduler
+from .http_pool import HTTPPoolConfig, configure_http_pool, get_http_client, get_async_http_client
 from .health_check import (
     HealthStatus,
     HealthCheckResult,
@@ -15,6 +19,16 @@ __all__ = [
     "BuilderAPIConfig",
     "RuntimeClient",
     "RuntimeAPIConfig",
+    "ResponseCache",
+    "CacheMissError",
+    "CapabilityRegistry",
+    "RequestScheduler",
+    "Priority",
+    "get_scheduler",
+    "HTTPPoolConfig",
+    "configure_http_pool",
+    "get_http_client",
+    "get_async_http_client",
     "HealthStatus",
     "HealthCheckResult",
     "check_builder_api",
@@ -1,10 +1,12 @@
 """Builder API client for construction-time LLM calls."""
 
-from typing import Optional, Type, Any, TypeVar
+from contextlib import aclosing
+from typing import Optional, Type, Any, TypeVar, Callable, Tuple
 from pydantic import BaseModel, Field
 import httpx
 import os
 import json
+from pathlib import Path
 
 # Optional imports for different providers
 try:
@@ -19,7 +21,11 @@ try:
 except ImportError:
     HAS_ANTHROPIC = False
 
-from src.utils.json_utils import extract_json_from_text
+from src.utils.json_utils import extract_json_from_text, IncrementalJSONParser, JSONStreamError
+from .response_cache import ResponseCache
+from .capability_registry import CapabilityRegistry, NATIVE_STRUCTURED_OUTPUT
+from .request_scheduler import Priority, get_scheduler
+from .http_pool import get_http_client, get_async_http_client
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -32,8 +38,22 @@ class BuilderAPIConfig(BaseModel):
     api_key: str = Field(..., description="API key")
     base_url: Optional[str] = Field(default=None, description="Custom base URL")
     timeout: int = Field(default=60, description="Timeout in seconds")
-    max_retries: int = Field(default=3, description="Maximum retry attempts")
+    max_retries: int = Field(default=3, description="Retries on connection/timeout/5xx errors")
     temperature: float = Field(default=0.7, ge=0.0, le=2.0, description="Temperature")
+    cache_mode: str = Field(default="off", description="Response cache mode (off/on/replay)")
+    cache_dir: str = Field(default=".cache/builder", description="Response cache directory")
+    cache_ttl_seconds: int = Field(default=7 * 24 * 3600, description="Cache entry TTL (0 = forever)")
+    cache_max_size_mb: float = Field(default=256.0, description="Cache size budget for LRU eviction")
+    max_concurrency: int = Field(default=4, ge=1, description="Max in-flight requests per endpoint")
+    tokens_per_minute: int = Field(default=0, ge=0, description="Token budget per minute (0 = unlimited)")
+    rate_limit_retries: int = Field(default=5, ge=0, description="Retries on 429 rate-limit errors")
+    stream_retries: int = Field(default=1, ge=0, description="Retries after an early-aborted JSON stream")
+    capability_file: str = Field(
+        default=".cache/llm_capabilities.json", description="Persisted endpoint capability registry"
+    )
+    capability_reprobe_seconds: int = Field(
+        default=24 * 3600, description="Re-probe recorded capabilities after this many seconds (0 = never)"
+    )
 
 
 class BuilderClient:
@@ -52,6 +72,19 @@ class BuilderClient:
         """
         self.config = config
         self.client = self._init_client(config)
+        self.cache = self._init_cache(config)
+        self.scheduler = get_scheduler(
+            config.provider,
+            config.base_url,
+            max_concurrency=config.max_concurrency,
+            tokens_per_minute=config.tokens_per_minute,
+            max_retries=config.rate_limit_retries,
+            transient_retries=config.max_retries,
+        )
+        self.capabilities = CapabilityRegistry(
+            Path(config.capability_file),
+            reprobe_seconds=config.capability_reprobe_seconds,
+        )
 
         # 🆕 Phase 5: Token 统计
         self.token_stats = {
@@ -82,7 +115,12 @@ class BuilderClient:
                 base_url=config.base_url,
                 temperature=config.temperature,
                 timeout=config.timeout,
-                max_retries=config.max_retries,
+                # 重试 (含 429) 统一由 RequestScheduler 负责: SDK 内部重试会占着调度槽位
+                # 并对调度器的限流退避和统计不可见
+                max_retries=0,
+                # 进程级共享连接池: 同一端点的所有客户端复用 keep-alive 连接
+                http_client=get_http_client(config.base_url, config.provider),
+                http_async_client=get_async_http_client(config.base_url, config.provider),
             )
         elif config.provider == "anthropic":
             if not HAS_ANTHROPIC:
@@ -90,43 +128,93 @@ class BuilderClient:
                     "langchain-anthropic is not installed. "
                     "Install it with: pip install langchain-anthropic"
                 )
+            # langchain-anthropic 已按 base_url 缓存共享的 httpx 客户端，无需注入
             return ChatAnthropic(
                 model=config.model,
                 api_key=config.api_key,
                 temperature=config.temperature,
                 timeout=config.timeout,
-                max_retries=config.max_retries,
+                max_retries=0,  # 同上: 由 RequestScheduler 重试
             )
         else:
             raise ValueError(f"Unsupported provider: {config.provider}")
 
+    def _init_cache(self, config: BuilderAPIConfig) -> Optional[ResponseCache]:
+        """Initialize the response cache according to ``cache_mode``.
+
+        Args:
+            config: Builder API configuration
+
+        Returns:
+            ResponseCache, or None when caching is disabled
+        """
+        if config.cache_mode not in ResponseCache.MODES:
+            raise ValueError(f"Unsupported cache mode: {config.cache_mode}")
+        if config.cache_mode == "off":
+            return None
+        return ResponseCache(
+            Path(config.cache_dir),
+            ttl_seconds=config.cache_ttl_seconds,
+            max_size_mb=config.cache_max_size_mb,
+            replay_only=config.cache_mode == "replay",
+        )
+
+    def _cache_key(
+        self, prompt: str, temperature: float, schema: Optional[dict] = None
+    ) -> Optional[str]:
+        """Build the response cache key for a request (None if caching is off)."""
+        if self.cache is None:
+            return None
+        return ResponseCache.make_key(
+            provider=self.config.provider,
+            model=self.config.model,
+            temperature=temperature,
+            prompt=prompt,
+            schema=schema,
+            base_url=self.config.base_url,
+        )
+
     async def call(
-        self, prompt: str, schema: Optional[Type[BaseModel]] = None
+        self,
+        prompt: str,
+        schema: Optional[Type[BaseModel]] = None,
+        priority: Priority = Priority.NORMAL,
     ) -> str | BaseModel:
         """Call Builder API with optional structured output.
 
         Args:
             prompt: Input prompt
             schema: Optional Pydantic schema for structured output
+            priority: Scheduling priority of the request
 
         Returns:
             Response string or structured output
         """
         if schema:
             # Use new universal structured generator
-            return await self.generate_structured(prompt, schema)
+            return await self.generate_structured(prompt, schema, priority=priority)
         else:
+            cache_key = self._cache_key(prompt, self.config.temperature)
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
             # Regular text output
-            response = await self.client.ainvoke(prompt)
+            response = await self._ainvoke(self.client, prompt, priority)
             # 🆕 Phase 5: 统计 Token
             self._update_token_stats(response)
+
+            if cache_key and isinstance(response.content, str):
+                self.cache.put(cache_key, response.content)
             return response.content
 
     async def generate_structured(
         self, 
         prompt: str, 
         response_model: Type[T],
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        priority: Priority = Priority.NORMAL,
     ) -> T:
         """
         通用的结构化输出生成器
@@ -136,6 +224,7 @@ class BuilderClient:
             prompt: 输入提示词
             response_model: Pydantic 模型类
             temperature: 可选的温度参数
+            priority: 调度优先级
         
         Returns:
             验证后的 Pydantic 模型实例
@@ -146,16 +235,47 @@ class BuilderClient:
         schema = response_model.model_json_schema()
         schema_str = json.dumps(schema, indent=2, ensure_ascii=False)
 
+        # 命中缓存则直接返回 (replay 模式下未命中会抛出 CacheMissError)
+        cache_key = self._cache_key(prompt, temp, schema)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return response_model.model_validate_json(cached)
+
+        result = await self._generate_structured_uncached(
+            prompt, response_model, schema_str, temp, priority
+        )
+
+        if cache_key and isinstance(result, BaseModel):
+            self.cache.put(cache_key, result.model_dump_json())
+        return result
+
+    async def _generate_structured_uncached(
+        self,
+        prompt: str,
+        response_model: Type[T],
+        schema_str: str,
+        temp: float,
+        priority: Priority = Priority.NORMAL,
+    ) -> T:
+        """Run the native structured call, falling back to prompt-enforced JSON."""
+        # 已知该端点不支持原生 JSON 模式: 直接走 Prompt 增强模式，省掉一次注定失败的请求
+        if self._native_structured_supported() is False:
+            return await self._generate_structured_fallback(
+                prompt, response_model, schema_str, temp, priority
+            )
+
         # -------------------------------------------------------
         # 尝试 1: 原生支持模式 (LangChain with_structured_output)
         # -------------------------------------------------------
         try:
             structured_llm = self.client.with_structured_output(response_model)
-            result = await structured_llm.ainvoke(prompt)
+            result = await self._ainvoke(structured_llm, prompt, priority)
             # 🆕 Phase 5: 统计 Token (尝试从 result 中提取)
             if hasattr(result, '__dict__'):
                 # 如果 result 是对象，尝试获取原始响应
                 pass  # structured output 通常不包含 usage 信息
+            self._record_native_structured(True)
             return result
 
         except Exception as e:
@@ -168,19 +288,72 @@ class BuilderClient:
                 "bad request", "invalid_request_error"
             ]):
                 print(f"⚠️  API 不支持原生 JSON 模式，切换到 Prompt 增强模式...")
+                self._record_native_structured(False)
                 return await self._generate_structured_fallback(
-                    prompt, response_model, schema_str, temp
+                    prompt, response_model, schema_str, temp, priority
                 )
             else:
                 # 其他错误（如余额不足）直接抛出
                 raise e
 
+    async def _ainvoke(self, runnable: Any, prompt: str, priority: Priority) -> Any:
+        """Invoke a runnable through the shared request scheduler.
+
+        Args:
+            runnable: LLM client or structured-output runnable
+            prompt: Input prompt
+            priority: Scheduling priority
+
+        Returns:
+            Raw runnable result
+        """
+        # 粗略估算: 1 token ≈ 4 字符 (与 Profiler 一致)
+        estimated_tokens = len(prompt) // 4
+        response = await self.scheduler.submit(
+            lambda: runnable.ainvoke(prompt),
+            priority=priority,
+            estimated_tokens=estimated_tokens,
+        )
+
+        usage = getattr(response, "response_metadata", None) or {}
+        usage = usage.get("token_usage") if isinstance(usage, dict) else None
+        if usage:
+            self.scheduler.record_usage(
+                estimated_tokens,
+                usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0),
+            )
+        return response
+
+    def _native_structured_supported(self) -> Optional[bool]:
+        """Look up whether this endpoint supports native structured output.
+
+        Returns:
+            True/False if known, None if it still needs to be probed
+        """
+        return self.capabilities.get(
+            self.config.provider,
+            self.config.base_url,
+            self.config.model,
+            NATIVE_STRUCTURED_OUTPUT,
+        )
+
+    def _record_native_structured(self, supported: bool):
+        """Persist the outcome of a native structured output attempt."""
+        self.capabilities.record(
+            self.config.provider,
+            self.config.base_url,
+            self.config.model,
+            NATIVE_STRUCTURED_OUTPUT,
+            supported,
+        )
+
     async def _generate_structured_fallback(
         self, 
         prompt: str, 
         response_model: Type[T], 
         schema_str: str,
-        temperature: float
+        temperature: float,
+        priority: Priority = Priority.NORMAL,
     ) -> T:
         """
         回退模式：通过 Prompt 强制模型输出 JSON，并使用正则提取
@@ -190,6 +363,7 @@ class BuilderClient:
             response_model: Pydantic 模型类
             schema_str: JSON Schema 字符串
             temperature: 温度参数
+            priority: 调度优先级
         
         Returns:
             验证后的 Pydantic 模型实例
@@ -206,16 +380,14 @@ class BuilderClient:
             f"Your response (JSON only):"
         )
 
-        # 2. 普通文本模式调用
-        response = await self.client.ainvoke(fallback_prompt)
-        raw_text = response.content
-
-        # 🆕 Phase 5: 统计 Token
-        self._update_token_stats(response)
+        # 2. 流式调用: 边接收边校验，开头废话过长时提前中止并重试
+        raw_text, parser, _ = await self._stream_json_completion(
+            fallback_prompt, expect="object", priority=priority
+        )
 
         # 3. 清洗和解析
         try:
-            json_str = extract_json_from_text(raw_text)
+            json_str = extract_json_from_text(parser.document or raw_text)
         except ValueError as e:
             print(f"❌ JSON 提取失败: {e}")
             print(f"原始文本: {raw_text[:200]}...")
@@ -229,6 +401,116 @@ class BuilderClient:
             print(f"提取的 JSON: {json_str[:200]}...")
             raise ValueError(f"Failed to validate JSON against schema: {e}")
 
+    async def stream_json(
+        self,
+        prompt: str,
+        on_item: Optional[Callable[[Any], None]] = None,
+        expect: Optional[str] = "array",
+        items_key: Optional[str] = None,
+        priority: Priority = Priority.NORMAL,
+        on_retry: Optional[Callable[[], None]] = None,
+    ) -> str:
+        """Stream a JSON completion, handing list items to ``on_item`` as they arrive.
+
+        A completion that opens with a long prose preamble is aborted early and
+        retried; ``on_retry`` is called before each retry, after which
+        ``on_item`` sees the retried completion from its first item. Other
+        malformed output is returned as-is for the caller to repair.
+
+        Args:
+            prompt: Input prompt
+            on_item: Callback for each completed list element
+            expect: Expected top-level JSON type ("array"/"object"/None)
+            items_key: Array field of a top-level object to stream items from
+            priority: Scheduling priority of the request
+            on_retry: Callback invoked when an aborted attempt is retried
+
+        Returns:
+            Raw completion text, so callers can still apply their own repair
+        """
+        cache_key = self._cache_key(prompt, self.config.temperature)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if on_item:
+                    try:
+                        items = IncrementalJSONParser(expect, items_key).feed(cached)
+                    except JSONStreamError:
+                        items = []
+                    for item in items:
+                        on_item(item)
+                return cached
+
+        raw_text, parser, completed = await self._stream_json_completion(
+            prompt, expect=expect, items_key=items_key, on_item=on_item,
+            priority=priority, on_retry=on_retry,
+        )
+
+        # 只缓存正常结束且解析出完整 JSON 的结果，中止或待修复的文本不能被重放
+        if cache_key and completed and parser.done and not parser.malformed:
+            self.cache.put(cache_key, raw_text)
+        return raw_text
+
+    async def _stream_json_completion(
+        self,
+        prompt: str,
+        expect: Optional[str] = None,
+        items_key: Optional[str] = None,
+        on_item: Optional[Callable[[Any], None]] = None,
+        priority: Priority = Priority.NORMAL,
+        on_retry: Optional[Callable[[], None]] = None,
+    ) -> Tuple[str, IncrementalJSONParser, bool]:
+        """Stream a completion through an IncrementalJSONParser with early-abort retries.
+
+        Returns:
+            (raw completion text, parser of the last attempt, whether that
+            attempt completed); if every attempt was aborted, the text of the
+            last one is returned for the caller's extraction/repair to handle
+        """
+        attempts = 1 + self.config.stream_retries
+        for attempt in range(attempts):
+            if attempt and on_retry:
+                on_retry()
+            parser = IncrementalJSONParser(expect=expect, items_key=items_key)
+            try:
+                response = await self.scheduler.submit(
+                    lambda: self._consume_stream(prompt, parser, on_item),
+                    priority=priority,
+                    estimated_tokens=len(prompt) // 4,
+                )
+            except JSONStreamError as e:
+                print(f"⚠️  流式 JSON 校验失败, 已提前中止 ({attempt + 1}/{attempts}): {e}")
+                continue
+
+            # 🆕 Phase 5: 统计 Token
+            self._update_token_stats(response)
+            return parser.buffer, parser, True
+
+        return parser.buffer, parser, False
+
+    async def _consume_stream(
+        self,
+        prompt: str,
+        parser: IncrementalJSONParser,
+        on_item: Optional[Callable[[Any], None]],
+    ) -> Any:
+        """Read a token stream into the parser; stop as soon as the JSON value closes.
+
+        Returns:
+            Aggregated message chunk (for token statistics)
+        """
+        aggregated = None
+        async with aclosing(self.client.astream(prompt)) as stream:
+            async for chunk in stream:
+                aggregated = chunk if aggregated is None else aggregated + chunk
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                for item in parser.feed(text):
+                    if on_item:
+                        on_item(item)
+                if parser.done:
+                    break
+        return aggregated
+
     async def health_check(self) -> bool:
         """Check API connectivity.
 
@@ -257,6 +539,14 @@ class BuilderClient:
         if hasattr(response, 'response_metadata'):
             usage = response.response_metadata.get('token_usage')
 
+        # 流式响应聚合后的 usage_metadata (input_tokens / output_tokens)
+        usage_metadata = getattr(response, 'usage_metadata', None)
+        if not usage and isinstance(usage_metadata, dict):
+            usage = {
+                'prompt_tokens': usage_metadata.get('input_tokens', 0),
+                'completion_tokens': usage_metadata.get('output_tokens', 0),
+            }
+
         # 或者直接有 usage 属性
         if not usage and hasattr(response, 'usage'):
             usage = response.usage
@@ -360,6 +650,16 @@ class BuilderClient:
             timeout=int(os.getenv("BUILDER_TIMEOUT", "60")),
             max_retries=int(os.getenv("BUILDER_MAX_RETRIES", "3")),
             temperature=float(os.getenv("BUILDER_TEMPERATURE", "0.7")),
+            cache_mode=os.getenv("BUILDER_CACHE_MODE", "off"),
+            cache_dir=os.getenv("BUILDER_CACHE_DIR", ".cache/builder"),
+            cache_ttl_seconds=int(os.getenv("BUILDER_CACHE_TTL", str(7 * 24 * 3600))),
+            cache_max_size_mb=float(os.getenv("BUILDER_CACHE_MAX_MB", "256")),
+            max_concurrency=int(os.getenv("BUILDER_MAX_CONCURRENCY", "4")),
+            tokens_per_minute=int(os.getenv("BUILDER_TPM", "0")),
+            rate_limit_retries=int(os.getenv("BUILDER_RATE_LIMIT_RETRIES", "5")),
+            stream_retries=int(os.getenv("BUILDER_STREAM_RETRIES", "1")),
+            capability_file=os.getenv("BUILDER_CAPABILITY_FILE", ".cache/llm_capabilities.json"),
+            capability_reprobe_seconds=int(os.getenv("BUILDER_CAPABILITY_REPROBE", str(24 * 3600))),
         )
         return cls(config)
 
@@ -0,0 +1,104 @@
+"""Persisted registry of per-endpoint LLM capabilities.
+
+Some OpenAI-compatible endpoints (e.g. DeepSeek) reject ``response_format``.
+Instead of paying a failing round trip on every structured call, the
+outcome of the first attempt is recorded per (provider, base_url, model)
+and reused until ``reprobe_seconds`` have passed.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.utils.config_utils import atomic_write_json, load_json_safe
+
+NATIVE_STRUCTURED_OUTPUT = "native_structured_output"
+
+
+class CapabilityRegistry:
+    """JSON-file backed capability registry.
+
+    Each entry looks like::
+
+        {"openai|https://api.deepseek.com|deepseek-chat": {
+            "native_structured_output": {"supported": false, "checked_at": 1700000000.0}
+        }}
+    """
+
+    def __init__(self, path: Path, reprobe_seconds: int = 24 * 3600):
+        """Load the registry from disk.
+
+        Args:
+            path: JSON file used for persistence
+            reprobe_seconds: Age after which a recorded capability is re-probed
+                (0 = never re-probe)
+        """
+        self.path = Path(path)
+        self.reprobe_seconds = reprobe_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = load_json_safe(self.path, default={}) or {}
+
+    @staticmethod
+    def endpoint_key(provider: str, base_url: Optional[str], model: str) -> str:
+        """Build the registry key for an endpoint."""
+        return f"{provider}|{(base_url or '').rstrip('/')}|{model}"
+
+    def get(
+        self, provider: str, base_url: Optional[str], model: str, capability: str
+    ) -> Optional[bool]:
+        """Return a recorded capability, or None if unknown or due for re-probing.
+
+        Args:
+            provider: API provider
+            base_url: Custom base URL (None for the provider default)
+            model: Model name
+            capability: Capability name, e.g. ``NATIVE_STRUCTURED_OUTPUT``
+
+        Returns:
+            True/False if a fresh record exists, otherwise None
+        """
+        key = self.endpoint_key(provider, base_url, model)
+        with self._lock:
+            record = self._entries.get(key, {}).get(capability)
+        if not record or self._is_stale(record):
+            return None
+        return bool(record.get("supported"))
+
+    def record(
+        self,
+        provider: str,
+        base_url: Optional[str],
+        model: str,
+        capability: str,
+        supported: bool,
+    ) -> None:
+        """Record a probe result and persist it.
+
+        Args:
+            provider: API provider
+            base_url: Custom base URL (None for the provider default)
+            model: Model name
+            capability: Capability name
+            supported: Whether the capability works on this endpoint
+        """
+        key = self.endpoint_key(provider, base_url, model)
+        with self._lock:
+            previous = self._entries.get(key, {}).get(capability)
+            # Unchanged and still fresh: nothing to persist
+            if previous and previous.get("supported") is supported and not self._is_stale(previous):
+                return
+            self._entries.setdefault(key, {})[capability] = {
+                "supported": supported,
+                "checked_at": time.time(),
+            }
+            try:
+                atomic_write_json(self.path, self._entries)
+            except OSError as e:
+                print(f"⚠️  无法保存能力注册表: {e}")
+
+    def _is_stale(self, record: Dict[str, Any]) -> bool:
+        """Check whether a record is older than the re-probe interval."""
+        if not self.reprobe_seconds:
+            return False
+        return time.time() - record.get("checked_at", 0) > self.reprobe_seconds
@@ -8,6 +8,7 @@ from pydantic import BaseModel, Field
 
 from .builder_client import BuilderClient, BuilderAPIConfig
 from .runtime_client import RuntimeClient, RuntimeAPIConfig
+from .http_pool import get_async_http_client
 
 
 class HealthStatus(str, Enum):
@@ -87,9 +88,9 @@ async def check_runtime_api(config: RuntimeAPIConfig) -> HealthCheckResult:
         # For Ollama, check if the server is running
         if config.provider == "ollama":
             base_url = config.base_url or "http://localhost:11434"
-            async with httpx.AsyncClient(timeout=config.timeout) as client:
-                response = await client.get(f"{base_url}/api/tags")
-                response.raise_for_status()
+            client = get_async_http_client(base_url, config.provider)
+            response = await client.get(f"{base_url}/api/tags", timeout=config.timeout)
+            response.raise_for_status()
 
             response_time = int((time.time() - start_time) * 1000)
 
@@ -115,12 +116,14 @@ async def check_runtime_api(config: RuntimeAPIConfig) -> HealthCheckResult:
                 else "https://api.anthropic.com"
             )
 
-            async with httpx.AsyncClient(timeout=config.timeout) as client:
-                # Just check if the endpoint is reachable
-                response = await client.get(
-                    base_url,
-                    headers={"Authorization": f"Bearer {config.api_key}"},
-                )
+            # Just check if the endpoint is reachable (pooled connection is
+            # reused by the builder/runtime clients afterwards)
+            client = get_async_http_client(base_url, config.provider)
+            response = await client.get(
+                base_url,
+                headers={"Authorization": f"Bearer {config.api_key}"},
+                timeout=config.timeout,
+            )
 
             response_time = int((time.time() - start_time) * 1000)
 
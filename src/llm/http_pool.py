@@ -0,0 +1,184 @@
+"""Process-wide pooled HTTP transport for LLM clients.
+
+Every BuilderClient, health check and UI page used to build its own HTTP
+client, so each paid for its own connection pool and TLS handshakes. This
+module keeps one keep-alive ``httpx.Client`` and one ``httpx.AsyncClient``
+per origin (scheme + host + port) for the whole process.
+
+HTTP/2 is negotiated via ALPN when the optional ``h2`` package is installed
+(``pip install httpx[http2]``); servers without HTTP/2 fall back to HTTP/1.1.
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+import weakref
+from typing import Dict, Optional
+
+import httpx
+from pydantic import BaseModel, Field
+
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+
+DEFAULT_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "anthropic": "https://api.anthropic.com",
+    "ollama": "http://localhost:11434",
+}
+
+
+class HTTPPoolConfig(BaseModel):
+    """Connection pool configuration shared by all pooled clients."""
+
+    max_connections: int = Field(default=100, ge=1, description="Max open connections per origin")
+    max_keepalive_connections: int = Field(default=20, ge=0, description="Max idle keep-alive connections")
+    keepalive_expiry: float = Field(default=30.0, ge=0, description="Idle connection lifetime in seconds")
+    http2: bool = Field(default=True, description="Use HTTP/2 when the server and h2 support it")
+    timeout: float = Field(default=60.0, description="Default timeout (clients may override per request)")
+
+    @classmethod
+    def from_env(cls) -> "HTTPPoolConfig":
+        """Load pool configuration from environment variables."""
+        return cls(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30")),
+            http2=os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class _PerLoopAsyncTransport(httpx.AsyncBaseTransport):
+    """Async transport holding one connection pool per event loop.
+
+    Pooled connections are bound to the loop that opened them, while the
+    application calls ``asyncio.run`` several times (health check, build,
+    UI callbacks). Sharing the client object but not the loop-bound pool
+    keeps reuse safe across loops.
+    """
+
+    def __init__(self, limits: httpx.Limits, http2: bool):
+        self._limits = limits
+        self._http2 = http2
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _current(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(limits=self._limits, http2=self._http2)
+                self._transports[loop] = transport
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._current().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+_config: Optional[HTTPPoolConfig] = None
+_sync_clients: Dict[str, httpx.Client] = {}
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_lock = threading.Lock()
+
+
+def configure_http_pool(config: HTTPPoolConfig) -> None:
+    """Set pool configuration; only affects clients created afterwards."""
+    global _config
+    with _lock:
+        _config = config
+
+
+def _get_config() -> HTTPPoolConfig:
+    global _config
+    if _config is None:
+        _config = HTTPPoolConfig.from_env()
+    return _config
+
+
+def _origin(base_url: Optional[str], provider: Optional[str] = None) -> str:
+    """Normalize a base URL to its origin, the unit of connection pooling."""
+    url = httpx.URL(base_url or DEFAULT_BASE_URLS.get(provider or "openai", DEFAULT_BASE_URLS["openai"]))
+    port = url.port or (443 if url.scheme == "https" else 80)
+    return f"{url.scheme}://{url.host}:{port}"
+
+
+def get_http_client(base_url: Optional[str] = None, provider: Optional[str] = None) -> httpx.Client:
+    """Return the shared synchronous client for an endpoint.
+
+    Args:
+        base_url: Endpoint base URL (None for the provider default)
+        provider: Provider used to pick the default URL
+
+    Returns:
+        Shared keep-alive httpx.Client (do not close it)
+    """
+    key = _origin(base_url, provider)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None or client.is_closed:
+            config = _get_config()
+            client = httpx.Client(
+                limits=config.limits(),
+                http2=config.http2 and HAS_HTTP2,
+                timeout=config.timeout,
+            )
+            _sync_clients[key] = client
+        return client
+
+
+def get_async_http_client(
+    base_url: Optional[str] = None, provider: Optional[str] = None
+) -> httpx.AsyncClient:
+    """Return the shared asynchronous client for an endpoint.
+
+    Args:
+        base_url: Endpoint base URL (None for the provider default)
+        provider: Provider used to pick the default URL
+
+    Returns:
+        Shared keep-alive httpx.AsyncClient (do not close it)
+    """
+    key = _origin(base_url, provider)
+    with _lock:
+        client = _async_clients.get(key)
+        if client is None or client.is_closed:
+            config = _get_config()
+            client = httpx.AsyncClient(
+                transport=_PerLoopAsyncTransport(config.limits(), config.http2 and HAS_HTTP2),
+                timeout=config.timeout,
+            )
+            _async_clients[key] = client
+        return client
+
+
+def close_http_clients() -> None:
+    """Close all pooled synchronous clients (async pools die with their loops)."""
+    with _lock:
+        for client in _sync_clients.values():
+            client.close()
+        _sync_clients.clear()
+        _async_clients.clear()
+
+
+atexit.register(close_http_clients)
@@ -0,0 +1,284 @@
+"""Shared request scheduler for construction-time LLM traffic.
+
+PM, GraphDesigner, TestGenerator and the optimizers all call the Builder API
+independently. The scheduler coordinates them per provider endpoint:
+
+1. A concurrency limit with priority classes (interactive design work is
+   granted a slot before background test generation)
+2. A tokens-per-minute token bucket
+3. Retries with jittered exponential backoff on rate-limit (429) and
+   transient (connection/timeout/5xx) errors. Clients routed through the
+   scheduler disable their SDK's own retries, so every attempt is seen here
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Request priority classes (lower value is served first)."""
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+RATE_LIMIT_KEYWORDS = ("429", "rate limit", "rate_limit", "too many requests")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an exception is a provider rate-limit error.
+
+    Args:
+        error: Exception raised by the LLM client
+
+    Returns:
+        True for HTTP 429 / rate-limit errors
+    """
+    if getattr(error, "status_code", None) == 429:
+        return True
+    error_str = str(error).lower()
+    return any(keyword in error_str for keyword in RATE_LIMIT_KEYWORDS)
+
+
+TRANSIENT_ERROR_NAMES = ("APIConnectionError", "APITimeoutError", "InternalServerError")
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Check whether an exception is a retryable connection/server error.
+
+    Args:
+        error: Exception raised by the LLM client
+
+    Returns:
+        True for timeouts, connection failures and HTTP 408/409/5xx errors
+    """
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409) or status >= 500
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``tokens_per_minute``."""
+
+    def __init__(self, tokens_per_minute: int):
+        """Initialize a full bucket.
+
+        Args:
+            tokens_per_minute: Bucket capacity and refill rate
+        """
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: int) -> None:
+        """Wait until ``amount`` tokens are available, then take them.
+
+        Requests larger than the capacity are clamped so they can still run.
+
+        Args:
+            amount: Estimated tokens for the request
+        """
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def adjust(self, delta: int) -> None:
+        """Debit (positive) or credit (negative) tokens after the real usage is known."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class RequestScheduler:
+    """Priority-aware concurrency limiter with rate-limit and transient-error retries."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        tokens_per_minute: int = 0,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        transient_retries: int = 0,
+    ):
+        """Initialize scheduler.
+
+        Args:
+            max_concurrency: Maximum in-flight requests for this endpoint
+            tokens_per_minute: Token budget per minute (0 = unlimited)
+            max_retries: Retries on rate-limit errors
+            base_delay: Initial backoff delay in seconds
+            max_delay: Upper bound for a single backoff delay
+            transient_retries: Retries on connection/timeout/5xx errors
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_retries = max_retries
+        self.transient_retries = transient_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+        self.stats = {"requests": 0, "rate_limited": 0, "transient_errors": 0, "retries": 0}
+
+    async def submit(
+        self,
+        request: Callable[[], Awaitable[T]],
+        priority: Priority = Priority.NORMAL,
+        estimated_tokens: int = 0,
+    ) -> T:
+        """Run a request under the concurrency, token and retry policy.
+
+        Args:
+            request: Zero-argument coroutine factory (called once per attempt)
+            priority: Priority class
+            estimated_tokens: Token estimate charged against the bucket
+
+        Returns:
+            The request's result
+        """
+        self.stats["requests"] += 1
+        attempt = 0
+        transient_attempt = 0
+        while True:
+            await self._acquire_slot(priority)
+            try:
+                if self.bucket and estimated_tokens:
+                    await self.bucket.acquire(estimated_tokens)
+                return await request()
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    if attempt >= self.max_retries:
+                        raise
+                    self.stats["rate_limited"] += 1
+                    rate_limited = True
+                elif is_transient_error(e) and transient_attempt < self.transient_retries:
+                    self.stats["transient_errors"] += 1
+                    rate_limited = False
+                else:
+                    raise
+            finally:
+                self._release_slot()
+
+            # Back off outside the slot so other requests can proceed
+            self.stats["retries"] += 1
+            if rate_limited:
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                attempt += 1
+                label, count, limit = "限流 (429)", attempt, self.max_retries
+            else:
+                delay = min(self.max_delay, self.base_delay * (2 ** transient_attempt))
+                transient_attempt += 1
+                label, count, limit = "连接/服务端错误", transient_attempt, self.transient_retries
+            delay *= random.uniform(0.5, 1.5)
+            print(f"⏳ Builder API {label}，{delay:.1f}s 后重试 ({count}/{limit})...")
+            await asyncio.sleep(delay)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known."""
+        if self.bucket and actual_tokens:
+            self.bucket.adjust(actual_tokens - estimated_tokens)
+
+    async def _acquire_slot(self, priority: Priority) -> None:
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiters:
+                self._active += 1
+                return
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+
+        try:
+            # The slot is handed over by _release_slot without touching _active
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            while self._waiters:
+                _, _, future = heapq.heappop(self._waiters)
+                if not future.done() and not future.get_loop().is_closed():
+                    future.get_loop().call_soon_threadsafe(self._grant, future)
+                    return
+            self._active -= 1
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            # Waiter was cancelled after being picked: pass the slot on
+            self._release_slot()
+        else:
+            future.set_result(None)
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(
+    provider: str,
+    base_url: Optional[str],
+    max_concurrency: int = 4,
+    tokens_per_minute: int = 0,
+    max_retries: int = 5,
+    transient_retries: int = 0,
+) -> RequestScheduler:
+    """Return the process-wide scheduler for a provider endpoint.
+
+    All BuilderClients talking to the same endpoint share one scheduler, so
+    limits hold across components and across concurrent agent builds. The
+    limits of the first caller win.
+
+    Args:
+        provider: API provider
+        base_url: Custom base URL (None for the provider default)
+        max_concurrency: Maximum in-flight requests
+        tokens_per_minute: Token budget per minute (0 = unlimited)
+        max_retries: Retries on rate-limit errors
+        transient_retries: Retries on connection/timeout/5xx errors
+
+    Returns:
+        Shared RequestScheduler
+    """
+    key = f"{provider}|{(base_url or '').rstrip('/')}"
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = RequestScheduler(
+                max_concurrency=max_concurrency,
+                tokens_per_minute=tokens_per_minute,
+                max_retries=max_retries,
+                transient_retries=transient_retries,
+            )
+            _schedulers[key] = scheduler
+        return scheduler
@@ -0,0 +1,211 @@
+"""On-disk response cache for construction-time LLM calls.
+
+Responses are content-addressed: the key is a SHA-256 over provider, model,
+base URL, temperature, prompt and (for structured calls) the response JSON
+schema. Entries live in a single SQLite file with a TTL and size-based LRU
+eviction, so repeated builds of the same agent can be replayed offline.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay-only mode when a request is not in the cache."""
+
+
+class ResponseCache:
+    """SQLite-backed, content-addressed LLM response cache.
+
+    Modes:
+    - ``on``: read from the cache, write fresh responses back
+    - ``replay``: read only; a miss raises ``CacheMissError``
+    - ``off``: the client does not create a cache at all
+    """
+
+    MODES = ("off", "on", "replay")
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl_seconds: Optional[int] = 7 * 24 * 3600,
+        max_size_mb: float = 256.0,
+        replay_only: bool = False,
+    ):
+        """Open (or create) the cache database.
+
+        Args:
+            cache_dir: Directory holding ``responses.sqlite``
+            ttl_seconds: Entry lifetime; ``None`` or ``0`` keeps entries forever
+            max_size_mb: Total payload budget before LRU eviction kicks in
+            replay_only: Raise ``CacheMissError`` instead of allowing a live call
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "responses.sqlite"
+        self.ttl_seconds = ttl_seconds or None
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.replay_only = replay_only
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)"
+        )
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        temperature: float,
+        prompt: str,
+        schema: Optional[Dict[str, Any]] = None,
+        base_url: Optional[str] = None,
+    ) -> str:
+        """Build a content-addressed cache key.
+
+        Args:
+            provider: API provider
+            model: Model name
+            temperature: Sampling temperature
+            prompt: Full prompt text
+            schema: JSON schema of the structured response, if any
+            base_url: Custom endpoint, so proxies of the same model stay apart
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        payload = json.dumps(
+            {
+                "provider": provider,
+                "model": model,
+                "base_url": base_url or "",
+                "temperature": round(float(temperature), 4),
+                "prompt": prompt,
+                "schema": schema,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached response and refresh its LRU timestamp.
+
+        Args:
+            key: Cache key from ``make_key``
+
+        Returns:
+            Cached response text, or None on a miss
+
+        Raises:
+            CacheMissError: On a miss in replay-only mode
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self.misses += 1
+                if self.replay_only:
+                    raise CacheMissError(f"Response cache miss in replay mode (key={key[:12]})")
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store a response, evicting least-recently-used entries if over budget.
+
+        Args:
+            key: Cache key from ``make_key``
+            value: Response text (structured results are stored as JSON)
+        """
+        if self.replay_only:
+            return
+
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the oldest-accessed ones until under budget."""
+        if self.ttl_seconds:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall()
+        victims = []
+        for key, size in rows:
+            if total <= self.max_size_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -5,6 +5,7 @@ from .validation import validate_agent_name
 from .uv_downloader import UVDownloader
 from .performance_metrics import PerformanceMetrics
 from .trace_visualizer import generate_trace_html, generate_trace_summary
+from .trace_store import list_runs, load_docs, read_run
 
 __all__ = [
     "ensure_directory",
@@ -15,4 +16,7 @@ __all__ = [
     "PerformanceMetrics",
     "generate_trace_html",
     "generate_trace_summary",
+    "list_runs",
+    "read_run",
+    "load_docs",
 ]
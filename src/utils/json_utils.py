@@ -6,7 +6,7 @@ JSON 工具函数
 
 import json
 import re
-from typing import Type, TypeVar
+from typing import Any, List, Optional, Type, TypeVar
 from pydantic import BaseModel
 
 T = TypeVar("T", bound=BaseModel)
@@ -118,3 +118,221 @@ def validate_json_schema(json_str: str, model: Type[T]) -> T:
         ValidationError: JSON 不符合 schema
     """
     return model.model_validate_json(json_str)
+
+
+class JSONStreamError(ValueError):
+    """Raised when a streamed completion can no longer become valid JSON."""
+
+
+class IncrementalJSONParser:
+    """
+    增量 JSON 解析器 (用于流式 LLM 输出)
+
+    逐块喂入文本，在列表元素完整到达时立即返回，供调用方逐条处理。
+
+    JSON 之前的废话过长、或顶层类型与 expect 不符 (模型没有遵守输出格式) 时
+    抛出异常提前中止；闭合后不是合法 JSON 的括号 (如废话中的 "{schema}")
+    被跳过并继续查找；括号不匹配等其他格式问题只标记 malformed 并停止逐条解析，
+    完整文本仍交给 extract_json_from_text 或调用方的修复逻辑处理。
+
+    Args:
+        expect: 期望的顶层类型 ("object" / "array" / None 表示不限)；
+            指定时，废话中另一类型的括号若像 JSON 值的开头则视为类型错误，否则跳过
+        items_key: 顶层对象中需要逐条返回的数组字段名；
+            为 None 且顶层为数组时返回顶层数组的元素
+        max_preamble: JSON 开始前允许的最大废话字符数
+    """
+
+    _CLOSERS = {"}": "{", "]": "["}
+    # 括号后第一个非空白字符落在这些字符中时，视为 JSON 值的开头而非废话
+    _VALUE_STARTS = {"{": '"}', "[": '{["]-0123456789tfn'}
+
+    def __init__(
+        self,
+        expect: Optional[str] = None,
+        items_key: Optional[str] = None,
+        max_preamble: int = 300,
+    ):
+        self.expect = expect
+        self.items_key = items_key
+        self.max_preamble = max_preamble
+
+        self.buffer = ""
+        self.start = -1
+        self.end = -1
+        self.item_errors = 0
+        self.malformed = False
+
+        self._pos = 0
+        self._search_from = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._item_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        """顶层 JSON 值是否已经闭合"""
+        return self.end >= 0
+
+    @property
+    def document(self) -> str:
+        """已闭合的顶层 JSON 文本 (未闭合时为空字符串)"""
+        return self.buffer[self.start:self.end + 1] if self.done else ""
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        喂入一段文本
+
+        Args:
+            chunk: 新到达的文本
+
+        Returns:
+            本次新完成的列表元素 (已 json.loads)
+
+        Raises:
+            JSONStreamError: JSON 之前的废话过长，或顶层类型与 expect 不符
+        """
+        self.buffer += chunk
+        items: List[Any] = []
+
+        while not (self.malformed or self.done):
+            if self.start < 0 and not self._find_start():
+                break
+            self._scan(items)
+            if self.start >= 0:
+                break
+        return items
+
+    def _scan(self, items: List[Any]) -> None:
+        """从 self._pos 继续扫描当前候选 JSON 值"""
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf) and not self.done:
+            ch = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buf[self._string_start + 1:i]
+                i += 1
+                continue
+
+            depth = len(self._stack)
+            at_item_level = self._item_depth is not None and depth == self._item_depth
+
+            if at_item_level and self._item_start is None and not ch.isspace() and ch not in ",]":
+                self._item_start = i
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ":" and depth == 1 and self._stack[0] == "{":
+                self._current_key = self._last_string
+            elif ch == "," and at_item_level:
+                self._finish_item(i, items)
+            elif ch in "{[":
+                self._stack.append(ch)
+                if (
+                    ch == "["
+                    and self._item_depth is None
+                    and self._is_items_array(len(self._stack))
+                ):
+                    self._item_depth = len(self._stack)
+            elif ch in "}]":
+                if not self._stack or self._stack[-1] != self._CLOSERS[ch]:
+                    # 括号不匹配: 不再逐条解析，保留完整文本供修复
+                    self.malformed = True
+                    break
+                if at_item_level and ch == "]":
+                    self._finish_item(i, items)
+                    self._item_depth = None
+                self._stack.pop()
+                if not self._stack:
+                    if self._is_valid_json(buf[self.start:i + 1]):
+                        self.end = i
+                    else:
+                        # 闭合后不是合法 JSON (如废话中的 "{schema}"): 从其后继续查找
+                        self._restart(i + 1)
+                        return
+            i += 1
+
+        self._pos = i
+
+    @staticmethod
+    def _is_valid_json(text: str) -> bool:
+        try:
+            json.loads(text)
+        except json.JSONDecodeError:
+            return False
+        return True
+
+    def _restart(self, pos: int) -> None:
+        """放弃当前候选，从 pos 开始重新查找 JSON 起点"""
+        self.start = -1
+        self._search_from = pos
+        self._stack = []
+        self._last_string = None
+        self._current_key = None
+        self._item_depth = None
+        self._item_start = None
+
+    def _find_start(self) -> bool:
+        """定位顶层 JSON 的起始位置，并校验废话长度与顶层类型"""
+        buf = self.buffer
+        pos = self._search_from
+        while True:
+            positions = [p for p in (buf.find("{", pos), buf.find("[", pos)) if p >= 0]
+            start = min(positions) if positions else len(buf)
+            preamble = buf[:start].replace("```json", "").replace("```", "").strip()
+            if len(preamble) > self.max_preamble:
+                raise JSONStreamError(
+                    f"No JSON found after {len(preamble)} chars of preamble: {preamble[:80]}..."
+                )
+            if not positions:
+                self._search_from = pos
+                return False
+
+            opener = buf[start]
+            if self.expect and opener != ("{" if self.expect == "object" else "["):
+                rest = buf[start + 1:].lstrip()
+                if not rest:
+                    # 还无法判断是 JSON 还是废话，等待更多文本
+                    self._search_from = start
+                    return False
+                if rest[0] in self._VALUE_STARTS[opener]:
+                    raise JSONStreamError(
+                        f"Expected a JSON {self.expect}, got one starting with {opener!r}: {buf[start:start + 80]}..."
+                    )
+                pos = start + 1
+                continue
+
+            self.start = start
+            self._pos = start
+            self._search_from = start
+            return True
+
+    def _is_items_array(self, depth: int) -> bool:
+        """判断刚打开的数组是否是需要逐条返回的数组"""
+        if self.items_key is None:
+            return depth == 1
+        return depth == 2 and self._stack[0] == "{" and self._current_key == self.items_key
+
+    def _finish_item(self, end: int, items: List[Any]) -> None:
+        if self._item_start is None:
+            return
+        raw = self.buffer[self._item_start:end].strip()
+        self._item_start = None
+        try:
+            items.append(json.loads(raw))
+        except json.JSONDecodeError:
+            # 元素格式有误时不中断流，交给调用方对完整文本做修复
+            self.item_errors += 1
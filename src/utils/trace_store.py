@@ -0,0 +1,150 @@
+"""
+Reader for generated agents' execution traces.
+
+Generated agents append compact JSONL records to ``<agent>/.trace/trace-*.jsonl``
+through a background writer (see ``TraceWriter`` in agent_template.py.j2):
+
+- ``{"run": id, "kind": "run_start", "ts": ...}``
+- ``{"run": id, "step": 1, "node_id": ..., "action": ..., ...}``  (one per node)
+- ``{"run": id, "kind": "run_end", "ts": ..., "entries": n, "dropped": n, "counters": {...}}``
+
+Retrieved documents are stored once per content hash as
+``.trace/docs/<sha256>.txt.gz``. Every function here streams the segment files
+line by line, so large traces are never loaded into memory at once. Legacy
+``run_*.json`` files (one JSON list per run) are still readable.
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+SEGMENT_GLOB = "trace-*.jsonl"
+LEGACY_GLOB = "run_*.json"
+
+
+def _trace_dir(agent_dir: Union[str, Path]) -> Path:
+    path = Path(agent_dir)
+    return path if path.name == ".trace" else path / ".trace"
+
+
+def _segments(trace_dir: Path, newest_first: bool = False) -> List[Path]:
+    # Segment names start with a sortable timestamp
+    return sorted(trace_dir.glob(SEGMENT_GLOB), reverse=newest_first)
+
+
+def _iter_segment(path: Path) -> Iterator[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partially written last line
+    except OSError:
+        return
+
+
+def iter_records(agent_dir: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Yield every trace record, oldest segment first.
+
+    Args:
+        agent_dir: Agent directory (or its ``.trace`` directory)
+    """
+    for segment in _segments(_trace_dir(agent_dir)):
+        yield from _iter_segment(segment)
+
+
+def list_runs(agent_dir: Union[str, Path], limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+    """Summaries of the most recent runs, newest first.
+
+    Args:
+        agent_dir: Agent directory (or its ``.trace`` directory)
+        limit: Maximum number of runs (None: all)
+
+    Returns:
+        ``[{"run_id", "started_at", "ended_at", "entries", "nodes", "complete", "counters"}]``
+        (``counters`` e.g. ``llm_cache_hits`` / ``llm_cache_misses``)
+    """
+    trace_dir = _trace_dir(agent_dir)
+    runs: Dict[str, Dict[str, Any]] = {}
+
+    for segment in _segments(trace_dir, newest_first=True):
+        for record in _iter_segment(segment):
+            run_id = record.get("run")
+            if not run_id:
+                continue
+            run = runs.setdefault(run_id, {
+                "run_id": run_id, "started_at": None, "ended_at": None,
+                "entries": 0, "nodes": [], "complete": False, "counters": {},
+            })
+            kind = record.get("kind")
+            if kind == "run_start":
+                run["started_at"] = record.get("ts")
+            elif kind == "run_end":
+                run["ended_at"] = record.get("ts")
+                run["complete"] = True
+                run["counters"] = record.get("counters", {})
+            else:
+                run["entries"] += 1
+                run["nodes"].append(record.get("node_id"))
+        # A run's start record is never in a newer segment than its entries,
+        # so once `limit` starts are seen the newest runs are complete
+        if limit is not None and sum(1 for r in runs.values() if r["started_at"]) >= limit:
+            break
+
+    ordered = sorted(runs.values(), key=lambda r: r["started_at"] or r["ended_at"] or "", reverse=True)
+    legacy = sorted(trace_dir.glob(LEGACY_GLOB), key=lambda p: p.stat().st_mtime, reverse=True)
+    ordered += [
+        {"run_id": p.stem, "started_at": None, "ended_at": None, "entries": None, "nodes": [], "complete": True, "counters": {}}
+        for p in legacy
+    ]
+    return ordered[:limit] if limit is not None else ordered
+
+
+def latest_run(agent_dir: Union[str, Path]) -> Optional[str]:
+    """ID of the most recent run, or None if the agent has no traces."""
+    runs = list_runs(agent_dir, limit=1)
+    return runs[0]["run_id"] if runs else None
+
+
+def read_run(agent_dir: Union[str, Path], run_id: str) -> List[Dict[str, Any]]:
+    """Node entries of one run, in execution order.
+
+    Args:
+        agent_dir: Agent directory (or its ``.trace`` directory)
+        run_id: Run ID (``trace_file`` in the agent state)
+
+    Returns:
+        Trace entries without the ``run`` key
+    """
+    trace_dir = _trace_dir(agent_dir)
+    legacy = trace_dir / f"{run_id}.json"
+    if legacy.exists():
+        with open(legacy, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    entries = []
+    for segment in _segments(trace_dir):
+        with open(segment, "r", encoding="utf-8") as f:
+            for line in f:
+                if run_id not in line:
+                    continue  # cheap pre-filter before parsing
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.pop("run", None) == run_id and "kind" not in record:
+                    entries.append(record)
+    return entries
+
+
+def load_docs(agent_dir: Union[str, Path], doc_hashes: List[str]) -> List[str]:
+    """Retrieved document texts referenced by a RAG entry's ``doc_hashes``."""
+    docs_dir = _trace_dir(agent_dir) / "docs"
+    docs = []
+    for digest in doc_hashes:
+        path = docs_dir / f"{digest}.txt.gz"
+        if path.exists():
+            docs.append(gzip.decompress(path.read_bytes()).decode("utf-8"))
+    return docs
@@ -0,0 +1,1014 @@
+"""Unit tests for the runtime behaviour of generated agents."""
+
+import asyncio
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+
+from src.core.compiler import Compiler
+from src.core.test_generator import TestGenerator
+from src.schemas import (
+    ConditionalEdgeDef,
+    EdgeDef,
+    GraphStructure,
+    NodeDef,
+    PatternConfig,
+    PatternType,
+    ProjectMeta,
+    StateField,
+    StateFieldType,
+    StateSchema,
+    TaskType,
+    ToolsConfig,
+)
+from src.utils import trace_store
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "src" / "templates"
+
+
+def _chat_inputs():
+    meta = ProjectMeta(
+        agent_name="echo_bot",
+        description="Answers briefly",
+        has_rag=False,
+        task_type=TaskType.CHAT,
+        user_intent_summary="Chat",
+    )
+    graph = GraphStructure(
+        pattern=PatternConfig(pattern_type=PatternType.SEQUENTIAL),
+        state_schema=StateSchema(
+            fields=[StateField(name="messages", type=StateFieldType.LIST_MESSAGE, reducer="add_messages")]
+        ),
+        nodes=[NodeDef(id="answer", type="llm", role_description="Answer briefly")],
+        edges=[EdgeDef(source="answer", target="END")],
+        entry_point="answer",
+    )
+    return meta, graph, None, ToolsConfig(enabled_tools=[])
+
+
+def _tool_inputs():
+    meta = ProjectMeta(
+        agent_name="file_bot",
+        description="Reads files",
+        has_rag=False,
+        task_type=TaskType.ANALYSIS,
+        user_intent_summary="File analysis",
+    )
+    graph = GraphStructure(
+        pattern=PatternConfig(pattern_type=PatternType.SEQUENTIAL),
+        state_schema=StateSchema(
+            fields=[StateField(name="messages", type=StateFieldType.LIST_MESSAGE, reducer="add_messages")]
+        ),
+        nodes=[
+            NodeDef(id="planner", type="llm", role_description="Plan and read files"),
+            NodeDef(id="writer", type="llm", role_description="Write the answer"),
+            NodeDef(id="tool_file_read", type="tool", config={"tool_name": "file_read"}),
+            NodeDef(id="tool_file_list", type="tool", config={"tool_name": "file_list"}),
+        ],
+        edges=[
+            EdgeDef(source="tool_file_read", target="planner"),
+            EdgeDef(source="tool_file_list", target="writer"),
+            EdgeDef(source="writer", target="END"),
+        ],
+        conditional_edges=[
+            ConditionalEdgeDef(
+                source="planner",
+                condition="route_planner",
+                condition_logic="",
+                branches={"file_read": "tool_file_read", "continue": "writer"},
+            )
+        ],
+        entry_point="planner",
+    )
+    return meta, graph, None, ToolsConfig(enabled_tools=["file_read", "file_list"])
+
+
+@pytest.fixture
+def load_agent(tmp_path, monkeypatch):
+    """Compile inputs into tmp_path and import the generated agent.py."""
+    monkeypatch.setenv("RUNTIME_API_KEY", "test-key")
+    monkeypatch.chdir(tmp_path)
+    loaded = []
+
+    def _import(name, path):
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loaded.append(name)
+        spec.loader.exec_module(module)
+        return module
+
+    def _load(inputs, server=False):
+        compiler = Compiler(TEMPLATE_DIR, format_code=False, cache_dir=tmp_path / "cache", emit_server=server)
+        result = compiler.compile(*inputs, tmp_path / "agent")
+        assert result.success, result.error_message
+        monkeypatch.chdir(tmp_path / "agent")
+
+        module = _import(f"generated_agent_{len(loaded)}", tmp_path / "agent" / "agent.py")
+        if not server:
+            return module
+        monkeypatch.setitem(sys.modules, "agent", module)
+        return module, _import(f"generated_server_{len(loaded)}", tmp_path / "agent" / "server.py")
+
+    yield _load
+    for name in loaded:
+        sys.modules.pop(name, None)
+
+
+def test_graph_is_compiled_once_and_runs_are_isolated(load_agent, monkeypatch):
+    """Test the process-wide graph, per-run thread ids and checkpoint cleanup."""
+    agent = load_agent(_chat_inputs())
+    monkeypatch.setattr(agent, "llm", FakeListChatModel(responses=["first", "second", "third"]))
+    built = []
+    create_graph = agent.create_graph
+    monkeypatch.setattr(agent, "create_graph", lambda *a: built.append(a) or create_graph(*a))
+
+    assert agent.run_agent("hi") == "first"
+    output, trace = agent.run_agent("again", return_trace=True)
+
+    assert output == "second"
+    assert [entry["node_id"] for entry in trace] == ["answer"]
+    assert len(built) == 1
+    assert agent.get_graph() is agent.get_graph()
+    # Ephemeral runs leave nothing behind in the shared checkpointer
+    assert list(agent._CHECKPOINTER.list(None)) == []
+
+    agent.run_agent("keep", thread_id="session-1")
+    state = agent.get_graph().get_state({"configurable": {"thread_id": "session-1"}})
+    assert [m.content for m in state.values["messages"]] == ["keep", "third"]
+
+
+def test_generated_graph_reuse_benchmark_runs(load_agent, capsys):
+    """Test that the micro-benchmark emitted into test_deepeval.py passes."""
+    agent = load_agent(_chat_inputs())
+    namespace = {"agent": agent}
+    exec(TestGenerator(llm_client=None)._generate_graph_reuse_benchmark(), namespace)
+
+    namespace["test_graph_reuse_overhead"]()
+
+    assert "重新构建" in capsys.readouterr().out
+
+
+def test_tools_are_bound_once_per_node(load_agent):
+    """Test that each LLM node is pre-bound to only the tools it routes to."""
+    agent = load_agent(_tool_inputs())
+
+    assert agent.NODE_TOOLS == {"planner": ["file_read"], "writer": []}
+    bound = agent.NODE_LLMS["planner"].kwargs["tools"]
+    assert [t["function"]["name"] for t in bound] == ["read_file"]
+    assert agent.NODE_LLMS["writer"] is agent.llm
+    assert "bind_tools" not in inspect.getsource(agent.planner_node)
+
+
+def test_tool_calls_run_concurrently_with_timeouts(load_agent, monkeypatch):
+    """Test that one tool node runs every tool_call in parallel, each with a timeout."""
+    agent = load_agent(_tool_inputs())
+
+    def sleeper(name: str, seconds: float) -> StructuredTool:
+        async def run(path: str) -> str:
+            await asyncio.sleep(seconds)
+            return f"{name}:{path}"
+        return StructuredTool.from_function(coroutine=run, name=name, description=name)
+
+    monkeypatch.setattr(agent, "tools", [sleeper("read_file", 0.2), sleeper("list_directory", 0.2), sleeper("hang", 5)])
+    monkeypatch.setattr(agent, "TOOL_TIMEOUT", 0.5)
+    message = AIMessage(content="", tool_calls=[
+        {"name": "read_file", "args": {"path": "a.txt"}, "id": "call_1"},
+        {"name": "list_directory", "args": {"path": "."}, "id": "call_2"},
+        {"name": "hang", "args": {"path": "x"}, "id": "call_3"},
+        {"name": "missing", "args": {}, "id": "call_4"},
+    ])
+
+    async def run_node():
+        agent._trace_manager.start_new_trace()
+        update = await agent.tool_file_read_node({"messages": [message], "trace_file": None})
+        return update, agent._trace_manager.trace_entries[-1]
+
+    start = time.perf_counter()
+    update, entry = asyncio.run(run_node())
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.9  # bounded by the timeout, not the 5.4s sum
+    replies = update["messages"]
+    assert [m.tool_call_id for m in replies] == ["call_1", "call_2", "call_3", "call_4"]
+    assert replies[0].content == "read_file:a.txt"
+    assert "timed out" in replies[2].content and "not found" in replies[3].content
+    assert [c["status"] for c in entry["tool_calls"]] == ["ok", "ok", "timeout", "not_found"]
+
+
+@pytest.mark.asyncio
+async def test_server_invoke_stream_and_admission(load_agent, monkeypatch):
+    """Test the generated server's endpoints, sessions and in-flight limit."""
+    agent, server = load_agent(_chat_inputs(), server=True)
+    monkeypatch.setattr(agent, "llm", FakeListChatModel(responses=["pong"], sleep=0.05))
+    assert "aiohttp" in Path("requirements.txt").read_text(encoding="utf-8")
+
+    async with TestClient(TestServer(server.create_app(max_in_flight=1, max_queue=1))) as client:
+        resp = await client.post("/invoke", json={"input": "ping", "thread_id": "s1"})
+        assert resp.status == 200
+        assert (await resp.json())["output"] == "pong"
+
+        resp = await client.post("/stream", json={"input": "again", "thread_id": "s1"})
+        body = await resp.text()
+        assert resp.headers["Content-Type"].startswith("text/event-stream")
+        assert "event: node" in body and "event: done" in body
+        state = agent.get_graph().get_state({"configurable": {"thread_id": "s1"}})
+        assert len(state.values["messages"]) == 4
+
+        # One running, one queued, the third is rejected
+        responses = await asyncio.gather(*(client.post("/invoke", json={"input": str(i)}) for i in range(3)))
+        assert sorted(r.status for r in responses) == [200, 200, 503]
+
+        assert (await client.post("/invoke", json={})).status == 400
+        health = await (await client.get("/health")).json()
+        assert health["in_flight"] == 0 and health["sessions"] == 0
+
+    # Requests waiting on a busy session count against the queue too
+    async with TestClient(TestServer(server.create_app(max_in_flight=4, max_queue=1))) as client:
+        responses = await asyncio.gather(
+            *(client.post("/invoke", json={"input": str(i), "thread_id": "s2"}) for i in range(3))
+        )
+        assert sorted(r.status for r in responses) == [200, 200, 503]
+        health = await (await client.get("/health")).json()
+        assert health["queued"] == 0 and health["sessions"] == 0
+
+
+def test_traces_are_buffered_jsonl_with_deduplicated_docs(load_agent):
+    """Test the background trace sink, per-run isolation and the reader API."""
+    agent = load_agent(_chat_inputs())
+    manager = agent._trace_manager
+
+    async def fake_run(name: str, docs):
+        run_id = manager.start_new_trace()
+        await asyncio.sleep(0.01)
+        manager.add_entry({"step": len(manager.trace_entries) + 1, "node_id": name, "action": "rag_retrieval",
+                           "doc_hashes": manager.save_docs(docs)})
+        await asyncio.sleep(0.01)
+        manager.add_entry({"step": len(manager.trace_entries) + 1, "node_id": name, "action": "llm_call"})
+        manager.save()
+        return run_id
+
+    async def both():
+        return await asyncio.gather(fake_run("a", ["shared doc", "only a"]), fake_run("b", ["shared doc"]))
+
+    run_a, run_b = asyncio.run(both())
+    assert manager.writer.flush()
+
+    assert [(e["node_id"], e["step"]) for e in manager.load(run_a)] == [("a", 1), ("a", 2)]
+    assert [e["node_id"] for e in trace_store.read_run(".", run_b)] == ["b", "b"]
+    assert {r["run_id"] for r in trace_store.list_runs(".", limit=5)} == {run_a, run_b}
+    assert all(r["complete"] and r["entries"] == 2 for r in trace_store.list_runs("."))
+
+    docs_dir = Path(".trace") / "docs"
+    assert len(list(docs_dir.glob("*.txt.gz"))) == 2  # "shared doc" stored once
+    hashes = manager.load(run_a)[0]["doc_hashes"]
+    assert trace_store.load_docs(".", hashes) == ["shared doc", "only a"]
+    lines = next(Path(".trace").glob("trace-*.jsonl")).read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 8  # start + 2 entries + end, per run; one compact record per line
+
+
+def test_trace_writer_rotates_and_prunes(load_agent, monkeypatch):
+    """Test size-based rotation and size/age-based pruning of trace segments."""
+    agent = load_agent(_chat_inputs())
+    monkeypatch.setattr(agent, "TRACE_MAX_FILE_BYTES", 2000)
+    monkeypatch.setattr(agent, "TRACE_MAX_TOTAL_BYTES", 6000)
+    trace_dir = Path(".trace")
+    stale = trace_dir / "trace-20000101-000000-000000-1.jsonl"
+    stale.write_text('{"run":"old","kind":"run_start"}\n', encoding="utf-8")
+    os.utime(stale, (0, 0))
+
+    writer = agent.TraceWriter(trace_dir)
+    for i in range(100):
+        writer.write({"run": "r", "step": i, "payload": "x" * 100})
+        writer.flush()
+
+    segments = list(trace_dir.glob("trace-*.jsonl"))
+    assert not stale.exists()
+    assert len(segments) > 1
+    assert all(p.stat().st_size <= 2000 for p in segments)
+    assert sum(p.stat().st_size for p in segments) <= 6000 + 2000
+
+
+def test_trace_writer_refreshes_reused_docs(load_agent, monkeypatch):
+    """Test that a document still referenced by new runs is not pruned by age."""
+    agent = load_agent(_chat_inputs())
+    clock = [1_000_000.0]
+    monkeypatch.setattr(agent.time, "time", lambda: clock[0])
+    writer = agent.TraceWriter(Path(".trace"))
+
+    digest = writer.write_doc("shared passage")
+    writer.flush()
+    doc = Path(".trace") / "docs" / f"{digest}.txt.gz"
+    os.utime(doc, (clock[0], clock[0]))
+
+    # Within the refresh period a reuse is not re-queued
+    clock[0] += agent.TRACE_DOC_REFRESH_SECONDS / 2
+    writer.write_doc("shared passage")
+    writer.flush()
+    assert doc.stat().st_mtime == 1_000_000.0
+
+    # After it, the reuse refreshes the file, which then survives a prune past its original age
+    clock[0] += agent.TRACE_DOC_REFRESH_SECONDS
+    writer.write_doc("shared passage")
+    writer.flush()
+    assert doc.stat().st_mtime > 1_000_000.0
+    clock[0] = 1_000_000.0 + agent.TRACE_MAX_AGE_DAYS * 86400 + 1
+    writer._prune()
+    assert agent.TraceManager(Path(".")).load_docs([digest]) == ["shared passage"]
+
+
+def test_rag_config_hot_reload_swaps_retriever(load_agent, monkeypatch):
+    """Test the immutable config snapshot and the atomic retriever swap."""
+    from jinja2 import Environment, FileSystemLoader
+    from langchain_core.documents import Document
+    from langchain_core.runnables import RunnableLambda
+
+    agent = load_agent(_chat_inputs())
+    loader = agent.ConfigLoader()
+    config_path = Path("rag_config.json")
+    config_path.write_text('{"k_retrieval": 2}', encoding="utf-8")
+    assert loader.reload()
+    snapshot = loader.load_rag_config()
+    with pytest.raises(TypeError):
+        snapshot["k_retrieval"] = 9
+
+    class FakeVectorStore:
+        def as_retriever(self, search_type, search_kwargs):
+            k = search_kwargs["k"]
+            return RunnableLambda(lambda q: [Document(page_content=f"{q}:k={k}")])
+
+    source = Environment(loader=FileSystemLoader(TEMPLATE_DIR)).get_template("rag_retriever.py.j2").render()
+    namespace = {"CONFIG_LOADER": loader, "vectorstore": FakeVectorStore(), "Any": agent.Any, "List": agent.List}
+    monkeypatch.setattr(loader, "start_watching", lambda *a: None)
+    exec(source, namespace)
+    retriever = namespace["retriever"]
+    assert retriever.invoke("q")[0].page_content == "q:k=2"
+
+    # No filesystem access on the request path
+    with monkeypatch.context() as m:
+        m.setattr(loader, "_file_signature", lambda: pytest.fail("stat on request path"))
+        assert loader.load_rag_config() is snapshot
+
+    config_path.write_text('{"k_retrieval": 5, "chunk_size": 123}', encoding="utf-8")
+    assert loader.reload()
+    assert retriever.version == 1
+    assert asyncio.run(retriever.ainvoke("q"))[0].page_content == "q:k=5"
+
+    # Non-retrieval changes and broken files keep the current pipeline
+    config_path.write_text('{"k_retrieval": 5, "chunk_size": 4567}', encoding="utf-8")
+    assert loader.reload() and retriever.version == 1
+    config_path.write_text('{"k_retrieval": ', encoding="utf-8")
+    assert not loader.reload()
+    assert loader.load_rag_config()["chunk_size"] == 4567
+
+
+def test_llm_cache_hits_are_counted_in_trace(load_agent, monkeypatch):
+    """Test the opt-in SQLite LLM cache: exact-match hits, TTL, LRU cap, trace counters."""
+    monkeypatch.setenv("COMPILER_LLM_CACHE", "true")
+    agent = load_agent(_chat_inputs())
+    assert isinstance(agent.LLM_CACHE, agent.SQLiteLLMCache)
+    assert agent.llm.cache is agent.LLM_CACHE
+    monkeypatch.setattr(agent, "llm", FakeListChatModel(responses=["first", "second"], cache=agent.LLM_CACHE))
+
+    assert agent.run_agent("hi") == "first"
+    assert agent.run_agent("hi") == "first"  # served from the cache
+    assert agent.run_agent("other") == "second"
+    assert agent._trace_manager.writer.flush()
+    counters = [r["counters"] for r in trace_store.list_runs(".")]
+    assert counters == [{"llm_cache_misses": 1}, {"llm_cache_hits": 1}, {"llm_cache_misses": 1}]
+
+    cache = agent.SQLiteLLMCache(str(Path("small.sqlite")), ttl_seconds=60, max_entries=2)
+    monkeypatch.setattr(agent.SQLiteLLMCache, "EVICT_EVERY", 1)
+    generation = [agent.ChatGeneration(message=AIMessage(content="x"))]
+    for prompt in ("a", "b"):
+        cache.update(prompt, "model", generation)
+    assert cache.lookup("a", "model")[0].message.content == "x"  # "a" is now most recent
+    cache.update("c", "model", generation)
+    assert cache.lookup("b", "model") is None
+    assert cache.lookup("a", "other-model") is None
+
+    later = time.time() + 120
+    monkeypatch.setattr(agent.time, "time", lambda: later)
+    assert cache.lookup("c", "model") is None  # expired
+
+
+def test_semantic_cache_matches_similar_queries(load_agent, monkeypatch, tmp_path):
+    """Test semantic hits, generation/retriever-config invalidation, persistence and LRU eviction."""
+    from types import SimpleNamespace
+
+    from jinja2 import Environment, FileSystemLoader
+
+    agent = load_agent(_chat_inputs())
+    vectors = {
+        "what is the refund policy": [1.0, 0.0, 0.0],
+        "what's the refund policy?": [0.99, 0.1, 0.0],
+        "how do I install it": [0.0, 1.0, 0.0],
+        "who wrote it": [0.0, 0.0, 1.0],
+    }
+
+    class FakeEmbeddings:
+        def embed_query(self, text):
+            return vectors[text]
+
+        async def aembed_query(self, text):
+            return vectors[text]
+
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+    monkeypatch.setenv("SEMANTIC_CACHE_MAX_ENTRIES", "2")
+    monkeypatch.setenv("SEMANTIC_CACHE_PATH", str(tmp_path / "semantic.sqlite"))
+    source = Environment(loader=FileSystemLoader(TEMPLATE_DIR)).get_template("rag_semantic_cache.py.j2").render()
+
+    rag_config = {"k_retrieval": 4, "chunk_size": 500}
+
+    def load_cache(generation):
+        namespace = {
+            **vars(agent),
+            "embeddings": FakeEmbeddings(),
+            "VECTORSTORE_GENERATION": generation,
+            "RETRIEVER_CONFIG_KEYS": ("k_retrieval", "enable_hybrid_search"),
+            "CONFIG_LOADER": SimpleNamespace(load_rag_config=lambda: rag_config),
+        }
+        exec(source, namespace)
+        return namespace
+
+    namespace = load_cache("gen-1")
+    cache = namespace["SEMANTIC_CACHE"]
+    agent._trace_manager.start_new_trace()
+
+    miss = cache.lookup("what is the refund policy")
+    assert not miss["hit"]
+    cache.store("what is the refund policy", miss, "30 days", ["Refunds within 30 days."], 1200.0)
+    hit = asyncio.run(cache.alookup("what's the refund policy?"))
+    assert hit["hit"] and hit["answer"] == "30 days" and hit["sources"] == ["Refunds within 30 days."]
+    assert cache.trace_info(hit) == {"hit": True, "similarity": hit["similarity"], "saved_ms": 1200.0, "hit_rate": 0.5}
+    assert not cache.lookup("how do I install it")["hit"]
+    assert agent._trace_manager._run.get().counters == {
+        "semantic_cache_misses": 2, "semantic_cache_hits": 1, "semantic_cache_saved_ms": 1200,
+    }
+
+    # Persisted across restarts, dropped when the vector store generation or the retriever pipeline changes
+    assert load_cache("gen-1")["SEMANTIC_CACHE"].lookup("what's the refund policy?")["hit"]
+    rag_config["chunk_size"] = 800  # not part of the retriever pipeline
+    assert cache.lookup("what's the refund policy?")["hit"]
+    rag_config["k_retrieval"] = 8  # hot-swapped retriever
+    assert not cache.lookup("what's the refund policy?")["hit"]
+    rag_config["k_retrieval"] = 4
+    cache.store("what is the refund policy", cache.lookup("what is the refund policy"), "30 days", [], 1200.0)
+    namespace = load_cache("gen-2")
+    cache = namespace["SEMANTIC_CACHE"]
+    assert not cache.lookup("what's the refund policy?")["hit"]
+
+    for query in ("what is the refund policy", "how do I install it", "who wrote it"):
+        cache.store(query, cache.lookup(query), query.upper(), [], 10.0)
+    assert not cache.lookup("what is the refund policy")["hit"]  # least recently used, evicted
+    assert cache.lookup("who wrote it")["answer"] == "WHO WROTE IT"
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_checkpointer_backends_stay_bounded(load_agent, monkeypatch, backend):
+    """Test per-thread checkpoint caps, thread LRU (memory), persistence and TTL (sqlite)."""
+    monkeypatch.setenv("COMPILER_CHECKPOINTER", backend)
+    monkeypatch.setenv("CHECKPOINT_MAX_THREADS", "2")
+    monkeypatch.setenv("CHECKPOINT_MAX_PER_THREAD", "3")
+    monkeypatch.setenv("CHECKPOINT_COMPACT_EVERY", "1")
+    agent = load_agent(_chat_inputs())
+    monkeypatch.setattr(agent, "llm", FakeListChatModel(responses=["ok"]))
+    saver = agent._CHECKPOINTER
+    assert type(saver).__name__ == {"memory": "BoundedMemorySaver", "sqlite": "SQLiteCheckpointSaver"}[backend]
+
+    for turn in range(3):
+        agent.run_agent(f"turn {turn}", thread_id="a")
+    agent.run_agent("ephemeral")  # deleted afterwards, frees its LRU slot
+    agent.run_agent("hello", thread_id="b")
+
+    config = {"configurable": {"thread_id": "a"}}
+    messages = agent.get_graph().get_state(config).values["messages"]
+    assert [m.content for m in messages][-2:] == ["turn 2", "ok"]
+    assert len(messages) == 6
+    assert len(list(saver.list(config))) == 3
+    assert {c.config["configurable"]["thread_id"] for c in saver.list(None)} == {"a", "b"}
+
+    if backend == "memory":
+        agent.run_agent("hi", thread_id="c")  # evicts "a", the least recently written thread
+        assert {c.config["configurable"]["thread_id"] for c in saver.list(None)} == {"b", "c"}
+        assert all(key[0] != "a" for key in saver.blobs)
+    else:
+        reopened = agent.SQLiteCheckpointSaver()
+        assert reopened.get_tuple(config).checkpoint["id"] == saver.get_tuple(config).checkpoint["id"]
+        reopened.ttl_seconds = 1e-9
+        time.sleep(0.01)
+        reopened.compact()
+        assert list(reopened.list(None)) == []
+
+
+def test_context_window_budget_pairs_and_rolling_summary(load_agent, monkeypatch):
+    """Test turn/budget trimming, intact tool-call pairs and the incremental summary cache."""
+    from langchain_core.messages import HumanMessage, ToolMessage
+
+    agent = load_agent(_chat_inputs())
+    prompts = []
+
+    class RecordingLLM:
+        async def ainvoke(self, prompt):
+            prompts.append(prompt)
+            return AIMessage(content=f"summary {len(prompts)}")
+
+    monkeypatch.setattr(agent, "llm", RecordingLLM())
+    window = agent.ContextWindow(max_tokens=200, keep_turns=2, summary_max_tokens=20)
+    window._encoding_loaded = True  # character estimate, no tokenizer download
+    call = {"name": "read_file", "args": {"path": "a"}, "id": "c1"}
+    history = [
+        HumanMessage(content="first question", id="h1"),
+        AIMessage(content="", tool_calls=[call], id="a1"),
+        ToolMessage(content="file body", tool_call_id="c1", id="t1"),
+        AIMessage(content="first answer", id="a1b"),
+        HumanMessage(content="second question", id="h2"),
+        AIMessage(content="second answer", id="a2"),
+        HumanMessage(content="third question", id="h3"),
+    ]
+
+    prompt, info = asyncio.run(window.abuild("system", history))
+    assert [m.id for m in prompt[2:]] == ["h2", "a2", "h3"]
+    assert prompt[1]["content"].endswith("summary 1")
+    assert info["messages_summarized"] == 4 and info["prompt_tokens"] <= 200
+
+    # Same prefix: cached. Longer prefix: only the new turn is summarized
+    asyncio.run(window.abuild("system", history))
+    history += [AIMessage(content="third answer", id="a3"), HumanMessage(content="fourth", id="h4")]
+    prompt, _ = asyncio.run(window.abuild("system", history))
+    assert len(prompts) == 2
+    assert "summary 1" in prompts[1] and "first question" not in prompts[1] and "second question" in prompts[1]
+    assert [m.id for m in prompt[2:]] == ["h3", "a3", "h4"]
+
+    # A single oversized turn keeps its question and the newest units, never an orphan tool result
+    big = [
+        HumanMessage(content="question", id="q"),
+        AIMessage(content="", tool_calls=[call], id="x1"),
+        ToolMessage(content="y" * 2000, tool_call_id="c1", id="y1"),
+        AIMessage(content="", tool_calls=[{**call, "id": "c2"}], id="x2"),
+        ToolMessage(content="small", tool_call_id="c2", id="y2"),
+    ]
+    older, kept = window.select("system", big)
+    assert [m.id for m in kept] == ["q", "x2", "y2"]
+    assert [m.id for m in older] == ["x1", "y1"]
+
+
+def test_embedding_cache_wraps_embeddings_and_persists(load_agent, monkeypatch, tmp_path):
+    """Test that only uncached texts reach the model and vectors survive a restart."""
+    from src.schemas import RAGConfig
+
+    agent = load_agent(_chat_inputs())
+    calls = []
+
+    class FakeEmbeddings:
+        def embed_documents(self, texts):
+            calls.append(list(texts))
+            return [[float(len(t)), 0.5, -1.0] for t in texts]
+
+        def embed_query(self, text):
+            calls.append([text])
+            return [0.25, 0.5, float(len(text))]
+
+        async def aembed_query(self, text):
+            return self.embed_query(text)
+
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path / "cache"))
+    source = _render_rag_template("rag_embedding_cache.py.j2", rag_config=RAGConfig())
+
+    def load_cache(model="text-embedding-3-small"):
+        namespace = {**vars(agent), "embeddings": FakeEmbeddings(), "embedding_provider": "openai", "embedding_model": model}
+        exec(source, namespace)
+        return namespace["embeddings"]
+
+    cache = load_cache()
+    assert cache.embed_documents(["aa", "bbb", "aa"]) == [[2.0, 0.5, -1.0], [3.0, 0.5, -1.0], [2.0, 0.5, -1.0]]
+    assert cache.embed_documents(["bbb", "c"]) == [[3.0, 0.5, -1.0], [1.0, 0.5, -1.0]]
+    assert calls == [["aa", "bbb"], ["c"]] and (cache.hits, cache.misses) == (2, 3)
+
+    # A torn append from an interrupted write is discarded on the next store
+    next(Path(tmp_path / "cache").glob("*.f32")).open("ab").write(b"\x00\x01")
+    assert cache.embed_documents(["dddd"]) == [[4.0, 0.5, -1.0]]
+
+    calls.clear()
+    restarted = load_cache()
+    assert restarted.embed_documents(["c", "aa", "dddd"]) == [[1.0, 0.5, -1.0], [2.0, 0.5, -1.0], [4.0, 0.5, -1.0]]
+    assert calls == []
+
+    # Queries are never cached: every call reaches the model and nothing is stored
+    rows = sum(p.stat().st_size for p in Path(tmp_path / "cache").glob("*.f32"))
+    assert asyncio.run(restarted.aembed_query("aa")) == [0.25, 0.5, 2.0]
+    assert restarted.embed_query("aa") == [0.25, 0.5, 2.0]
+    assert calls == [["aa"], ["aa"]]
+    assert sum(p.stat().st_size for p in Path(tmp_path / "cache").glob("*.f32")) == rows
+
+    calls.clear()
+    assert load_cache("text-embedding-3-large").embed_documents(["aa"]) == [[2.0, 0.5, -1.0]]
+    assert calls == [["aa"]]  # a different model never reuses vectors
+
+
+def _render_rag_template(name: str, **context) -> str:
+    from jinja2 import Environment, FileSystemLoader
+
+    return Environment(loader=FileSystemLoader(TEMPLATE_DIR)).get_template(name).render(**context)
+
+
+def _bm25_namespace(persist_dir: Path) -> Dict[str, Any]:
+    import shutil
+    import threading
+    from collections import defaultdict
+
+    from src.schemas import RAGConfig
+
+    namespace = {
+        "Path": Path, "hashlib": hashlib, "json": json, "os": os, "shutil": shutil,
+        "threading": threading, "defaultdict": defaultdict,
+        "Any": Any, "Dict": Dict, "List": List, "Optional": Optional, "Tuple": Tuple,
+    }
+    exec(_render_rag_template("rag_bm25.py.j2", rag_config=RAGConfig(persist_directory=str(persist_dir))), namespace)
+    return namespace
+
+
+def test_persistent_bm25_index_updates_incrementally_and_reloads(tmp_path):
+    """Test segment add/delete/merge and that a reload memory-maps the saved index."""
+    from langchain_core.documents import Document
+
+    namespace = _bm25_namespace(tmp_path / "store")
+    index = namespace["BM25Index"](tmp_path / "store" / "bm25", max_segments=2)
+    index.add(["a-0", "a-1"], [Document(page_content="apple banana", metadata={"source": "a"}),
+                               Document(page_content="检索增强生成 RAG", metadata={"source": "a"})])
+    index.add(["b-0"], [Document(page_content="banana cherry cherry", metadata={"source": "b"})])
+
+    assert [d.page_content for d in index.search("cherry banana", k=1)] == ["banana cherry cherry"]
+    assert index.search("检索", k=2)[0].metadata == {"source": "a"}
+    assert index.search("durian") == []
+
+    index.delete(["b-0"])
+    index.add(["c-0"], [Document(page_content="cherry pie", metadata={"source": "c"})])
+    index.add(["d-0"], [Document(page_content="durian", metadata={"source": "d"})])
+    segments = [p.name for p in (tmp_path / "store" / "bm25").iterdir() if p.is_dir()]
+    assert len(segments) <= 2  # merged once the segment cap was exceeded, old directories removed
+
+    reloaded = namespace["BM25Index"](tmp_path / "store" / "bm25")
+    assert reloaded.num_docs == 4
+    assert isinstance(reloaded._segments[0].postings, namespace["np"].memmap)
+    assert [d.page_content for d in reloaded.search("cherry")] == ["cherry pie"]
+    retriever = namespace["PersistentBM25Retriever"](index=reloaded, k=1)
+    assert retriever.invoke("banana")[0].page_content == "apple banana"
+
+
+def test_bm25_index_merges_small_segments_and_compacts_per_segment(tmp_path):
+    """Test that merges leave large segments untouched and deletions compact only their segment."""
+    from langchain_core.documents import Document
+
+    namespace = _bm25_namespace(tmp_path / "store")
+    index = namespace["BM25Index"](tmp_path / "store" / "bm25", max_segments=2, merge_factor=2)
+
+    def add(*names):
+        index.add(list(names), [Document(page_content=f"{name} fruit", metadata={}) for name in names])
+
+    def segments():
+        return [seg.path.name for seg in index._segments]
+
+    add("apple", "banana", "cherry", "durian")
+    add("elder")
+    add("fig")  # three segments: the two single-document ones are merged
+    assert segments() == ["seg-000000", "seg-000003"]
+    add("grape")
+    assert segments() == ["seg-000000", "seg-000005"]
+
+    index.delete(["apple", "banana", "cherry"])  # 3 of 4 deleted: only that segment is compacted
+    assert segments() == ["seg-000006", "seg-000005"]
+    assert len(index._segments[0].doc_lens) == 1
+    assert index.num_docs == 4
+    assert {d.page_content for d in index.search("fruit", k=10)} == {
+        "durian fruit", "elder fruit", "fig fruit", "grape fruit"
+    }
+
+
+def test_embedding_pipeline_batches_retries_and_bounds_concurrency():
+    """Test batching across files, the in-flight cap, per-batch retry and abort on exhausted retries."""
+    from langchain_core.documents import Document
+
+    namespace = {"os": os, "time": time, "asyncio": asyncio, "Any": Any, "Callable": Callable, "Dict": Dict, "List": List, "Optional": Optional}
+    exec(_render_rag_template("rag_embedding_pipeline.py.j2"), namespace)
+    Pipeline = namespace["EmbeddingPipeline"]
+
+    class FlakyEmbeddings:
+        def __init__(self, fail_on=(), fail_times=1):
+            self.in_flight = self.max_in_flight = 0
+            self.failures = dict.fromkeys(fail_on, fail_times)
+
+        async def aembed_documents(self, texts):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            for text in texts:
+                if self.failures.get(text, 0) > 0:
+                    self.failures[text] -= 1
+                    raise RuntimeError("429 rate limited")
+            return [[float(len(t))] for t in texts]
+
+    def items():
+        # f1 arrives in two parts (e.g. two page ranges of a PDF)
+        for name, start, count, final in (("f1", 0, 3, False), ("f1", 3, 2, True), ("f2", 0, 0, True), ("f3", 0, 3, True)):
+            yield (name, [f"{name}-{i}" for i in range(start, start + count)],
+                   [Document(page_content=f"{name} chunk {i}") for i in range(start, start + count)], final)
+
+    upserts, done, bm25 = [], [], []
+    embeddings = FlakyEmbeddings(fail_on=["f1 chunk 2"])
+    pipeline = Pipeline(embeddings, lambda ids, texts, vectors, metas: upserts.append(ids),
+                        batch_size=2, concurrency=2, backoff_seconds=0)
+    stats = asyncio.run(pipeline.run(items(), done.append, lambda ids, chunks: bm25.extend(ids)))
+    assert sorted(i for batch in upserts for i in batch) == sorted([f"f1-{i}" for i in range(5)] + [f"f3-{i}" for i in range(3)])
+    assert sorted(bm25) == sorted(i for batch in upserts for i in batch)
+    assert max(len(batch) for batch in upserts) == 2 and sorted(done) == ["f1", "f2", "f3"]
+    assert (stats["chunks"], stats["batches"], stats["retries"]) == (8, 4, 1)
+    assert embeddings.max_in_flight == 2 and stats["chunks_per_sec"] > 0
+
+    # Retries exhausted: the run aborts and the affected file is never reported as done
+    upserts, done = [], []
+    pipeline = Pipeline(FlakyEmbeddings(fail_on=["f3 chunk 2"], fail_times=10), lambda *args: upserts.append(args[0]),
+                        batch_size=2, concurrency=1, max_retries=1, backoff_seconds=0)
+    with pytest.raises(RuntimeError):
+        asyncio.run(pipeline.run(items(), done.append))
+    assert "f3" not in done
+
+
+def test_parallel_loader_streams_chunks_in_file_order(tmp_path, monkeypatch, capsys):
+    """Test the generated rag_loader: process-pool parsing, PDF page-range tasks, ordering and errors."""
+    from src.schemas import RAGConfig
+
+    module_dir = tmp_path / "agent"
+    module_dir.mkdir()
+    (module_dir / "rag_loader.py").write_text(
+        _render_rag_template("rag_loader_template.py.j2", agent_name="doc_bot", rag_config=RAGConfig()), encoding="utf-8"
+    )
+    monkeypatch.syspath_prepend(str(module_dir))
+    monkeypatch.delitem(sys.modules, "rag_loader", raising=False)
+    import rag_loader
+
+    files = []
+    for i in range(4):
+        path = tmp_path / f"doc{i}.md"
+        path.write_text("\n\n".join(f"doc{i} paragraph {j} " + "x" * 40 for j in range(3)), encoding="utf-8")
+        files.append(str(path))
+    (tmp_path / "image.png").write_bytes(b"")
+    files.insert(2, str(tmp_path / "image.png"))
+    split = {"chunk_size": 60, "chunk_overlap": 0}
+
+    # The pool is only forked while the process is single-threaded
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, daemon=True)
+    thread.start()
+    try:
+        assert rag_loader.start_pool(2) is False and rag_loader._POOL is None
+    finally:
+        stop.set()
+        thread.join()
+
+    parts = list(rag_loader.iter_document_chunks(files, split, max_pending=2))
+    assert [path for path, _, _ in parts] == files and all(final for _, _, final in parts)
+    assert [len(chunks) for _, chunks, _ in parts] == [3, 3, 0, 3, 3]
+    assert parts[1][1][0].page_content.startswith("doc1 paragraph 0") and parts[1][1][0].metadata == {"source": files[1]}
+    assert "Unsupported file type: .png" in capsys.readouterr().out
+
+    # In a fresh single-threaded interpreter the workers are forked up front, with no fork-with-threads warning
+    script = (
+        "import json, os, rag_loader\n"
+        "assert rag_loader.start_pool(2)\n"
+        f"parts = list(rag_loader.iter_document_chunks({files!r}, {split!r}, max_pending=2))\n"
+        "print(json.dumps([[p, len(c), f] for p, c, f in parts]))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-W", "error::DeprecationWarning", "-c", script],
+        cwd=module_dir, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == [[p, n, True] for p, n in zip(files, [3, 3, 0, 3, 3], strict=True)]
+
+    # PDFs are split into page-range tasks and streamed part by part (in-process here so the stubs apply)
+    monkeypatch.setattr(rag_loader, "LOADER_PDF_PAGES_PER_TASK", 2)
+    monkeypatch.setattr(rag_loader, "_pdf_page_count", lambda path: 5)
+    monkeypatch.setattr(rag_loader, "_pdf_pages", lambda path, start, end: (
+        rag_loader.Document(page_content=f"page {n}", metadata={"source": path, "page": n}) for n in range(start, end)
+    ))
+    pdf = str(tmp_path / "big.pdf")
+    parts = list(rag_loader.iter_document_chunks([pdf, files[0]], split))
+    assert [(len(chunks), final) for _, chunks, final in parts] == [(2, False), (2, False), (1, True), (3, True)]
+    assert [c.metadata["page"] for _, chunks, _ in parts[:3] for c in chunks] == [0, 1, 2, 3, 4]
+
+
+def test_incremental_index_sync_touches_only_changed_files(tmp_path, monkeypatch):
+    """Test the per-file manifest: add new, re-embed changed, delete removed, skip unchanged."""
+    from langchain_core.documents import Document
+
+    from src.schemas import RAGConfig
+
+    monkeypatch.chdir(tmp_path)
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for name, text in {"a.txt": "alpha one\nalpha two", "b.txt": "beta", "c.txt": "gamma"}.items():
+        (docs_dir / name).write_text(text, encoding="utf-8")
+
+    class FakeStore:
+        def __init__(self):
+            self.docs = {}
+            self.embedded = 0
+            self._collection = self
+
+        def upsert(self, ids, embeddings, documents, metadatas):
+            self.docs.update(zip(ids, documents, strict=True))
+
+        def delete(self, ids):
+            for i in ids:
+                self.docs.pop(i, None)
+
+    class FakeEmbeddings:
+        async def aembed_documents(self, texts):
+            store.embedded += len(texts)
+            return [[1.0] for _ in texts]
+
+    store, generations = FakeStore(), []
+    namespace = _bm25_namespace(tmp_path / "store")
+    namespace.update({
+        "asyncio": asyncio, "time": time, "Callable": Callable, "_run_sync": asyncio.run,
+        "vectorstore": store, "embeddings": FakeEmbeddings(),
+        "get_config_hash": lambda: "cfg-1",
+        "start_loader_pool": lambda: False,
+        "bump_vectorstore_generation": lambda: generations.append(1),
+        "iter_split_documents": lambda paths: (
+            (str(p), [Document(page_content=line, metadata={"source": str(p)}) for line in Path(p).read_text().splitlines()], True)
+            for p in paths
+        ),
+    })
+    rag_config = RAGConfig(persist_directory=str(tmp_path / "store"))
+    exec(_render_rag_template("rag_embedding_pipeline.py.j2"), namespace)
+    exec(_render_rag_template("rag_indexer.py.j2", rag_config=rag_config, file_paths=[]), namespace)
+    sync = namespace["sync_index"]
+    files = [str(docs_dir / n) for n in ("a.txt", "b.txt", "c.txt")]
+
+    bm25 = namespace["BM25_INDEX"]
+    stats = sync(files)
+    assert (stats["added"], stats["chunks"], store.embedded, bm25.num_docs) == (3, 4, 4, 4)
+
+    stats = sync(files)
+    assert stats["unchanged"] == 3 and store.embedded == 4 and len(generations) == 1
+
+    (docs_dir / "a.txt").write_text("alpha one", encoding="utf-8")
+    stats = sync(files[:2])
+    assert (stats["updated"], stats["removed"], stats["unchanged"]) == (1, 1, 1)
+    assert store.embedded == 5  # only the edited file was re-embedded
+    assert sorted(store.docs.values()) == ["alpha one", "beta"]
+    assert bm25.num_docs == 2 and bm25.search("gamma") == [] and bm25.search("alpha")[0].page_content == "alpha one"
+
+    # An index built before BM25 persistence existed is backfilled without re-embedding
+    bm25.clear()
+    stats = sync(files[:2])
+    assert stats["unchanged"] == 2 and store.embedded == 5 and bm25.num_docs == 2
+
+    namespace["get_config_hash"] = lambda: "cfg-2"  # e.g. chunk_size changed: everything is rebuilt
+    stats = sync(files[:2])
+    assert stats["added"] == 2 and len(store.docs) == 2 and bm25.num_docs == 2
+
+
+class _HashEmbeddings:
+    """Offline stand-in for OpenAIEmbeddings: deterministic bag-of-words vectors."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    @staticmethod
+    def _vector(text: str) -> List[float]:
+        vector = [0.0] * 16
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % 16] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def _rag_inputs(vector_store: str, file_paths: List[str]):
+    from src.schemas import RAGConfig
+
+    meta = ProjectMeta(
+        agent_name="doc_bot",
+        description="Answers from documents",
+        has_rag=True,
+        task_type=TaskType.RAG,
+        user_intent_summary="Document QA",
+        file_paths=file_paths,
+    )
+    graph = GraphStructure(
+        pattern=PatternConfig(pattern_type=PatternType.SEQUENTIAL),
+        state_schema=StateSchema(
+            fields=[StateField(name="messages", type=StateFieldType.LIST_MESSAGE, reducer="add_messages")]
+        ),
+        nodes=[
+            NodeDef(id="retrieve", type="rag", role_description="Retrieve context"),
+            NodeDef(id="answer", type="llm", role_description="Answer from context"),
+        ],
+        edges=[EdgeDef(source="retrieve", target="answer"), EdgeDef(source="answer", target="END")],
+        entry_point="retrieve",
+    )
+    rag_config = RAGConfig(
+        vector_store=vector_store,
+        embedding_provider="openai",
+        chunk_size=100,
+        chunk_overlap=0,
+        k_retrieval=2,
+        enable_hybrid_search=True,
+    )
+    return meta, graph, rag_config, ToolsConfig(enabled_tools=[])
+
+
+@pytest.mark.parametrize("vector_store", ["chroma", "faiss"])
+def test_rag_agent_indexes_and_resyncs_end_to_end(load_agent, tmp_path, monkeypatch, vector_store):
+    """Test a compiled RAG agent: import-time indexing, then a re-sync after one file changes and one is removed."""
+    pytest.importorskip("chromadb" if vector_store == "chroma" else "faiss")
+    import langchain_openai
+
+    monkeypatch.setattr(langchain_openai, "OpenAIEmbeddings", _HashEmbeddings)
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path / "embedding_cache"))
+    monkeypatch.setenv("LOADER_WORKERS", "1")  # never fork the pytest process
+    monkeypatch.setenv("RAG_CONFIG_POLL_SECONDS", "0")
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "openai")  # the generated .env defaults to ollama
+    monkeypatch.delitem(sys.modules, "rag_loader", raising=False)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    filler = "in the quiet valley beside the old stone bridge over the river"
+    texts = {
+        "alpha.txt": f"alpha apples grow {filler}\n\nalpha orchards spread {filler}",
+        "beta.md": f"beta bees make honey {filler}\n\nbeta hives hum loudly {filler}",
+        "gamma.txt": f"gamma rays are energetic {filler}",
+    }
+    for name, text in texts.items():
+        (docs / name).write_text(text, encoding="utf-8")
+    files = [str(docs / name) for name in texts]
+
+    path_before = list(sys.path)
+    agent = load_agent(_rag_inputs(vector_store, files))
+    assert sys.path == path_before  # rag_loader is loaded by file path
+    assert sys.modules["rag_loader"].__file__ == str(Path(agent.__file__).parent / "rag_loader.py")
+
+    def index_state():
+        manifest = json.loads(agent.INDEX_MANIFEST_FILE.read_text(encoding="utf-8"))
+        if vector_store == "chroma":
+            vectors = agent.vectorstore._collection.count()
+        else:
+            vectors = agent.vectorstore.index.ntotal
+        return manifest["files"], vectors
+
+    entries, vectors = index_state()
+    assert set(entries) == set(files) and all(entry["hash"] and entry["bm25"] for entry in entries.values())
+    assert sum(len(e["chunk_ids"]) for e in entries.values()) == vectors == agent.BM25_INDEX.num_docs == 5
+    assert any("honey" in d.page_content for d in agent.retriever.invoke("beta bees make honey"))
+    monkeypatch.setattr(agent, "llm", FakeListChatModel(responses=["bees make honey"]))
+    assert agent.run_agent("What do beta bees make?") == "bees make honey"
+
+    (docs / "alpha.txt").write_text("alpha apricots replaced apples", encoding="utf-8")
+    (docs / "gamma.txt").unlink()
+    gamma_ids = set(entries[files[2]]["chunk_ids"])
+
+    stats = agent.reindex_documents()
+
+    assert (stats["added"], stats["updated"], stats["removed"], stats["unchanged"]) == (0, 1, 1, 1)
+    entries, vectors = index_state()
+    assert set(entries) == set(files[:2])
+    assert sum(len(e["chunk_ids"]) for e in entries.values()) == vectors == agent.BM25_INDEX.num_docs == 3
+    assert [d.page_content for d in agent.BM25_INDEX.search("apricots", k=1)] == ["alpha apricots replaced apples"]
+    assert not agent.BM25_INDEX.search("gamma rays")
+    if vector_store == "chroma":
+        assert not agent.vectorstore._collection.get(ids=sorted(gamma_ids))["ids"]
+    else:
+        assert not gamma_ids & set(agent.vectorstore.index_to_docstore_id.values())
+
+    # Nothing to parse: the loader pool is not started
+    monkeypatch.setattr(agent, "start_loader_pool", lambda: pytest.fail("loader pool started"))
+    assert agent.reindex_documents()["unchanged"] == 2
@@ -0,0 +1,141 @@
+"""Unit tests for headless batch builds."""
+
+import asyncio
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from src.config.factory_config import AgentFactoryConfig
+from src.core import agent_factory
+from src.core.batch_factory import (
+    AutoApproveCallback,
+    BatchEntry,
+    BatchFactory,
+    SummaryWriter,
+    load_batch_spec,
+)
+from src.schemas import ProjectMeta, TaskType
+from src.schemas.agent_result import AgentResult
+
+
+def test_load_jsonl_and_yaml_specs(tmp_path):
+    """Test both spec formats and comment/blank-line handling."""
+    jsonl = tmp_path / "spec.jsonl"
+    jsonl.write_text(
+        '# weather bots\n'
+        '{"description": "weather bot", "file_paths": ["a.pdf"]}\n'
+        '\n'
+        '{"description": "math bot", "output_dir": "out/math"}\n',
+        encoding="utf-8",
+    )
+    yml = tmp_path / "spec.yaml"
+    yml.write_text("agents:\n  - description: weather bot\n    file_paths: [a.pdf]\n", encoding="utf-8")
+
+    entries = load_batch_spec(jsonl)
+    assert [e.description for e in entries] == ["weather bot", "math bot"]
+    assert entries[0].file_paths == ["a.pdf"]
+    assert entries[1].output_dir == Path("out/math")
+    assert load_batch_spec(yml) == entries[:1]
+
+    bad = tmp_path / "bad.jsonl"
+    bad.write_text('{"description": "ok"}\n{oops\n', encoding="utf-8")
+    with pytest.raises(ValueError, match=":2:"):
+        load_batch_spec(bad)
+
+    clash = tmp_path / "clash.jsonl"
+    clash.write_text(
+        '{"description": "a", "output_dir": "out/bot"}\n{"description": "b", "output_dir": "out/./bot"}\n',
+        encoding="utf-8",
+    )
+    with pytest.raises(ValueError, match="entries 1 and 2 share output_dir"):
+        load_batch_spec(clash)
+
+
+def test_auto_approve_callback_never_prompts():
+    """Test that the headless callback approves and skips key prompts."""
+    stream = io.StringIO()
+    callback = AutoApproveCallback(3, SummaryWriter(stream))
+
+    assert callback.on_install_request() is False
+    assert callback.on_api_key_missing("tavily_search", "TAVILY_API_KEY") == ""
+    record = json.loads(stream.getvalue())
+    assert record["index"] == 3 and record["event"] == "api_key_missing"
+
+
+class _FakeFactory:
+    running = 0
+    peak = 0
+
+    scopes = []
+
+    def __init__(self, config, callback, env_executor, claim_agent_dir, checkpoint_scope):
+        assert config.interactive is False
+        self.callback = callback
+        self.claim_agent_dir = claim_agent_dir
+        type(self).scopes.append(checkpoint_scope)
+
+    async def create_agent(self, user_input, file_paths=None, output_dir=None):
+        cls = type(self)
+        cls.running += 1
+        cls.peak = max(cls.peak, cls.running)
+        await asyncio.sleep(0.01)
+        cls.running -= 1
+        if user_input == "explode":
+            raise RuntimeError("boom")
+        self.callback.on_step_start("PM Agent", 1, 5)
+        meta = ProjectMeta(
+            agent_name=user_input,
+            description=user_input,
+            has_rag=False,
+            task_type=TaskType.CHAT,
+            user_intent_summary=user_input,
+        )
+        agent_dir = output_dir or self.claim_agent_dir(Path("agents") / user_input.split()[0])
+        return AgentResult(agent_name=user_input, agent_dir=agent_dir, project_meta=meta, success=True)
+
+
+@pytest.mark.asyncio
+async def test_batch_run_respects_worker_budget(monkeypatch):
+    """Test the worker limit, failure isolation and the JSONL summary stream."""
+    monkeypatch.setattr(agent_factory, "AgentFactory", _FakeFactory)
+    entries = [BatchEntry(description=name) for name in ("a", "b", "explode", "c", "d")]
+    summary = io.StringIO()
+
+    factory = BatchFactory(config=AgentFactoryConfig(), workers=2, env_workers=1)
+    results = await factory.run(entries, summary=summary)
+
+    assert _FakeFactory.peak == 2
+    assert [r["success"] for r in results] == [True, True, False, True, True]
+    assert results[2]["error"] == "boom"
+
+    records = [json.loads(line) for line in summary.getvalue().splitlines()]
+    events = [r["event"] for r in records]
+    assert events[0] == "batch_start" and events[-1] == "batch_complete"
+    assert events.count("result") == 5
+    assert events.count("step_start") == 4
+    assert records[-1]["succeeded"] == 4 and records[-1]["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_run_gives_colliding_agents_distinct_dirs(monkeypatch, tmp_path):
+    """Test that agents resolving to the same name never share an output or checkpoint directory."""
+    monkeypatch.setattr(agent_factory, "AgentFactory", _FakeFactory)
+    monkeypatch.setattr(_FakeFactory, "scopes", [])
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "agents" / "bot_3").mkdir(parents=True)  # left over from an earlier run
+    entries = [
+        BatchEntry(description="bot one"),
+        BatchEntry(description="bot two"),
+        BatchEntry(description="bot three"),
+        BatchEntry(description="other", output_dir=Path("agents/bot_2")),
+    ]
+
+    results = await BatchFactory(config=AgentFactoryConfig(), workers=3, env_workers=1).run(entries)
+
+    dirs = [Path(r["agent_dir"]) for r in results]
+    assert len(set(dirs)) == 4
+    assert sorted(d.name for d in dirs[:3]) == ["bot", "bot_4", "bot_5"]
+    assert dirs[3] == Path("agents/bot_2")
+    assert len(set(_FakeFactory.scopes)) == 4
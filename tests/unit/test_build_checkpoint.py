@@ -0,0 +1,85 @@
+"""Unit tests for resumable build checkpoints."""
+
+import json
+
+import pytest
+
+from src.core.build_checkpoint import BuildCheckpoint
+from src.schemas import ProjectMeta, TaskType
+from src.schemas.simulation import SimulationResult
+from src.schemas.tools_config import ToolsConfig
+
+
+def _meta():
+    return ProjectMeta(
+        agent_name="calc_agent",
+        description="Calculator",
+        has_rag=False,
+        task_type=TaskType.CHAT,
+        user_intent_summary="Do math",
+    )
+
+
+def test_build_id_depends_on_input_and_file_content(tmp_path):
+    """Test that the build ID tracks the text and file contents, not path order."""
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("alpha")
+    b.write_text("beta")
+
+    base = BuildCheckpoint.make_build_id("build a bot", [str(a), str(b)])
+
+    assert base == BuildCheckpoint.make_build_id("build a bot", [str(b), str(a)])
+    assert base != BuildCheckpoint.make_build_id("build another bot", [str(a), str(b)])
+    assert base != BuildCheckpoint.make_build_id("build a bot", [str(a), str(b)], scope="batch-entry-0")
+
+    a.write_text("alpha v2")
+    assert base != BuildCheckpoint.make_build_id("build a bot", [str(a), str(b)])
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """Test that stage outputs, including empty ones, survive a reload."""
+    checkpoint = BuildCheckpoint(tmp_path, "abc")
+    sim = SimulationResult(success=True, total_steps=2, execution_trace="a -> b")
+
+    checkpoint.save("pm", _meta())
+    checkpoint.save("rag", None)
+    checkpoint.save("tools", ToolsConfig(enabled_tools=["python_repl"]))
+    checkpoint.save("simulation", sim)
+
+    reloaded = BuildCheckpoint(tmp_path, "abc")
+    assert reloaded.has("pm", "rag", "tools")
+    assert not reloaded.has("graph")
+    assert reloaded.load("pm", ProjectMeta) == (True, _meta())
+    assert reloaded.load("rag", ToolsConfig) == (True, None)
+    assert reloaded.load("tools", ToolsConfig)[1].enabled_tools == ["python_repl"]
+    assert reloaded.load("simulation", SimulationResult)[1].execution_trace == "a -> b"
+    assert reloaded.load("graph", ToolsConfig) == (False, None)
+
+
+def test_invalid_checkpoint_is_treated_as_missing(tmp_path):
+    """Test that a checkpoint from an incompatible schema is ignored."""
+    checkpoint = BuildCheckpoint(tmp_path, "abc")
+    checkpoint.build_dir.mkdir(parents=True)
+    (checkpoint.build_dir / "pm.json").write_text(json.dumps({"data": {"agent_name": 1}}))
+
+    assert checkpoint.load("pm", ProjectMeta) == (False, None)
+
+
+def test_invalidate_drops_later_stages(tmp_path):
+    """Test that redoing a stage drops it and every later stage."""
+    checkpoint = BuildCheckpoint(tmp_path, "abc")
+    for stage in ("pm", "rag", "tools", "graph", "simulation"):
+        checkpoint.save(stage, None)
+
+    checkpoint.invalidate("graph")
+
+    assert checkpoint.has("pm", "rag", "tools")
+    assert not checkpoint.has("graph")
+    assert not checkpoint.has("simulation")
+
+    with pytest.raises(ValueError):
+        checkpoint.invalidate("deploy")
+
+    checkpoint.clear()
+    assert not checkpoint.has("pm")
@@ -0,0 +1,83 @@
+"""Unit tests for the endpoint capability registry."""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from src.llm import BuilderAPIConfig, BuilderClient, CapabilityRegistry
+from src.llm.capability_registry import NATIVE_STRUCTURED_OUTPUT
+from src.schemas import ProjectMeta, TaskType
+
+DEEPSEEK = ("openai", "https://api.deepseek.com", "deepseek-chat")
+
+
+def test_record_and_persist(tmp_path):
+    """Test that recorded capabilities survive a reload."""
+    path = tmp_path / "capabilities.json"
+    registry = CapabilityRegistry(path)
+
+    assert registry.get(*DEEPSEEK, NATIVE_STRUCTURED_OUTPUT) is None
+
+    registry.record(*DEEPSEEK, NATIVE_STRUCTURED_OUTPUT, False)
+
+    reloaded = CapabilityRegistry(path)
+    assert reloaded.get(*DEEPSEEK, NATIVE_STRUCTURED_OUTPUT) is False
+    assert reloaded.get("openai", None, "gpt-4o", NATIVE_STRUCTURED_OUTPUT) is None
+
+
+def test_stale_record_is_reprobed(tmp_path):
+    """Test that records older than the re-probe interval are ignored."""
+    registry = CapabilityRegistry(tmp_path / "capabilities.json", reprobe_seconds=60)
+    registry.record(*DEEPSEEK, NATIVE_STRUCTURED_OUTPUT, False)
+
+    key = CapabilityRegistry.endpoint_key(*DEEPSEEK)
+    registry._entries[key][NATIVE_STRUCTURED_OUTPUT]["checked_at"] = time.time() - 120
+
+    assert registry.get(*DEEPSEEK, NATIVE_STRUCTURED_OUTPUT) is None
+
+
+@pytest.mark.asyncio
+async def test_builder_client_skips_doomed_native_call(tmp_path):
+    """Test that a known-unsupported endpoint goes straight to the fallback."""
+    config = BuilderAPIConfig(
+        provider="openai",
+        model="deepseek-chat",
+        api_key="sk-test",
+        base_url="https://api.deepseek.com",
+        capability_file=str(tmp_path / "capabilities.json"),
+    )
+    client = BuilderClient(config)
+    client.client = MagicMock()
+
+    structured_llm = MagicMock()
+    structured_llm.ainvoke = AsyncMock(side_effect=Exception("400 response_format unavailable"))
+    client.client.with_structured_output = MagicMock(return_value=structured_llm)
+
+    meta_json = ProjectMeta(
+        agent_name="chatbot",
+        description="A chatbot",
+        has_rag=False,
+        task_type=TaskType.CHAT,
+        user_intent_summary="Chat",
+    ).model_dump_json()
+    streams = []
+
+    def astream(prompt):
+        streams.append(prompt)
+
+        async def gen():
+            yield AIMessageChunk(content=meta_json)
+
+        return gen()
+
+    client.client.astream = astream
+
+    first = await client.generate_structured("prompt", ProjectMeta)
+    second = await client.generate_structured("prompt", ProjectMeta)
+
+    assert first.agent_name == second.agent_name == "chatbot"
+    # Native mode was probed once, then skipped
+    assert structured_llm.ainvoke.await_count == 1
+    assert len(streams) == 2
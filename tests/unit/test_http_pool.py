@@ -0,0 +1,48 @@
+"""Unit tests for the shared LLM HTTP transport."""
+
+import asyncio
+
+from src.llm import BuilderAPIConfig, BuilderClient, get_async_http_client, get_http_client
+from src.llm.http_pool import HTTPPoolConfig, _PerLoopAsyncTransport
+
+
+def test_clients_are_shared_per_origin():
+    """Test that endpoints on the same origin share one client."""
+    a = get_http_client("https://api.deepseek.com/v1")
+    b = get_http_client("https://api.deepseek.com:443/beta")
+    c = get_http_client("http://localhost:11434")
+
+    assert a is b
+    assert a is not c
+    assert get_async_http_client(None, "openai") is get_async_http_client("https://api.openai.com/v1")
+
+
+def test_async_pool_is_per_event_loop():
+    """Test that each event loop gets its own connection pool."""
+    config = HTTPPoolConfig()
+    transport = _PerLoopAsyncTransport(config.limits(), http2=False)
+
+    async def current_pair():
+        return transport._current(), transport._current()
+
+    first, again = asyncio.run(current_pair())
+    second, _ = asyncio.run(current_pair())
+
+    assert first is again
+    assert first is not second
+
+
+def test_builder_clients_reuse_pool(tmp_path):
+    """Test that separate BuilderClients hand the same pooled clients to ChatOpenAI."""
+    config = BuilderAPIConfig(
+        provider="openai",
+        model="gpt-4o",
+        api_key="sk-test",
+        base_url="https://api.example.com/v1",
+        capability_file=str(tmp_path / "capabilities.json"),
+    )
+    first = BuilderClient(config)
+    second = BuilderClient(config)
+
+    assert first.client.http_async_client is second.client.http_async_client
+    assert first.client.http_client is get_http_client("https://api.example.com/v1")
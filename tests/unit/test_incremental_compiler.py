@@ -0,0 +1,183 @@
+"""Unit tests for incremental compilation."""
+
+import re
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+from src.core import compiler as compiler_module
+from src.core.compiler import MANIFEST_FILE, Compiler, get_template_environment
+from src.schemas import (
+    GraphStructure,
+    NodeDef,
+    PatternConfig,
+    PatternType,
+    ProjectMeta,
+    RAGConfig,
+    StateField,
+    StateFieldType,
+    StateSchema,
+    TaskType,
+    ToolsConfig,
+)
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "src" / "templates"
+TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+
+
+def _inputs():
+    meta = ProjectMeta(
+        agent_name="doc_bot",
+        description="Answers questions about docs",
+        has_rag=True,
+        task_type=TaskType.RAG,
+        user_intent_summary="Doc QA",
+        file_paths=["docs/manual.md"],
+    )
+    graph = GraphStructure(
+        pattern=PatternConfig(pattern_type=PatternType.SEQUENTIAL),
+        state_schema=StateSchema(
+            fields=[StateField(name="messages", type=StateFieldType.LIST_MESSAGE, reducer="add_messages")]
+        ),
+        nodes=[NodeDef(id="answer", type="rag", role_description="Answer from docs")],
+        edges=[],
+        entry_point="answer",
+    )
+    return meta, graph, RAGConfig(), ToolsConfig(enabled_tools=[])
+
+
+@pytest.fixture
+def compiler(tmp_path_factory):
+    return Compiler(TEMPLATE_DIR, cache_dir=tmp_path_factory.mktemp("compiler_cache"))
+
+
+def test_unchanged_inputs_rewrite_nothing(compiler, tmp_path):
+    """Test that a second compile with the same inputs touches no file."""
+    meta, graph, rag, tools = _inputs()
+
+    first = compiler.compile(meta, graph, rag, tools, tmp_path)
+    assert first.success, first.error_message
+    assert {"agent.py", "rag_loader.py"} <= set(first.changed_files)
+    assert (tmp_path / MANIFEST_FILE).exists()
+    mtime = (tmp_path / "agent.py").stat().st_mtime_ns
+
+    second = compiler.compile(meta, graph, rag, tools, tmp_path)
+
+    assert second.success
+    assert second.changed_files == []
+    assert set(second.generated_files) == set(first.generated_files)
+    assert (tmp_path / "agent.py").stat().st_mtime_ns == mtime
+
+
+def test_runtime_rag_tweak_only_touches_rag_config(compiler, tmp_path):
+    """Test that retrieval-only RAG changes rewrite only rag_config.json."""
+    meta, graph, rag, tools = _inputs()
+    compiler.compile(meta, graph, rag, tools, tmp_path)
+
+    tuned = rag.model_copy(update={"k_retrieval": rag.k_retrieval + 3, "chunk_size": 500})
+    result = compiler.compile(meta, graph, tuned, tools, tmp_path)
+
+    assert result.changed_files == ["rag_config.json"]
+
+
+def _outputs(directory: Path) -> dict:
+    """Generated files of a compile, with the timestamp header lines dropped."""
+    return {
+        path.name: "\n".join(
+            line for line in path.read_text(encoding="utf-8").splitlines() if not TIMESTAMP.search(line)
+        )
+        for path in sorted(directory.iterdir())
+        if path.is_file() and path.name != MANIFEST_FILE
+    }
+
+
+def test_incremental_compile_matches_clean_compile(compiler, tmp_path):
+    """Test that an incremental compile after a RAG tweak equals a clean compile of the new inputs."""
+    meta, graph, rag, tools = _inputs()
+    compiler.compile(meta, graph, rag, tools, tmp_path / "incremental")
+
+    tuned = rag.model_copy(update={"k_retrieval": rag.k_retrieval + 3, "chunk_size": 500})
+    compiler.compile(meta, graph, tuned, tools, tmp_path / "incremental")
+    compiler.compile(meta, graph, tuned, tools, tmp_path / "clean")
+
+    assert _outputs(tmp_path / "incremental") == _outputs(tmp_path / "clean")
+
+
+def test_outputs_no_longer_generated_are_removed(tmp_path_factory, tmp_path):
+    """Test that outputs dropped from a compile are deleted with their manifest entries."""
+    cache_dir = tmp_path_factory.mktemp("compiler_cache")
+    meta, graph, rag, tools = _inputs()
+    Compiler(TEMPLATE_DIR, cache_dir=cache_dir, emit_server=True).compile(meta, graph, rag, tools, tmp_path)
+    assert (tmp_path / "server.py").exists() and (tmp_path / "rag_loader.py").exists()
+
+    plain = meta.model_copy(update={"has_rag": False})
+    result = Compiler(TEMPLATE_DIR, cache_dir=cache_dir).compile(plain, graph, None, tools, tmp_path)
+
+    assert result.success, result.error_message
+    assert result.removed_files == ["rag_config.json", "rag_loader.py", "server.py"]
+    assert not (tmp_path / "server.py").exists() and not (tmp_path / "rag_loader.py").exists()
+    assert set(Compiler._load_manifest(tmp_path)) == set(result.generated_files)
+
+
+def test_structural_changes_regenerate_code(compiler, tmp_path):
+    """Test that graph and code-level RAG changes re-render agent.py."""
+    meta, graph, rag, tools = _inputs()
+    compiler.compile(meta, graph, rag, tools, tmp_path)
+
+    renamed = graph.model_copy(deep=True)
+    renamed.nodes[0].role_description = "Answer strictly from docs"
+    result = compiler.compile(meta, renamed, rag, tools, tmp_path)
+    assert set(result.changed_files) == {"agent.py", "graph.json"}
+
+    faiss = rag.model_copy(update={"vector_store": "faiss"})
+    result = compiler.compile(meta, renamed, faiss, tools, tmp_path)
+    assert {"agent.py", "requirements.txt", "rag_config.json"} <= set(result.changed_files)
+
+
+def test_deleted_output_is_regenerated(compiler, tmp_path):
+    """Test that a missing output is rebuilt even if its fingerprint matches."""
+    meta, graph, rag, tools = _inputs()
+    compiler.compile(meta, graph, rag, tools, tmp_path)
+    (tmp_path / "prompts.yaml").unlink()
+
+    result = compiler.compile(meta, graph, rag, tools, tmp_path)
+
+    assert result.changed_files == ["prompts.yaml"]
+
+
+def test_edited_output_is_regenerated(compiler, tmp_path):
+    """Test that an output edited on disk after the compile is rewritten."""
+    meta, graph, rag, tools = _inputs()
+    compiler.compile(meta, graph, rag, tools, tmp_path)
+    original = (tmp_path / "agent.py").read_text(encoding="utf-8")
+    (tmp_path / "agent.py").write_text(original + "\n# patched by hand\n", encoding="utf-8")
+
+    result = compiler.compile(meta, graph, rag, tools, tmp_path)
+
+    assert result.changed_files == ["agent.py"]
+    assert "patched by hand" not in (tmp_path / "agent.py").read_text(encoding="utf-8")
+    assert compiler.compile(meta, graph, rag, tools, tmp_path).changed_files == []
+
+
+def test_environment_and_formatting_are_shared(tmp_path, monkeypatch):
+    """Test the process-wide Jinja environment and the formatted-code cache."""
+    monkeypatch.setattr(compiler_module, "_FORMAT_CACHE", OrderedDict())
+    cache_dir = tmp_path / "cache"
+    a = Compiler(TEMPLATE_DIR, cache_dir=cache_dir)
+    b = Compiler(TEMPLATE_DIR, cache_dir=cache_dir)
+    assert a.env is b.env is get_template_environment(TEMPLATE_DIR, cache_dir)
+
+    meta, graph, rag, tools = _inputs()
+    assert a.compile(meta, graph, rag, tools, tmp_path / "one").success
+    assert list((cache_dir / "jinja").iterdir())
+
+    if a._black_version():
+        assert len(list((cache_dir / "format").iterdir())) == 1
+        # Same inputs in another directory: identical code, formatted once
+        assert b.compile(meta, graph, rag, tools, tmp_path / "two").success
+        assert len(list((cache_dir / "format").iterdir())) == 1
+
+    raw = Compiler(TEMPLATE_DIR, format_code=False, cache_dir=cache_dir)
+    assert raw.compile(meta, graph, rag, tools, tmp_path / "three").success
+    assert "Generated at: __AGENT_ZERO" not in (tmp_path / "three" / "agent.py").read_text(encoding="utf-8")
@@ -0,0 +1,152 @@
+"""Unit tests for the Builder request scheduler."""
+
+import asyncio
+
+import pytest
+
+from src.llm import BuilderAPIConfig, BuilderClient, Priority, RequestScheduler, get_scheduler
+from src.llm.request_scheduler import TokenBucket, is_rate_limit_error
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    """Test that no more than max_concurrency requests run at once."""
+    scheduler = RequestScheduler(max_concurrency=2)
+    running = 0
+    peak = 0
+
+    async def request():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    results = await asyncio.gather(*(scheduler.submit(request) for _ in range(8)))
+
+    assert results == ["ok"] * 8
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_priority_order():
+    """Test that queued interactive requests run before background ones."""
+    scheduler = RequestScheduler(max_concurrency=1)
+    order = []
+    gate = asyncio.Event()
+
+    async def blocker():
+        await gate.wait()
+
+    def make_request(name):
+        async def request():
+            order.append(name)
+        return request
+
+    first = asyncio.create_task(scheduler.submit(blocker))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(scheduler.submit(make_request("background"), Priority.BACKGROUND)),
+        asyncio.create_task(scheduler.submit(make_request("normal"), Priority.NORMAL)),
+        asyncio.create_task(scheduler.submit(make_request("interactive"), Priority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(first, *tasks)
+
+    assert order == ["interactive", "normal", "background"]
+
+
+@pytest.mark.asyncio
+async def test_retry_on_rate_limit():
+    """Test that 429 errors are retried and other errors are not."""
+    scheduler = RequestScheduler(max_retries=3, base_delay=0.001)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise Exception("Error code: 429 - Rate limit reached")
+        return "done"
+
+    assert await scheduler.submit(flaky) == "done"
+    assert attempts == 3
+    assert scheduler.stats["retries"] == 2
+
+    async def broken():
+        raise ValueError("invalid api key")
+
+    with pytest.raises(ValueError):
+        await scheduler.submit(broken)
+    assert scheduler._active == 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_refill():
+    """Test that the bucket delays requests once the budget is spent."""
+    bucket = TokenBucket(tokens_per_minute=6000)  # 100 tokens/s
+    await bucket.acquire(6000)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await bucket.acquire(10)
+
+    assert loop.time() - start >= 0.08
+
+
+def test_rate_limit_detection_and_shared_instance():
+    """Test rate-limit detection and per-endpoint scheduler sharing."""
+    assert is_rate_limit_error(Exception("429 Too Many Requests"))
+    assert not is_rate_limit_error(Exception("400 Bad Request"))
+
+    a = get_scheduler("openai", "https://example.com/v1/")
+    b = get_scheduler("openai", "https://example.com/v1")
+    c = get_scheduler("anthropic", None)
+    assert a is b
+    assert a is not c
+
+
+@pytest.mark.asyncio
+async def test_retry_on_transient_errors():
+    """Test that connection/5xx errors use their own retry budget."""
+    scheduler = RequestScheduler(max_retries=0, transient_retries=2, base_delay=0.001)
+    attempts = 0
+
+    class InternalServerError(Exception):
+        status_code = 503
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise ConnectionError("connection reset")
+        if attempts == 2:
+            raise InternalServerError("service unavailable")
+        return "done"
+
+    assert await scheduler.submit(flaky) == "done"
+    assert scheduler.stats["transient_errors"] == 2
+
+    async def down():
+        raise ConnectionError("connection refused")
+
+    with pytest.raises(ConnectionError):
+        await scheduler.submit(down)
+    assert scheduler.stats["transient_errors"] == 4
+    assert scheduler._active == 0
+
+
+def test_builder_client_leaves_retries_to_scheduler(tmp_path):
+    """Test that the SDK client does not retry on its own behind the scheduler."""
+    client = BuilderClient(BuilderAPIConfig(
+        provider="openai",
+        model="gpt-4o",
+        api_key="sk-test",
+        base_url="https://retries.example.com/v1",
+        capability_file=str(tmp_path / "capabilities.json"),
+    ))
+
+    assert client.client.max_retries == 0
+    assert client.scheduler.transient_retries == client.config.max_retries
@@ -0,0 +1,136 @@
+"""Unit tests for the Builder response cache."""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.llm import BuilderAPIConfig, BuilderClient, CacheMissError, ResponseCache
+from src.schemas import ProjectMeta, TaskType
+
+
+def _key(prompt: str, **overrides) -> str:
+    params = {"provider": "openai", "model": "gpt-4o", "temperature": 0.7, "prompt": prompt}
+    params.update(overrides)
+    return ResponseCache.make_key(**params)
+
+
+def test_key_depends_on_all_inputs():
+    """Test that every request parameter changes the cache key."""
+    base = _key("hello")
+
+    assert base == _key("hello")
+    assert base != _key("hello!")
+    assert base != _key("hello", model="gpt-4o-mini")
+    assert base != _key("hello", temperature=0.0)
+    assert base != _key("hello", schema={"type": "object"})
+    assert base != _key("hello", base_url="https://api.deepseek.com")
+
+
+def test_get_put_roundtrip(tmp_path):
+    """Test storing and reading back a response."""
+    cache = ResponseCache(tmp_path)
+    key = _key("hello")
+
+    assert cache.get(key) is None
+    cache.put(key, "world")
+    assert cache.get(key) == "world"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_ttl_expiry(tmp_path):
+    """Test that expired entries are treated as misses."""
+    cache = ResponseCache(tmp_path, ttl_seconds=1)
+    key = _key("hello")
+    cache.put(key, "world")
+
+    cache._conn.execute("UPDATE responses SET created_at = ?", (time.time() - 10,))
+
+    assert cache.get(key) is None
+
+
+def test_lru_eviction(tmp_path):
+    """Test that the least-recently-used entry is evicted when over budget."""
+    cache = ResponseCache(tmp_path, max_size_mb=2500 / (1024 * 1024))
+    first, second, third = _key("a"), _key("b"), _key("c")
+
+    cache.put(first, "x" * 1000)
+    time.sleep(0.01)
+    cache.put(second, "y" * 1000)
+    time.sleep(0.01)
+    cache.get(first)  # first becomes most recently used
+    time.sleep(0.01)
+    cache.put(third, "z" * 1000)
+
+    assert cache.get(first) is not None
+    assert cache.get(second) is None
+    assert cache.get(third) is not None
+
+
+def test_replay_only_raises_on_miss(tmp_path):
+    """Test that replay mode refuses live calls."""
+    ResponseCache(tmp_path).put(_key("cached"), "answer")
+    cache = ResponseCache(tmp_path, replay_only=True)
+
+    assert cache.get(_key("cached")) == "answer"
+    with pytest.raises(CacheMissError):
+        cache.get(_key("not cached"))
+
+
+def _make_client(tmp_path, mode: str = "on") -> BuilderClient:
+    config = BuilderAPIConfig(
+        provider="openai",
+        model="gpt-4o",
+        api_key="sk-test",
+        cache_mode=mode,
+        cache_dir=str(tmp_path),
+        capability_file=str(tmp_path / "capabilities.json"),
+    )
+    client = BuilderClient(config)
+    client.client = MagicMock()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_builder_client_text_cache(tmp_path):
+    """Test that a repeated text call is served from the cache."""
+    client = _make_client(tmp_path)
+    response = MagicMock(content="cached answer", response_metadata={})
+    client.client.ainvoke = AsyncMock(return_value=response)
+
+    assert await client.call("prompt") == "cached answer"
+    assert await client.call("prompt") == "cached answer"
+    assert client.client.ainvoke.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_builder_client_structured_cache(tmp_path):
+    """Test that structured results are cached and re-validated."""
+    client = _make_client(tmp_path)
+    meta = ProjectMeta(
+        agent_name="chatbot",
+        description="A chatbot",
+        has_rag=False,
+        task_type=TaskType.CHAT,
+        user_intent_summary="Chat",
+    )
+    structured_llm = MagicMock()
+    structured_llm.ainvoke = AsyncMock(return_value=meta)
+    client.client.with_structured_output = MagicMock(return_value=structured_llm)
+
+    first = await client.call("prompt", schema=ProjectMeta)
+    second = await client.call("prompt", schema=ProjectMeta)
+
+    assert isinstance(second, ProjectMeta)
+    assert second.agent_name == first.agent_name == "chatbot"
+    assert structured_llm.ainvoke.await_count == 1
+
+    replay_client = _make_client(tmp_path, mode="replay")
+    replayed = await replay_client.call("prompt", schema=ProjectMeta)
+    assert replayed.agent_name == "chatbot"
+    with pytest.raises(CacheMissError):
+        await replay_client.call("another prompt", schema=ProjectMeta)
@@ -0,0 +1,108 @@
+"""Unit tests for the dependency-aware step executor."""
+
+import asyncio
+
+import pytest
+
+from src.core import StepExecutor
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently():
+    """Test that steps without dependencies overlap."""
+    executor = StepExecutor()
+    for name in ("a", "b", "c"):
+        executor.add_step(name, lambda _, n=name: asyncio.sleep(0.05, result=n))
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    results = await executor.run()
+
+    assert results == {"a": "a", "b": "b", "c": "c"}
+    assert loop.time() - start < 0.12
+
+
+@pytest.mark.asyncio
+async def test_dependencies_receive_results_in_order():
+    """Test that a step starts only after its dependencies and sees their results."""
+    order = []
+
+    async def step(name, value, deps):
+        order.append(name)
+        await asyncio.sleep(0.01)
+        return value + sum(deps.values())
+
+    results = await (
+        StepExecutor()
+        .add_step("rag", lambda r: step("rag", 10, r), depends_on=["pm", "profile"])
+        .add_step("pm", lambda r: step("pm", 1, r))
+        .add_step("profile", lambda r: step("profile", 2, r))
+        .add_step("tools", lambda r: step("tools", 100, r), depends_on=["pm"])
+        .run()
+    )
+
+    assert results == {"rag": 13, "pm": 1, "profile": 2, "tools": 101}
+    assert order.index("rag") > order.index("pm")
+    assert order.index("rag") > order.index("profile")
+
+
+@pytest.mark.asyncio
+async def test_wait_for_allows_late_awaiting():
+    """Test awaiting another step's result without declaring a dependency."""
+    executor = StepExecutor()
+    started = []
+
+    async def consumer(_):
+        started.append("consumer")
+        return await executor.wait_for("slow") * 2
+
+    async def slow(_):
+        await asyncio.sleep(0.02)
+        started.append("slow-done")
+        return 21
+
+    executor.add_step("slow", slow).add_step("consumer", consumer)
+    results = await executor.run()
+
+    assert results["consumer"] == 42
+    assert started == ["consumer", "slow-done"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_graphs_are_rejected():
+    """Test unknown dependencies, cycles and duplicate names."""
+    with pytest.raises(ValueError, match="unknown step"):
+        await StepExecutor().add_step("a", lambda r: asyncio.sleep(0), depends_on=["x"]).run()
+
+    cyclic = (
+        StepExecutor()
+        .add_step("a", lambda r: asyncio.sleep(0), depends_on=["b"])
+        .add_step("b", lambda r: asyncio.sleep(0), depends_on=["a"])
+    )
+    with pytest.raises(ValueError, match="cycle"):
+        await cyclic.run()
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        StepExecutor().add_step("a", lambda r: asyncio.sleep(0)).add_step("a", lambda r: asyncio.sleep(0))
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_remaining_steps():
+    """Test that one failing step cancels the others and re-raises."""
+    cancelled = []
+
+    async def slow(_):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def broken(_):
+        raise RuntimeError("boom")
+
+    executor = StepExecutor().add_step("slow", slow).add_step("broken", broken)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await executor.run()
+    assert cancelled == ["slow"]
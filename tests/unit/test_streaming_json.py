@@ -0,0 +1,230 @@
+"""Unit tests for streaming structured generation."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from src.core.test_generator import TestGenerator
+from src.llm import BuilderAPIConfig, BuilderClient
+from src.schemas import ProjectMeta, TaskType
+from src.utils.json_utils import IncrementalJSONParser, JSONStreamError
+
+
+def _feed_in_chunks(parser, text, size=7):
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return items
+
+
+def test_parser_yields_array_items_incrementally():
+    """Test that array items are returned as soon as they close."""
+    parser = IncrementalJSONParser(expect="array")
+
+    assert parser.feed('```json\n[{"question": "a, [b]?"}') == []
+    assert parser.feed(', {"question": "c\\"}"}') == [{"question": "a, [b]?"}]
+    assert parser.feed("]\n```") == [{"question": 'c"}'}]
+    assert parser.done
+    assert parser.document.startswith("[") and parser.document.endswith("]")
+
+
+def test_parser_items_key_in_object():
+    """Test streaming items from an array field of a top-level object."""
+    text = '{"meta": {"nodes": [0]}, "nodes": [{"id": "a"}, {"id": "b"}], "edges": []}'
+    parser = IncrementalJSONParser(expect="object", items_key="nodes")
+
+    assert _feed_in_chunks(parser, text) == [{"id": "a"}, {"id": "b"}]
+    assert parser.done
+
+
+def test_parser_aborts_only_on_long_preamble():
+    """Test that only a long prose preamble aborts; bad brackets are left for repair."""
+    with pytest.raises(JSONStreamError):
+        IncrementalJSONParser(expect="object", max_preamble=20).feed(
+            "I'm sorry, I can't produce that output for you."
+        )
+
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": [1, 2}')
+    assert parser.malformed and not parser.done
+
+
+def test_parser_skips_brackets_in_preamble():
+    """Test that a bracket of the wrong type in the preamble is not taken as the JSON start."""
+    text = 'Here is the result [as requested]:\n{"a":1}'
+    parser = IncrementalJSONParser(expect="object")
+    parser.feed(text)
+
+    assert parser.document == '{"a":1}'
+
+
+def test_parser_rejects_array_when_object_expected():
+    """Test that a top-level array is rejected early instead of parsing its first element."""
+    parser = IncrementalJSONParser(expect="object")
+
+    with pytest.raises(JSONStreamError, match="Expected a JSON object"):
+        parser.feed('[{"id": "a"}, {"id": "b"}')
+
+
+def test_parser_skips_braced_preamble():
+    """Test that a closed bracket that is not valid JSON is skipped."""
+    text = 'Sure, I will fill in the {schema} you gave: {"a": 1}'
+    parser = IncrementalJSONParser(expect="object")
+    _feed_in_chunks(parser, text)
+
+    assert parser.document == '{"a": 1}'
+
+
+def test_parser_checks_preamble_before_late_bracket():
+    """Test that a bracket far into the text does not exempt the preamble check."""
+    with pytest.raises(JSONStreamError):
+        IncrementalJSONParser(expect="object", max_preamble=20).feed(
+            "I'm sorry, I can't produce that output for you. {\"a\": 1}"
+        )
+
+
+def test_parser_keeps_text_after_stray_bracket():
+    """Test that a stray closing bracket stops item streaming without raising."""
+    text = (
+        '[{"question": "q1", "expected_answer": "a1"}}, '
+        '{"question": "q2", "expected_answer": "a2"}]'
+    )
+    parser = IncrementalJSONParser(expect="array")
+    _feed_in_chunks(parser, text)
+
+    assert parser.malformed and not parser.done
+    assert parser.buffer == text
+
+
+def test_parser_tolerates_bad_items():
+    """Test that a malformed item is skipped instead of aborting the stream."""
+    parser = IncrementalJSONParser(expect="array")
+    items = parser.feed('[ "question": "x", {"question": "y"}]')
+
+    assert items == [{"question": "y"}]
+    assert parser.item_errors == 1
+    # The closed array is not valid JSON, so it is not accepted as the document
+    assert not parser.done
+
+
+def _make_client(tmp_path, completions):
+    config = BuilderAPIConfig(
+        provider="openai",
+        model="gpt-4o",
+        api_key="sk-test",
+        capability_file=str(tmp_path / "capabilities.json"),
+    )
+    client = BuilderClient(config)
+    client.client = MagicMock()
+    consumed = []
+
+    def astream(prompt):
+        text = completions[len(consumed)]
+        consumed.append([])
+
+        async def gen():
+            for i in range(0, len(text), 5):
+                consumed[-1].append(text[i:i + 5])
+                yield AIMessageChunk(content=text[i:i + 5])
+
+        return gen()
+
+    client.client.astream = astream
+    return client, consumed
+
+
+@pytest.mark.asyncio
+async def test_stream_json_delivers_items(tmp_path):
+    """Test that stream_json passes each item to the callback."""
+    client, _ = _make_client(tmp_path, ['[{"q": 1}, {"q": 2}, {"q": 3}]'])
+    received = []
+
+    raw = await client.stream_json("prompt", on_item=received.append)
+
+    assert received == [{"q": 1}, {"q": 2}, {"q": 3}]
+    assert raw == '[{"q": 1}, {"q": 2}, {"q": 3}]'
+
+
+def _project_meta_json():
+    return ProjectMeta(
+        agent_name="chatbot",
+        description="A chatbot",
+        has_rag=False,
+        task_type=TaskType.CHAT,
+        user_intent_summary="Chat",
+    ).model_dump_json()
+
+
+@pytest.mark.asyncio
+async def test_fallback_aborts_and_retries_long_preamble(tmp_path):
+    """Test that a long prose preamble is aborted early and retried."""
+    prose = "Sure! Let me think about this agent carefully. " * 20
+    client, consumed = _make_client(tmp_path, [prose, _project_meta_json()])
+
+    result = await client._generate_structured_fallback("prompt", ProjectMeta, "{}", 0.7)
+
+    assert result.agent_name == "chatbot"
+    # The first stream was abandoned long before its end
+    assert len(consumed[0]) < len(prose) // 5
+
+
+@pytest.mark.asyncio
+async def test_fallback_extracts_object_after_bracketed_preamble(tmp_path):
+    """Test that brackets in a short preamble do not break extraction."""
+    client, _ = _make_client(tmp_path, ["Here is the result [as requested]:\n" + _project_meta_json()])
+
+    result = await client._generate_structured_fallback("prompt", ProjectMeta, "{}", 0.7)
+
+    assert result.agent_name == "chatbot"
+
+
+@pytest.mark.asyncio
+async def test_stream_json_returns_malformed_text_for_repair(tmp_path):
+    """Test that malformed QA output reaches TestGenerator's repair instead of raising."""
+    text = (
+        '[{"question": "q1", "expected_answer": "a1"}}, '
+        '{"question": "q2", "expected_answer": "a2"}]'
+    )
+    client, _ = _make_client(tmp_path, [text])
+
+    raw = await client.stream_json("prompt")
+
+    assert raw == text
+    assert TestGenerator(client)._parse_json_response(raw) == [
+        {"question": "q1", "expected_answer": "a1"},
+        {"question": "q2", "expected_answer": "a2"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_json_retry_resets_items(tmp_path):
+    """Test that on_retry fires before a retried attempt and the last text is returned."""
+    prose = "No JSON here, just a long explanation of what I would do. " * 10
+    client, _ = _make_client(tmp_path, [prose, prose])
+    retries = []
+
+    raw = await client.stream_json("prompt", on_retry=lambda: retries.append(1))
+
+    assert retries == [1]
+    assert raw and "[" not in raw
+
+
+@pytest.mark.asyncio
+async def test_stream_json_caches_only_complete_documents(tmp_path):
+    """Test that aborted or unparsed completions never reach the response cache."""
+    prose = "No JSON here, just a long explanation of what I would do. " * 10
+    client, consumed = _make_client(tmp_path, [prose, prose, prose, prose, '[{"q": 1}]', "unused"])
+    client.config.stream_retries = 1
+    client.cache = MagicMock()
+    client.cache.get.return_value = None
+    client._cache_key = lambda *args: "key"
+
+    await client.stream_json("prompt")
+    await client.stream_json("prompt")
+    client.cache.put.assert_not_called()
+
+    raw = await client.stream_json("prompt")
+    assert raw == '[{"q": 1}]'
+    client.cache.put.assert_called_once_with("key", raw)
+    assert len(consumed) == 5
@@ -63,7 +63,7 @@ def test_node_trace_recording_in_template():
     
     # 验证 RAG 节点的 trace 记录
     assert '"action": "rag_retrieval"' in template_content, "RAG 节点应该记录 action"
-    assert 'docs_file = _save_docs_to_file(docs, trace_entry["step"])' in template_content, \
+    assert 'doc_hashes = _trace_manager.save_docs(docs)' in template_content, \
         "RAG 节点应该保存文档到外部文件"
     
     # 验证 Tool 节点的 trace 记录
@@ -81,7 +81,7 @@ def test_run_agent_function_in_template():
     template_content = template_file.read_text(encoding="utf-8")
     
     # 验证 run_agent 函数
-    assert "def run_agent(user_input: str, return_trace: bool = False):" in template_content, \
+    assert "def run_agent(user_input: str, return_trace: bool = False, thread_id: Optional[str] = None):" in template_content, \
         "应该有 run_agent 函数"
     assert "trace_file = _trace_manager.start_new_trace()" in template_content, \
         "应该启动新的 trace"
@@ -98,24 +98,22 @@ def test_run_agent_function_in_template():
 
 
 def test_save_docs_function_in_template():
-    """测试 5: 验证模板包含 _save_docs_to_file 函数"""
+    """测试 5: 验证模板按内容哈希去重、压缩保存文档"""
     
     template_file = Path(__file__).parent.parent.parent / "src" / "templates" / "agent_template.py.j2"
     template_content = template_file.read_text(encoding="utf-8")
     
-    # 验证 _save_docs_to_file 函数
-    assert "def _save_docs_to_file(docs: List, step: int) -> str:" in template_content, \
-        "应该有 _save_docs_to_file 函数"
-    assert 'docs_dir = Path(__file__).parent / ".trace" / "docs"' in template_content, \
-        "应该创建 .trace/docs 目录"
-    assert "docs_dir.mkdir(parents=True, exist_ok=True)" in template_content, \
-        "应该创建目录"
-    assert "with open(filepath, 'w', encoding='utf-8') as f:" in template_content, \
-        "应该写入文件"
-    assert "json.dump(doc_contents, f, ensure_ascii=False, indent=2)" in template_content, \
-        "应该保存为 JSON"
-    
-    print("✅ 测试 5 通过: _save_docs_to_file 函数存在于模板中")
+    # 验证文档存储 (TraceManager.save_docs -> TraceWriter.write_doc)
+    assert "def save_docs(self, docs: List) -> List[str]:" in template_content, \
+        "应该有 save_docs 方法"
+    assert 'self.docs_dir = trace_dir / "docs"' in template_content, \
+        "应该存到 .trace/docs 目录"
+    assert "digest = hashlib.sha256(text.encode(\"utf-8\")).hexdigest()" in template_content, \
+        "应该按内容哈希去重"
+    assert "gzip.compress(" in template_content, \
+        "应该压缩保存"
+    
+    print("✅ 测试 5 通过: 文档按哈希去重压缩保存")
 
 
 def test_main_loop_trace_integration():